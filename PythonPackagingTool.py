@@ -1,13 +1,23 @@
 import os
 import sys
-import shutil
 import subprocess
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 from pathlib import Path
 import threading
 import queue
-import re
+import multiprocessing
+import time
+
+from code_cleaner import OUTPUT_IN_PLACE, OUTPUT_MEMORY, OUTPUT_MIRROR, OUTPUT_SIBLING, CleanEngine, CleanOptions
+from file_collection import FileCollection
+from file_scanner import FolderScanner
+from log_view import LogPane, new_log_file_path
+from pack_core import PackConfig, PackPipeline, clean_build, clean_build_files_only, open_path
+from resource_manifest import DEFAULT_RESOURCE_EXCLUDES
+from startup_bench import STARTUP_RUNS
+from upx_stage import DEFAULT_UPX_EXCLUDES
+from virtual_list import VirtualList
 
 # 确保PyInstaller已安装
 try:
@@ -25,7 +35,7 @@ class PackApp:
     def __init__(self, root):
         self.root = root
         self.root.title("Python打包工具 v1.1")
-        self.root.geometry("800x600")
+        self.root.geometry("800x650")
         self.root.resizable(True, True)
         
         # 初始化变量
@@ -34,11 +44,26 @@ class PackApp:
         self.output_name = tk.StringVar()
         self.output_dir = tk.StringVar()
         self.enable_upx = tk.BooleanVar(value=False)  # 默认禁用UPX
+        self.selective_upx_var = tk.BooleanVar(value=False)  # 只压缩值得压缩的二进制文件，结果缓存
+        self.upx_exclude_var = tk.StringVar(value="; ".join(DEFAULT_UPX_EXCLUDES))  # 分号分隔的UPX排除规则
         self.pack_option_var = tk.StringVar(value="single_dir")  # 默认打包为文件夹
+        self.parallel_build_var = tk.BooleanVar(value=False)  # "both"模式下是否并行打包
+        self.incremental_var = tk.BooleanVar(value=False)  # 增量构建，保留工作目录和spec
+        self.build_cache_var = tk.BooleanVar(value=False)  # 内容未变化时直接复用上次的产物
+        self.strip_sources_var = tk.BooleanVar(value=False)  # 清洗主程序和本地模块后再交给PyInstaller
+        self.analyze_imports_var = tk.BooleanVar(value=False)  # 按导入分析结果生成PyInstaller参数
+        self.startup_bench_var = tk.BooleanVar(value=False)  # 打包后测量程序的启动时间和内存峰值
+        self.analyze_size_var = tk.BooleanVar(value=False)  # 打包后分析产物大小
+        self.resource_manifest_var = tk.BooleanVar(value=False)  # 资源按清单过滤、统计后写入spec
+        self.resource_include_var = tk.StringVar()  # 分号分隔的包含规则
+        self.resource_exclude_var = tk.StringVar(value="; ".join(DEFAULT_RESOURCE_EXCLUDES))  # 分号分隔的排除规则
+        self.resource_archive_var = tk.BooleanVar(value=False)  # 资源合并为程序旁边的归档，运行时按需读取
         
         # 初始化文件列表
-        self.resource_files = []
-        self.clean_files = []
+        self.resource_files = FileCollection()
+        self.clean_files = FileCollection()
+        self.clean_scanner = None
+        self.clean_scan_queue = queue.Queue()
         
         # 初始化日志队列
         self.log_queue = queue.Queue()
@@ -46,6 +71,7 @@ class PackApp:
         
         # 初始化线程
         self.pack_thread = None
+        self.pack_pipeline = None
         self.clean_thread = None
         
         # 创建界面
@@ -92,15 +118,15 @@ class PackApp:
         resource_frame = ttk.LabelFrame(self.settings_tab, text="额外资源文件")
         resource_frame.pack(fill="both", expand=True, padx=10, pady=5)
         
+        resource_filter_frame = ttk.Frame(resource_frame)
+        resource_filter_frame.pack(fill="x", padx=5, pady=(5, 0))
+        
         list_frame = ttk.Frame(resource_frame)
         list_frame.pack(fill="both", expand=True, padx=5, pady=5)
         
-        scrollbar = ttk.Scrollbar(list_frame)
-        scrollbar.pack(side="right", fill="y")
-        
-        self.resource_listbox = tk.Listbox(list_frame, height=8, yscrollcommand=scrollbar.set)
+        self.resource_listbox = VirtualList(list_frame, lambda: self.resource_files.visible, height=8)
         self.resource_listbox.pack(fill="both", expand=True)
-        scrollbar.config(command=self.resource_listbox.yview)
+        self._create_filter_entry(resource_filter_frame, self.resource_files, self.resource_listbox)
         
         button_frame = ttk.Frame(resource_frame)
         button_frame.pack(fill="x", padx=5, pady=5)
@@ -110,13 +136,42 @@ class PackApp:
         ttk.Button(button_frame, text="删除选中", command=self.remove_resource).pack(side="left", padx=5)
         ttk.Button(button_frame, text="清空列表", command=self.clear_resources).pack(side="left", padx=5)
         
+        rule_frame = ttk.Frame(resource_frame)
+        rule_frame.pack(fill="x", padx=5, pady=(0, 5))
+        
+        ttk.Checkbutton(rule_frame, text="资源清单", variable=self.resource_manifest_var).pack(side="left", padx=5)
+        ttk.Checkbutton(rule_frame, text="资源归档", variable=self.resource_archive_var).pack(side="left", padx=5)
+        ttk.Label(rule_frame, text="包含:").pack(side="left")
+        ttk.Entry(rule_frame, textvariable=self.resource_include_var, width=20).pack(side="left", padx=5)
+        ttk.Label(rule_frame, text="排除:").pack(side="left")
+        ttk.Entry(rule_frame, textvariable=self.resource_exclude_var).pack(side="left", fill="x", expand=True, padx=5)
+        
         option_frame = ttk.LabelFrame(self.settings_tab, text="打包选项")
         option_frame.pack(fill="x", padx=10, pady=5)
         
-        ttk.Radiobutton(option_frame, text="打包成单文件", variable=self.pack_option_var, value="single_file", command=self.update_options).pack(side="left", padx=10, pady=5)
-        ttk.Radiobutton(option_frame, text="打包成文件夹", variable=self.pack_option_var, value="single_dir", command=self.update_options).pack(side="left", padx=10, pady=5)
-        ttk.Radiobutton(option_frame, text="依次执行两种打包", variable=self.pack_option_var, value="both", command=self.update_options).pack(side="left", padx=10, pady=5)
-        ttk.Checkbutton(option_frame, text="启用UPX压缩", variable=self.enable_upx).pack(side="left", padx=10, pady=5)
+        # 选项较多，按打包方式、构建流程和UPX分行排列，避免窗口宽度不够时被截断
+        mode_frame = ttk.Frame(option_frame)
+        mode_frame.pack(fill="x", pady=(5, 0))
+        ttk.Radiobutton(mode_frame, text="打包成单文件", variable=self.pack_option_var, value="single_file", command=self.update_options).pack(side="left", padx=10)
+        ttk.Radiobutton(mode_frame, text="打包成文件夹", variable=self.pack_option_var, value="single_dir", command=self.update_options).pack(side="left", padx=10)
+        ttk.Radiobutton(mode_frame, text="依次执行两种打包", variable=self.pack_option_var, value="both", command=self.update_options).pack(side="left", padx=10)
+        ttk.Checkbutton(mode_frame, text="并行执行两种打包", variable=self.parallel_build_var).pack(side="left", padx=10)
+        
+        build_frame = ttk.Frame(option_frame)
+        build_frame.pack(fill="x", pady=5)
+        ttk.Checkbutton(build_frame, text="增量构建", variable=self.incremental_var).pack(side="left", padx=10)
+        ttk.Checkbutton(build_frame, text="构建缓存", variable=self.build_cache_var).pack(side="left", padx=10)
+        ttk.Checkbutton(build_frame, text="清洗源码", variable=self.strip_sources_var).pack(side="left", padx=10)
+        ttk.Checkbutton(build_frame, text="分析导入", variable=self.analyze_imports_var).pack(side="left", padx=10)
+        ttk.Checkbutton(build_frame, text="启动测试", variable=self.startup_bench_var).pack(side="left", padx=10)
+        ttk.Checkbutton(build_frame, text="产物分析", variable=self.analyze_size_var).pack(side="left", padx=10)
+        
+        upx_frame = ttk.Frame(option_frame)
+        upx_frame.pack(fill="x", pady=(0, 5))
+        ttk.Checkbutton(upx_frame, text="启用UPX压缩", variable=self.enable_upx).pack(side="left", padx=10)
+        ttk.Checkbutton(upx_frame, text="选择性UPX", variable=self.selective_upx_var).pack(side="left", padx=10)
+        ttk.Label(upx_frame, text="UPX排除:").pack(side="left")
+        ttk.Entry(upx_frame, textvariable=self.upx_exclude_var).pack(side="left", fill="x", expand=True, padx=5)
         
         action_frame = ttk.Frame(self.settings_tab)
         action_frame.pack(fill="x", padx=10, pady=10)
@@ -149,6 +204,10 @@ class PackApp:
         self.progress_bar = ttk.Progressbar(progress_frame, variable=self.progress_var, maximum=100, length=400)
         self.progress_bar.pack(side="left", padx=5, fill="x", expand=True)
         
+        # 当前构建阶段、阶段已用时间和预计剩余时间
+        self.phase_var = tk.StringVar()
+        ttk.Label(log_frame, textvariable=self.phase_var).pack(anchor="w", padx=10)
+        
         pack_control_frame = ttk.Frame(log_frame)
         pack_control_frame.pack(fill="x", padx=5, pady=5)
         
@@ -158,6 +217,12 @@ class PackApp:
         self.clear_log_button = ttk.Button(pack_control_frame, text="清空日志", command=self.clear_log)
         self.clear_log_button.pack(side="right", padx=5)
         
+        # 日志控件只保留最近的日志，完整日志写入文件，可在这里搜索或打开
+        self.log_search_var = tk.StringVar()
+        ttk.Entry(pack_control_frame, textvariable=self.log_search_var, width=20).pack(side="left", padx=5)
+        ttk.Button(pack_control_frame, text="搜索完整日志", command=self.search_full_log).pack(side="left", padx=5)
+        ttk.Button(pack_control_frame, text="打开完整日志", command=self.open_full_log).pack(side="left", padx=5)
+        
         # 清洗代码标签页内容
         clean_frame = ttk.Frame(self.clean_tab)
         clean_frame.pack(fill="both", expand=True, padx=10, pady=5)
@@ -165,15 +230,16 @@ class PackApp:
         file_frame = ttk.LabelFrame(clean_frame, text="选择要处理的文件")
         file_frame.pack(fill="both", expand=True, padx=5, pady=5)
         
+        clean_filter_frame = ttk.Frame(file_frame)
+        clean_filter_frame.pack(fill="x", padx=5, pady=(5, 0))
+        
         list_frame = ttk.Frame(file_frame)
         list_frame.pack(fill="both", expand=True, padx=5, pady=5)
         
-        clean_scrollbar = ttk.Scrollbar(list_frame)
-        clean_scrollbar.pack(side="right", fill="y")
-        
-        self.clean_listbox = tk.Listbox(list_frame, height=8, yscrollcommand=clean_scrollbar.set)
+        # 虚拟列表只渲染可见的行，文件再多也不会卡顿
+        self.clean_listbox = VirtualList(list_frame, lambda: self.clean_files.visible, height=8)
         self.clean_listbox.pack(fill="both", expand=True)
-        clean_scrollbar.config(command=self.clean_listbox.yview)
+        self._create_filter_entry(clean_filter_frame, self.clean_files, self.clean_listbox)
         
         file_button_frame = ttk.Frame(file_frame)
         file_button_frame.pack(fill="x", padx=5, pady=5)
@@ -191,11 +257,26 @@ class PackApp:
         self.remove_single_var = tk.BooleanVar(value=True)
         self.remove_multi_var = tk.BooleanVar(value=True)
         self.remove_empty_var = tk.BooleanVar(value=True)
+        self.incremental_clean_var = tk.BooleanVar(value=False)  # 只处理内容有变化的文件
         
         # 添加清理选项复选框
         ttk.Checkbutton(option_frame, text="删除单行注释", variable=self.remove_single_var).pack(side="left", padx=10, pady=5)
         ttk.Checkbutton(option_frame, text="删除多行注释", variable=self.remove_multi_var).pack(side="left", padx=10, pady=5)
         ttk.Checkbutton(option_frame, text="删除多余空行", variable=self.remove_empty_var).pack(side="left", padx=10, pady=5)
+        ttk.Checkbutton(option_frame, text="增量清洗", variable=self.incremental_clean_var).pack(side="left", padx=10, pady=5)
+        
+        # 输出方式
+        output_frame = ttk.LabelFrame(clean_frame, text="输出方式")
+        output_frame.pack(fill="x", padx=5, pady=5)
+        
+        self.clean_output_mode_var = tk.StringVar(value=OUTPUT_SIBLING)
+        self.clean_output_dir = tk.StringVar()
+        ttk.Radiobutton(output_frame, text="同目录_no_comments文件", variable=self.clean_output_mode_var, value=OUTPUT_SIBLING).pack(side="left", padx=10, pady=5)
+        ttk.Radiobutton(output_frame, text="镜像目录", variable=self.clean_output_mode_var, value=OUTPUT_MIRROR).pack(side="left", padx=10, pady=5)
+        ttk.Entry(output_frame, textvariable=self.clean_output_dir, width=24).pack(side="left", pady=5)
+        ttk.Button(output_frame, text="浏览...", command=self.select_clean_output_dir).pack(side="left", padx=5, pady=5)
+        ttk.Radiobutton(output_frame, text="原地替换", variable=self.clean_output_mode_var, value=OUTPUT_IN_PLACE).pack(side="left", padx=10, pady=5)
+        ttk.Radiobutton(output_frame, text="仅预览差异", variable=self.clean_output_mode_var, value=OUTPUT_MEMORY).pack(side="left", padx=10, pady=5)
         
         log_frame = ttk.LabelFrame(clean_frame, text="处理日志")
         log_frame.pack(fill="both", expand=True, padx=5, pady=5)
@@ -213,7 +294,8 @@ class PackApp:
         clean_control_frame = ttk.Frame(log_frame)
         clean_control_frame.pack(fill="x", padx=5, pady=5)
         
-        ttk.Button(clean_control_frame, text="开始处理", command=self.start_clean_process).pack(side="right", padx=5)
+        self.clean_button = ttk.Button(clean_control_frame, text="开始处理", command=self.start_clean_process)
+        self.clean_button.pack(side="right", padx=5)
         self.clear_clean_log_button = ttk.Button(clean_control_frame, text="清空日志", command=self.clear_clean_log)
         self.clear_clean_log_button.pack(side="right", padx=5)
         
@@ -223,6 +305,10 @@ class PackApp:
         # 设置默认标签页为设置页
         self.tab_control.select(self.settings_tab)
         
+        # 每个日志面板只有一个刷新循环，批量插入队列中的日志
+        self.log_pane = LogPane(self.root, self.log_text, self.log_queue)
+        self.clean_log_pane = LogPane(self.root, self.clean_log_text, self.clean_log_queue)
+        
         # 启动日志更新
         self.update_log()
         
@@ -273,15 +359,27 @@ class PackApp:
     def select_output_dir(self):
         self._select_directory("选择输出目录", self.output_dir.set)
     
-    def _add_to_list(self, listbox, items_list, items, title="选择资源文件", filetypes=None):
-        """通用方法：添加项目到列表"""
-        if not filetypes:
-            filetypes = [("所有文件", "*.*")]
-            
-        for item in items:
-            if item not in items_list:
-                items_list.append(item)
-                listbox.insert(tk.END, item)
+    def _create_filter_entry(self, parent, collection, listbox):
+        """在列表上方添加过滤输入框，输入时只显示包含关键字的项目"""
+        filter_var = tk.StringVar()
+        
+        def on_filter_changed(*args):
+            collection.set_filter(filter_var.get())
+            listbox.clear_selection()
+        
+        filter_var.trace_add("write", on_filter_changed)
+        ttk.Label(parent, text="过滤:").pack(side="left")
+        ttk.Entry(parent, textvariable=filter_var).pack(side="left", fill="x", expand=True, padx=5)
+    
+    def _add_to_list(self, listbox, collection, items):
+        """通用方法：添加项目到列表，已存在的项目跳过"""
+        if collection.add(items):
+            listbox.refresh()
+    
+    def _remove_selected(self, listbox, collection):
+        """通用方法：删除列表中选中的项目"""
+        collection.remove(listbox.selected_items())
+        listbox.clear_selection()
     
     def add_resource_file(self):
         file_paths = filedialog.askopenfilenames(
@@ -294,14 +392,11 @@ class PackApp:
         self._select_directory("选择资源文件夹", lambda dir_path: self._add_to_list(self.resource_listbox, self.resource_files, [dir_path]))
     
     def remove_resource(self):
-        selected_indices = self.resource_listbox.curselection()
-        for index in sorted(selected_indices, reverse=True):
-            self.resource_listbox.delete(index)
-            del self.resource_files[index]
+        self._remove_selected(self.resource_listbox, self.resource_files)
     
     def clear_resources(self):
-        self.resource_listbox.delete(0, tk.END)
         self.resource_files.clear()
+        self.resource_listbox.clear_selection()
     
     def _get_root_directory(self):
         """获取根目录"""
@@ -309,16 +404,7 @@ class PackApp:
     
     def clean_build(self, show_message=True):
         # 清理构建文件
-        root_dir = self._get_root_directory()
-        for dir_name in ["build", "dist", "__pycache__"]:
-            dir_path = os.path.join(root_dir, dir_name)
-            if os.path.exists(dir_path):
-                shutil.rmtree(dir_path, ignore_errors=True)
-        
-        # 清理.spec文件
-        for file in os.listdir(root_dir):
-            if file.endswith(".spec"):
-                os.remove(os.path.join(root_dir, file))
+        clean_build(self._get_root_directory())
         
         if show_message:
             messagebox.showinfo("清理完成", "构建文件已清理完成！")
@@ -328,35 +414,7 @@ class PackApp:
         只清理build文件夹和spec文件，保留dist文件夹
         :param show_log: 是否在日志中显示清理信息
         """
-        try:
-            root_dir = self._get_root_directory()
-            
-            # 清理文件夹和文件
-            clean_items = [
-                ("build", "build文件夹"),
-                ("__pycache__", "__pycache__文件夹")
-            ]
-            
-            for dir_name, display_name in clean_items:
-                dir_path = os.path.join(root_dir, dir_name)
-                if os.path.exists(dir_path):
-                    shutil.rmtree(dir_path, ignore_errors=True)
-                    if show_log:
-                        self.update_log(f"已清理{display_name}: {dir_path}\n")
-            
-            # 清理.spec文件
-            for file in os.listdir(root_dir):
-                if file.endswith(".spec"):
-                    spec_file = os.path.join(root_dir, file)
-                    os.remove(spec_file)
-                    if show_log:
-                        self.update_log(f"已清理spec文件: {spec_file}\n")
-            
-            return True
-        except Exception as e:
-            if show_log:
-                self.update_log(f"清理构建文件时出错: {str(e)}\n")
-            return False
+        return clean_build_files_only(self._get_root_directory(), log=self.update_log if show_log else None)
     
     def validate_inputs(self):
         # 验证输入
@@ -387,11 +445,18 @@ class PackApp:
         # 禁用开始按钮，防止重复点击
         self._set_button_state("开始打包", "disabled")
         
-        # 清理之前的构建
-        self.clean_build(show_message=True)
+        # 清理之前的构建（增量构建时保留工作目录）
+        if not self.incremental_var.get():
+            self.clean_build(show_message=True)
         
-        # 清空日志
+        # 清空日志，本次构建的完整日志写入新的日志文件
         self.clear_log()
+        log_name = self.output_name.get() or os.path.splitext(os.path.basename(self.main_script_path.get()))[0]
+        try:
+            self.log_pane.open_log_file(new_log_file_path(self._get_root_directory(), log_name))
+            self.update_log(f"完整日志: {self.log_pane.log_file}\n")
+        except OSError as e:
+            self.update_log(f"无法创建日志文件: {str(e)}\n")
         
         # 切换到日志标签页
         self.tab_control.select(self.log_tab)
@@ -410,298 +475,101 @@ class PackApp:
         self.pack_thread.daemon = True
         self.pack_thread.start()
     
-    def _pack_process(self):
-        try:
-            # 清理之前的构建文件，但不显示弹窗
-            self.clean_build(show_message=False)
-            
-            # 准备资源文件和图标参数
-            resources = []
-            for item in self.resource_listbox.get(0, tk.END):
-                resources.append(item)
-                
-            icon_param = ""
-            # 如果用户在工具中设置了图标，优先使用用户设置的图标
-            if self.icon_path.get() and os.path.exists(self.icon_path.get()):
-                icon_param = f"--icon={self.icon_path.get()}"
-            else:
-                # 如果用户没有设置图标，尝试从代码中检测图标设置
-                main_script = self.main_script_path.get()
-                if main_script and os.path.exists(main_script):
-                    detected_icon = self._detect_icon_from_code(main_script, resources)
-                    if detected_icon and os.path.exists(detected_icon):
-                        icon_param = f"--icon={detected_icon}"
-                        self.update_log(f"检测到代码中设置的图标: {detected_icon}\n")
-            
-            # 根据选择的选项执行打包
-            if self.pack_option_var.get() == "single_file":
-                self._build_single_file(resources, icon_param)
-            elif self.pack_option_var.get() == "single_dir":
-                self._build_folder(resources, icon_param)
-            elif self.pack_option_var.get() == "both":
-                self._build_single_file(resources, icon_param)
-                self._build_folder(resources, icon_param)
-                
-            self.update_log("打包完成！")
-            
-            # 自动清理build文件夹和spec文件
-            self.update_log("正在清理多余的构建文件...\n")
-            self.clean_build_files_only(show_log=True)
-            self.update_log("构建文件清理完成。\n")
-            
-            # 打开输出目录
-            try:
-                # 获取主程序文件的目录
-                main_script_dir = os.path.dirname(os.path.abspath(self.main_script_path.get()))
-                dist_dir = os.path.join(main_script_dir, "dist")
-                
-                # 在控制台中执行命令打开目录
-                if sys.platform == "win32":
-                    subprocess.run(f"explorer {dist_dir}", shell=True)
-                # 在macOS上使用open打开目录
-                elif sys.platform == "darwin":
-                    subprocess.run(f"open {dist_dir}", shell=True)
-                # 在Linux上使用xdg-open打开目录
-                else:
-                    subprocess.run(f"xdg-open {dist_dir}", shell=True)
-                    
-                self.update_log(f"已打开输出目录: {dist_dir}\n")
-            except Exception as e:
-                self.update_log(f"打开输出目录失败: {str(e)}\n")
-            
-            # 重新启用开始按钮
-            self._set_button_state("开始打包", "normal")
-        except Exception as e:
-            self.update_log(f"打包失败: {str(e)}")
-            
-            # 重新启用开始按钮
-            self._set_button_state("开始打包", "normal")
-    
-    def _prepare_resource_params(self, resources):
-        """准备资源文件参数"""
-        resource_params = []
-        for resource in resources:
-            if os.path.exists(resource):
-                root_dir = os.path.dirname(os.path.abspath(self.main_script_path.get()))
-                rel_path = os.path.relpath(resource, root_dir)
-                separator = ";" if sys.platform == "win32" else ":"
-                if os.path.isfile(resource):
-                    dest_path = os.path.dirname(rel_path)
-                else:
-                    dest_path = os.path.basename(rel_path) if rel_path != "." else ""
-                if not dest_path:
-                    dest_path = "."
-                resource_path = resource if ' ' not in resource else f'"{resource}"'
-                resource_params.extend(["--add-data", f"{resource_path}{separator}{dest_path}"])
-        return resource_params
-    
-    def _build_common_params(self, build_type, icon_param):
-        """构建PyInstaller命令的通用参数"""
-        # 获取主程序文件的目录
-        main_script_dir = os.path.dirname(os.path.abspath(self.main_script_path.get()))
-        dist_dir = os.path.join(main_script_dir, "dist")
-        
-        # 构建PyInstaller命令
-        cmd = [
-            "python",  # 使用系统Python环境
-            "-m", "PyInstaller",
-            build_type,  # "--onefile" 或 "--onedir"
-            "--windowed",
-            "--collect-all=tkinter",
-            f"--name={self.output_name.get()}",
-            f"--distpath={dist_dir}"
-        ]
-        
-        if not self.enable_upx.get():
-            cmd.append("--noupx")
-        
-        if icon_param:
-            cmd.append(icon_param)
-        
-        return cmd
-    
-    def _build_single_file(self, resources, icon_param):
-        self.log_queue.put("开始打包成单文件...\n")
-        
-        # 准备资源文件参数
-        resource_params = self._prepare_resource_params(resources)
-        
-        # 构建PyInstaller命令
-        cmd = self._build_common_params("--onefile", icon_param)
-        cmd.extend(resource_params)
-        cmd.append(self.main_script_path.get())
-        
-        # 执行命令
-        self._execute_command(cmd)
-        
-        if not self.stop_pack:
-            self.log_queue.put("单文件打包完成\n")
-            self.progress_var.set(50 if self.pack_option_var.get() == "both" else 100)
-    
-    def _build_folder(self, resources, icon_param):
-        self.log_queue.put("开始打包成文件夹...\n")
-        
-        # 准备资源文件参数
-        resource_params = self._prepare_resource_params(resources)
-        
-        # 构建PyInstaller命令
-        cmd = self._build_common_params("--onedir", icon_param)
-        cmd.extend(resource_params)
-        cmd.append(self.main_script_path.get())
-        
-        # 执行命令
-        self._execute_command(cmd)
-        
-        if not self.stop_pack:
-            self.log_queue.put("文件夹打包完成\n")
-            self.progress_var.set(100)
+    def _create_pack_config(self):
+        """根据界面上的设置创建打包配置"""
+        return PackConfig(
+            main_script=self.main_script_path.get(),
+            icon_path=self.icon_path.get(),
+            output_name=self.output_name.get(),
+            resources=list(self.resource_files),
+            pack_option=self.pack_option_var.get(),
+            enable_upx=self.enable_upx.get(),
+            selective_upx=self.selective_upx_var.get(),
+            upx_exclude=self._split_patterns(self.upx_exclude_var.get()),
+            parallel_build=self.parallel_build_var.get(),
+            incremental=self.incremental_var.get(),
+            build_cache=self.build_cache_var.get(),
+            strip_sources=self.strip_sources_var.get(),
+            analyze_imports=self.analyze_imports_var.get(),
+            resource_manifest=self.resource_manifest_var.get(),
+            resource_include=self._split_patterns(self.resource_include_var.get()),
+            resource_exclude=self._split_patterns(self.resource_exclude_var.get()),
+            resource_archive=self.resource_archive_var.get(),
+            startup_runs=STARTUP_RUNS if self.startup_bench_var.get() else 0,
+            analyze_size=self.analyze_size_var.get(),
+            open_output_dir=True
+        )
     
-    def _detect_icon_from_code(self, main_script, resources):
-        """
-        从代码中检测图标设置
-        :param main_script: 主程序文件路径
-        :param resources: 资源文件列表
-        :return: 检测到的图标文件路径，如果没有检测到则返回None
-        """
-        try:
-            # 读取主程序文件内容
-            with open(main_script, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # 查找可能的图标文件路径
-            icon_patterns = [
-                # tkinter iconbitmap
-                r'root\.iconbitmap\(["\']([^"\']+\.ico)["\']\)',
-                r'root\.iconbitmap\(["\']([^"\']+\.png)["\']\)',
-                # tkinter wm_iconbitmap
-                r'root\.wm_iconbitmap\(["\']([^"\']+\.ico)["\']\)',
-                r'root\.wm_iconbitmap\(["\']([^"\']+\.png)["\']\)',
-                # 其他可能的图标设置
-                r'icon\s*=\s*["\']([^"\']+\.ico)["\']',
-                r'icon\s*=\s*["\']([^"\']+\.png)["\']',
-                r'application\.icon\s*=\s*["\']([^"\']+\.ico)["\']',
-                r'application\.icon\s*=\s*["\']([^"\']+\.png)["\']',
-            ]
-            
-            # 检查代码中的图标设置
-            for pattern in icon_patterns:
-                matches = re.findall(pattern, content)
-                if matches:
-                    icon_path = matches[0]
-                    # 如果是相对路径，转换为绝对路径
-                    if not os.path.isabs(icon_path):
-                        main_script_dir = os.path.dirname(os.path.abspath(main_script))
-                        abs_icon_path = os.path.join(main_script_dir, icon_path)
-                        if os.path.exists(abs_icon_path):
-                            return abs_icon_path
-                    elif os.path.exists(icon_path):
-                        return icon_path
-            
-            # 检查资源文件中是否有图标文件
-            main_script_dir = os.path.dirname(os.path.abspath(main_script))
-            for resource in resources:
-                if os.path.exists(resource):
-                    # 如果是.ico文件，直接返回
-                    if resource.lower().endswith('.ico'):
-                        return resource
-                    # 如果是目录，检查目录中是否有.ico文件
-                    elif os.path.isdir(resource):
-                        for file in os.listdir(resource):
-                            if file.lower().endswith('.ico'):
-                                return os.path.join(resource, file)
-            
-            # 检查主程序文件所在目录中是否有.ico文件
-            if os.path.isdir(main_script_dir):
-                for file in os.listdir(main_script_dir):
-                    if file.lower().endswith('.ico'):
-                        return os.path.join(main_script_dir, file)
-            
-            # 检查常见的图标文件名
-            common_icon_names = ['icon.ico', 'app.ico', 'main.ico', 'favicon.ico']
-            for icon_name in common_icon_names:
-                icon_path = os.path.join(main_script_dir, icon_name)
-                if os.path.exists(icon_path):
-                    return icon_path
-            
-            return None
-        except Exception as e:
-            self.update_log(f"检测图标时出错: {str(e)}\n")
-            return None
+    @staticmethod
+    def _split_patterns(text):
+        """把分号分隔的规则拆分为列表"""
+        return [pattern.strip() for pattern in text.split(";") if pattern.strip()]
     
-    def _execute_command(self, cmd):
+    def _pack_process(self):
         try:
-            # 记录执行的命令（用于日志显示）
-            cmd_str = ' '.join(cmd)
-            self.log_queue.put(f"执行命令: {cmd_str}\n")
-            
-            # 直接在Python环境中执行命令
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1,  # 行缓冲
-                universal_newlines=True
+            self.pack_pipeline = PackPipeline(
+                self._create_pack_config(),
+                log=self.log_pane.write,
+                progress=self.progress_var.set,
+                status=self.phase_var.set
             )
-            
-            # 实时读取输出并更新到日志
-            while True:
-                output = process.stdout.readline()
-                if output == '' and process.poll() is not None:
-                    break
-                if output:
-                    self.log_queue.put(output.strip() + '\n')
-                    
-                    # 更新进度条（简单估算）
-                    if "INFO" in output or "Building" in output:
-                        current_progress = self.progress_var.get()
-                        if current_progress < 90:
-                            self.progress_var.set(min(current_progress + 5, 90))
-            
-            # 获取返回码
-            return_code = process.poll()
-            
-            if return_code != 0:
-                raise subprocess.CalledProcessError(return_code, cmd)
-            
-            # 更新进度条到100%
-            if not self.stop_pack:
-                self.progress_var.set(100)
-                
+            if self.stop_pack:
+                self.pack_pipeline.stop()
+            self.pack_pipeline.run()
         except Exception as e:
-            if not self.stop_pack:
-                self.log_queue.put(f"执行命令时出错: {str(e)}\n")
-                raise e
-    
-    def _update_text_widget(self, text_widget, log_queue, message=None):
-        """通用方法：更新文本控件"""
-        # 如果提供了消息，将其添加到队列中
-        if message is not None:
-            log_queue.put(message)
-        
-        # 从队列中获取日志并更新到文本框
-        try:
-            while True:
-                line = log_queue.get_nowait()
-                text_widget.insert(tk.END, line)
-                text_widget.see(tk.END)  # 自动滚动到底部
-        except queue.Empty:
-            pass
+            self.update_log(f"打包失败: {str(e)}")
         
-        # 定期更新
-        self.root.after(100, lambda: self._update_text_widget(text_widget, log_queue))
+        # 重新启用开始按钮，打包已结束，停止按钮不再可用
+        self.log_pane.close_log_file()
+        self._set_button_state("开始打包", "normal")
+        self.stop_button.config(state="disabled")
     
     def update_log(self, message=None):
-        self._update_text_widget(self.log_text, self.log_queue, message)
+        """写入一条打包日志；日志只进入队列，由日志面板的刷新循环统一显示，可在任意线程调用"""
+        if message is not None:
+            self.log_pane.write(message)
+        self.log_pane.start()
     
     def stop_pack_process(self):
         self.stop_pack = True
-        self.log_queue.put("正在停止打包...\n")
+        if self.pack_pipeline:
+            self.pack_pipeline.stop()
+        self.update_log("正在停止打包...\n")
         self.stop_button.config(state="disabled")
     
     def clear_log(self):
-        self.log_text.delete(1.0, tk.END)
+        self.log_pane.clear()
         self.progress_var.set(0)
+        self.phase_var.set("")
+    
+    def search_full_log(self):
+        """在本次构建的完整日志文件中搜索，结果显示在新窗口中"""
+        keyword = self.log_search_var.get()
+        if not keyword:
+            return
+        if not self.log_pane.log_file:
+            messagebox.showinfo("提示", "还没有完整日志，请先执行一次打包")
+            return
+        results = self.log_pane.search(keyword)
+        
+        window = tk.Toplevel(self.root)
+        window.title(f"搜索结果: {keyword}（{len(results)} 条）")
+        window.geometry("700x400")
+        result_scrollbar = ttk.Scrollbar(window)
+        result_scrollbar.pack(side="right", fill="y")
+        result_text = tk.Text(window, wrap=tk.NONE, yscrollcommand=result_scrollbar.set)
+        result_text.pack(fill="both", expand=True)
+        result_scrollbar.config(command=result_text.yview)
+        result_text.insert(tk.END, "".join(f"{line_number}: {line}\n" for line_number, line in results) or "没有匹配的日志\n")
+        result_text.config(state="disabled")
+    
+    def open_full_log(self):
+        """用系统默认程序打开完整日志文件"""
+        if not self.log_pane.log_file or not os.path.exists(self.log_pane.log_file):
+            messagebox.showinfo("提示", "还没有完整日志，请先执行一次打包")
+            return
+        self.log_pane.flush_log_file()
+        open_path(self.log_pane.log_file)
     
     def add_clean_file(self):
         file_paths = filedialog.askopenfilenames(
@@ -712,339 +580,111 @@ class PackApp:
     
     def add_clean_folder(self):
         def on_folder_selected(dir_path):
-            # 遍历文件夹中的所有.py文件
-            py_files = []
-            for root, dirs, files in os.walk(dir_path):
-                for file in files:
-                    if file.endswith(".py"):
-                        file_path = os.path.join(root, file)
-                        py_files.append(file_path)
-            self._add_to_list(self.clean_listbox, self.clean_files, py_files)
+            # 后台线程并行扫描，找到的文件分批放入队列，由界面线程定时取出
+            if self.clean_scanner:
+                self.clean_scanner.stop()
+            # 每批文件带上所属的扫描器，取出时丢弃已停止或被新扫描取代的批次
+            scanner = FolderScanner(dir_path, on_chunk=lambda chunk: self.clean_scan_queue.put((scanner, chunk)))
+            self.clean_scanner = scanner
+            self.clean_log_queue.put(f"正在扫描文件夹: {dir_path}\n")
+            
+            def scan():
+                start_time = time.time()
+                file_count = scanner.run()
+                if not scanner.stop_requested:
+                    self.clean_log_queue.put(f"扫描完成: 找到 {file_count} 个Python文件，用时 {time.time() - start_time:.1f}秒\n")
+            
+            scan_thread = threading.Thread(target=scan, daemon=True)
+            scan_thread.start()
+            self._drain_clean_scan(scan_thread)
         
         self._select_directory("选择要处理的文件夹", on_folder_selected)
     
+    def _drain_clean_scan(self, scan_thread):
+        """把扫描到的文件批量加入列表，扫描结束且队列取空后停止"""
+        chunks = []
+        try:
+            while True:
+                scanner, chunk = self.clean_scan_queue.get_nowait()
+                if scanner is self.clean_scanner and not scanner.stop_requested:
+                    chunks.extend(chunk)
+        except queue.Empty:
+            pass
+        if chunks:
+            self._add_to_list(self.clean_listbox, self.clean_files, chunks)
+        if scan_thread.is_alive() or not self.clean_scan_queue.empty():
+            self.root.after(100, self._drain_clean_scan, scan_thread)
+    
     def remove_clean_file(self):
-        selected_indices = self.clean_listbox.curselection()
-        for index in sorted(selected_indices, reverse=True):
-            self.clean_listbox.delete(index)
-            del self.clean_files[index]
+        self._remove_selected(self.clean_listbox, self.clean_files)
     
     def clear_clean_files(self):
-        self.clean_listbox.delete(0, tk.END)
+        if self.clean_scanner:
+            self.clean_scanner.stop()
+            self.clean_scanner = None
         self.clean_files.clear()
+        self.clean_listbox.clear_selection()
+    
+    def select_clean_output_dir(self):
+        self._select_directory("选择镜像输出目录", self.clean_output_dir.set)
     
     def start_clean_process(self):
         if not self.clean_files:
             messagebox.showerror("错误", "请先添加要处理的文件！")
             return
         
+        output_mode = self.clean_output_mode_var.get()
+        if output_mode == OUTPUT_MIRROR and not self.clean_output_dir.get():
+            messagebox.showerror("错误", "请先选择镜像输出目录！")
+            return
+        if output_mode == OUTPUT_IN_PLACE and not messagebox.askyesno(
+                "确认", f"将直接用清洗结果替换 {len(self.clean_files)} 个源文件，且无法撤销。是否继续？"):
+            return
+        
         # 清空日志
         self.clear_clean_log()
         
+        # 处理结束前禁用开始按钮
+        self.clean_button.config(state="disabled")
+        
         # 在新线程中执行处理
         self.clean_thread = threading.Thread(target=self._clean_process)
         self.clean_thread.daemon = True
         self.clean_thread.start()
     
     def _clean_process(self):
-        total_files = len(self.clean_files)
-        if total_files == 0:
-            self.clean_log_queue.put("没有文件需要处理\n")
-            return
-            
-        self.clean_log_queue.put(f"开始处理 {total_files} 个文件...\n")
-        
-        processed_count = 0
-        success_count = 0
-        error_count = 0
-        
-        # 获取用户选择的清理选项
-        remove_single = hasattr(self, 'remove_single_var') and self.remove_single_var.get()
-        remove_multi = hasattr(self, 'remove_multi_var') and self.remove_multi_var.get()
-        remove_empty = hasattr(self, 'remove_empty_var') and self.remove_empty_var.get()
-        
-        # 记录开始时间
-        import time
-        start_time = time.time()
-        
-        for file_path in self.clean_files:
-            try:
-                # 更新进度
-                processed_count += 1
-                progress = int((processed_count / total_files) * 100)
-                self.clean_log_queue.put(f"[{progress}%] 正在处理: {file_path}\n")
-                
-                # 检查文件是否存在
-                if not os.path.exists(file_path):
-                    self.clean_log_queue.put(f"错误: 文件不存在 - {file_path}\n")
-                    error_count += 1
-                    continue
-                
-                # 检查文件是否为Python文件
-                if not file_path.lower().endswith('.py'):
-                    self.clean_log_queue.put(f"警告: 跳过非Python文件 - {file_path}\n")
-                    continue
-                
-                # 获取文件大小，用于日志记录
-                file_size = os.path.getsize(file_path)
-                self.clean_log_queue.put(f"文件大小: {file_size / 1024:.2f} KB\n")
-                
-                # 调用重构后的方法，删除注释和多余空行
-                new_file_path = self.remove_comments_from_file(
-                    file_path,
-                    remove_single,  # 删除单行注释
-                    remove_multi,  # 删除多行注释
-                    remove_empty   # 删除多余空行
-                )
-                
-                if new_file_path:
-                    # 计算文件大小变化
-                    if os.path.exists(new_file_path):
-                        new_file_size = os.path.getsize(new_file_path)
-                        size_reduction = ((file_size - new_file_size) / file_size) * 100
-                        self.clean_log_queue.put(f"处理完成: {new_file_path} (大小减少: {size_reduction:.1f}%)\n")
-                    else:
-                        self.clean_log_queue.put(f"处理完成: {new_file_path}\n")
-                    success_count += 1
-                else:
-                    self.clean_log_queue.put(f"处理失败: {file_path}\n")
-                    error_count += 1
-                    
-            except Exception as e:
-                self.clean_log_queue.put(f"处理出错: {file_path} - {str(e)}\n")
-                error_count += 1
-                
-            # 添加短暂延迟，避免UI卡顿
-            import time
-            time.sleep(0.1)
-        
-        # 计算总耗时
-        elapsed_time = time.time() - start_time
-        minutes, seconds = divmod(elapsed_time, 60)
-        
-        # 输出总结信息
-        self.clean_log_queue.put(f"\n处理完成！\n")
-        self.clean_log_queue.put(f"总文件数: {total_files}\n")
-        self.clean_log_queue.put(f"成功处理: {success_count}\n")
-        self.clean_log_queue.put(f"处理失败: {error_count}\n")
-        self.clean_log_queue.put(f"总耗时: {int(minutes)}分{int(seconds)}秒\n")
-        
-        # 如果有错误，提供错误总结
-        if error_count > 0:
-            self.clean_log_queue.put(f"\n注意: 有 {error_count} 个文件处理失败，请检查上述错误信息\n")
-    
-    def remove_comments_from_file(self, file_path, remove_single, remove_multi, remove_empty):
-        """
-        使用AST和tokenize模块智能删除Python文件中的注释，保留代码结构和缩进
-        结合正则表达式和AST分析，提高注释删除的准确性和效率
-        """
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                source_code = file.read()
-            
-            # 使用AST模块解析代码结构
-            import ast
-            import io
-            import tokenize
-            
-            # 首先使用正则表达式删除多行注释（'''或"""包围的内容）
-            # 这样可以避免AST解析时将文档字符串识别为节点
-            if remove_multi:
-                # 使用非贪婪匹配，避免匹配到字符串中的三引号
-                pattern = r'("""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\')'
-                # 但要保留文档字符串（在模块、类或函数定义后的第一个字符串）
-                # 所以我们先找到所有文档字符串的位置
-                
-                # 解析AST树，找到所有文档字符串的位置
-                try:
-                    tree = ast.parse(source_code)
-                    docstring_positions = set()
-                    
-                    # 遍历AST树，找到所有有文档字符串的节点
-                    for node in ast.walk(tree):
-                        if (isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)) and 
-                            ast.get_docstring(node) is not None):
-                            # 获取文档字符串的起始和结束行号
-                            docstring = ast.get_docstring(node)
-                            # 文档字符串通常在节点定义的下一行开始
-                            doc_start_line = node.lineno + 1 if hasattr(node, 'lineno') else 1
-                            # 计算文档字符串的行数
-                            doc_lines = docstring.count('\n') + 1
-                            doc_end_line = doc_start_line + doc_lines - 1
-                            docstring_positions.add((doc_start_line, doc_end_line))
-                except SyntaxError:
-                    # 如果AST解析失败，则不保留任何文档字符串
-                    docstring_positions = set()
-                
-                # 分割源代码为行
-                lines = source_code.split('\n')
-                new_lines = []
-                i = 0
-                
-                while i < len(lines):
-                    line = lines[i]
-                    # 检查当前行是否是文档字符串的开始
-                    is_docstring_start = False
-                    docstring_end_line = i
-                    
-                    for start, end in docstring_positions:
-                        if i + 1 == start:  # 行号从1开始，列表索引从0开始
-                            is_docstring_start = True
-                            docstring_end_line = end - 1  # 转换为0-based索引
-                            break
-                    
-                    if is_docstring_start:
-                        # 保留文档字符串
-                        while i <= docstring_end_line and i < len(lines):
-                            new_lines.append(lines[i])
-                            i += 1
-                    else:
-                        # 检查是否是多行注释的开始
-                        if '"""' in line or "'''" in line:
-                            # 找到三引号的开始和结束位置
-                            triple_single_start = line.find("'''")
-                            triple_double_start = line.find('"""')
-                            
-                            # 确定使用的是哪种三引号
-                            if triple_single_start != -1 and (triple_double_start == -1 or triple_single_start < triple_double_start):
-                                quote_type = "'''"
-                                start_pos = triple_single_start
-                            else:
-                                quote_type = '"""'
-                                start_pos = triple_double_start
-                            
-                            # 检查三引号是否在同一行结束
-                            end_pos = line.find(quote_type, start_pos + 3)
-                            if end_pos != -1:
-                                # 同一行开始和结束，删除这部分
-                                line = line[:start_pos] + line[end_pos + 3:]
-                                new_lines.append(line)
-                            else:
-                                # 多行注释，跳过直到找到结束的三引号
-                                i += 1
-                                found_end = False
-                                while i < len(lines):
-                                    if quote_type in lines[i]:
-                                        # 找到结束的三引号
-                                        end_pos = lines[i].find(quote_type)
-                                        # 保留结束三引号之后的内容
-                                        remaining_content = lines[i][end_pos + 3:]
-                                        if remaining_content.strip():
-                                            new_lines.append(remaining_content)
-                                        found_end = True
-                                        break
-                                    i += 1
-                                
-                                if not found_end:
-                                    # 没有找到结束的三引号，保留原始行
-                                    new_lines.append(line)
-                        else:
-                            new_lines.append(line)
-                        i += 1
-                
-                # 重新组合源代码
-                source_code = '\n'.join(new_lines)
-            
-            # 使用tokenize模块处理单行注释和格式化
-            source_buffer = io.StringIO(source_code)
-            tokens = list(tokenize.generate_tokens(source_buffer.readline))
-            
-            # 处理token，移除单行注释
-            processed_tokens = []
-            for token in tokens:
-                token_type = token[0]
-                token_string = token[1]
-                
-                # 跳过单行注释
-                if token_type == tokenize.COMMENT and remove_single:
-                    continue
-                
-                # 保留其他token
-                processed_tokens.append(token)
-            
-            # 重建源代码，保留原始格式
-            output_lines = []
-            current_line = 1
-            current_col = 0
-            line_buffer = []
-            
-            for token in processed_tokens:
-                token_type = token[0]
-                token_string = token[1]
-                start_pos = token[2]  # (srow, scol)
-                end_pos = token[3]    # (erow, ecol)
-                
-                # 处理行号变化
-                while current_line < start_pos[0]:
-                    if line_buffer or current_line == 1:
-                        output_lines.append(''.join(line_buffer) + '\n')
-                    line_buffer = []
-                    current_line += 1
-                    current_col = 0
-                
-                # 处理列位置变化（添加空格）
-                while current_col < start_pos[1]:
-                    line_buffer.append(' ')
-                    current_col += 1
-                
-                # 添加token内容
-                line_buffer.append(token_string)
-                current_col = end_pos[1]
-                
-                # 如果是换行符，立即添加到输出行中
-                if token_type == tokenize.NEWLINE or token_type == tokenize.ENDMARKER:
-                    output_lines.append(''.join(line_buffer))
-                    line_buffer = []
-                    current_line += 1
-                    current_col = 0
-            
-            # 添加最后一行（如果有）
-            if line_buffer:
-                output_lines.append(''.join(line_buffer))
-            
-            # 处理多余空行
-            if remove_empty:
-                # 删除连续的多个空行，只保留一个
-                cleaned_lines = []
-                prev_empty = False
-                
-                for line in output_lines:
-                    is_empty = not line.strip()
-                    
-                    # 如果当前行不是空行，或者前一行不是空行，则保留
-                    if not is_empty or not prev_empty:
-                        cleaned_lines.append(line)
-                    
-                    prev_empty = is_empty
-                
-                # 删除文件末尾的空行
-                while cleaned_lines and not cleaned_lines[-1].strip():
-                    cleaned_lines.pop()
-                
-                output_lines = cleaned_lines
-            
-            # 创建新文件名
-            dir_name, file_name = os.path.split(file_path)
-            base_name, ext = os.path.splitext(file_name)
-            new_file_name = f"{base_name}_no_comments{ext}"
-            new_file_path = os.path.join(dir_name, new_file_name)
-            
-            # 写入新文件
-            with open(new_file_path, 'w', encoding='utf-8') as file:
-                file.writelines(output_lines)
-            
-            return new_file_path
+            # 获取用户选择的清理选项
+            options = CleanOptions(
+                remove_single=self.remove_single_var.get(),
+                remove_multi=self.remove_multi_var.get(),
+                remove_empty=self.remove_empty_var.get()
+            )
+            # 文件在进程池中并行处理，日志由清洗日志面板定时批量刷新
+            engine = CleanEngine(
+                options,
+                log=self.clean_log_queue.put,
+                incremental=self.incremental_clean_var.get(),
+                output_mode=self.clean_output_mode_var.get(),
+                output_dir=self.clean_output_dir.get(),
+                show_diff=True
+            )
+            engine.run(list(self.clean_files))
         except Exception as e:
-            self.clean_log_queue.put(f"处理文件时出错: {str(e)}\n")
-            return None
+            self.clean_log_queue.put(f"处理失败: {str(e)}\n")
+        
+        # 重新启用开始按钮
+        self.clean_button.config(state="normal")
     
     def update_clean_log(self):
-        self._update_text_widget(self.clean_log_text, self.clean_log_queue)
+        self.clean_log_pane.start()
     
     def clear_clean_log(self):
-        self.clean_log_text.delete(1.0, tk.END)
+        self.clean_log_pane.clear()
 
 if __name__ == "__main__":
+    # 打包后的程序在Windows上启动清洗进程池时需要
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = PackApp(root)
     root.mainloop()
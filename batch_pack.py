@@ -0,0 +1,162 @@
+"""
+批量打包
+把多个脚本或项目配置放进一个任务队列，按CPU核数的线程池并发执行PyInstaller构建。
+每个任务有独立的build/dist/spec目录、独立的日志文件和状态，结束后汇总每个任务的耗时
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from pack_core import PackConfig, PackPipeline
+from text_table import format_table
+
+STATUS_PENDING = "等待中"
+STATUS_RUNNING = "运行中"
+STATUS_SUCCESS = "成功"
+STATUS_FAILED = "失败"
+STATUS_CANCELLED = "已取消"
+
+
+@dataclass
+class BatchJob:
+    """批量打包中的一个任务"""
+    name: str
+    config: PackConfig
+    status: str = STATUS_PENDING
+    elapsed: float = 0.0
+    log_file: str = ""
+    error: str = ""  # 配置无法读取时的错误，这样的任务不会执行
+    pipeline: PackPipeline = field(default=None, repr=False)
+
+
+def create_batch_jobs(items, output_root, defaults=None):
+    """
+    根据脚本或配置文件列表创建批量任务
+    :param items: .py主程序或.json配置文件路径列表
+    :param output_root: 批量输出根目录，每个任务使用其中的<任务名>/build、dist目录
+    :param defaults: 直接传入.py脚本时使用的默认配置项
+    :return: BatchJob列表，配置有误的任务状态为失败并记录错误，不影响其他任务
+    """
+    jobs = []
+    used_names = set()
+    for item in items:
+        try:
+            if item.lower().endswith(".json"):
+                config = PackConfig.load(item)
+            else:
+                config = PackConfig.from_dict(dict(defaults or {}, main_script=os.path.abspath(item)))
+        except ValueError as e:
+            config = None
+            error = str(e)
+
+        # 任务名重复时追加序号，保证目录互不干扰
+        base_name = config.output_name if config else os.path.splitext(os.path.basename(item))[0]
+        name = base_name
+        index = 2
+        while name in used_names:
+            name = f"{base_name}-{index}"
+            index += 1
+        used_names.add(name)
+
+        if config is None:
+            jobs.append(BatchJob(name=name, config=None, status=STATUS_FAILED, error=error))
+            continue
+        job_dir = os.path.join(os.path.abspath(output_root), name)
+        config.build_dir = os.path.join(job_dir, "build")
+        config.dist_dir = os.path.join(job_dir, "dist")
+        config.open_output_dir = False
+        jobs.append(BatchJob(name=name, config=config, log_file=os.path.join(job_dir, "pack.log")))
+    return jobs
+
+
+class BatchRunner:
+    """用有界线程池执行批量任务，PyInstaller在子进程中运行，线程只负责等待和转发日志"""
+
+    def __init__(self, jobs, max_workers=None, on_status=None):
+        """
+        :param jobs: BatchJob列表
+        :param max_workers: 并发数，默认为CPU核数
+        :param on_status: 任务状态变化回调，参数为BatchJob
+        """
+        self.jobs = jobs
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.on_status = on_status or (lambda job: None)
+        self.stop_requested = False
+        self.wall_time = 0.0
+        self._lock = threading.Lock()
+
+    def _set_status(self, job, status):
+        job.status = status
+        self.on_status(job)
+
+    def _run_job(self, job):
+        if job.error:
+            return job
+        with self._lock:
+            if self.stop_requested:
+                self._set_status(job, STATUS_CANCELLED)
+                return job
+            os.makedirs(os.path.dirname(job.log_file), exist_ok=True)
+            log_stream = open(job.log_file, 'w', encoding='utf-8')
+
+            def write_log(message):
+                log_stream.write(message if message.endswith("\n") else message + "\n")
+                log_stream.flush()
+
+            job.pipeline = PackPipeline(job.config, log=write_log)
+
+        start_time = time.time()
+        try:
+            self._set_status(job, STATUS_RUNNING)
+            success = job.pipeline.run()
+        finally:
+            log_stream.close()
+        job.elapsed = time.time() - start_time
+
+        if job.pipeline.stop_requested:
+            self._set_status(job, STATUS_CANCELLED)
+        else:
+            self._set_status(job, STATUS_SUCCESS if success else STATUS_FAILED)
+        return job
+
+    def run(self):
+        """
+        执行全部任务，阻塞直到结束
+        :return: 全部任务成功返回True
+        """
+        start_time = time.time()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            list(executor.map(self._run_job, self.jobs))
+        self.wall_time = time.time() - start_time
+        return all(job.status == STATUS_SUCCESS for job in self.jobs)
+
+    def stop(self):
+        """取消尚未开始的任务，并请求正在运行的任务停止"""
+        with self._lock:
+            self.stop_requested = True
+            for job in self.jobs:
+                if job.pipeline:
+                    job.pipeline.stop()
+
+
+def format_summary(jobs, wall_time=None):
+    """
+    生成每个任务状态和耗时的汇总表
+    :param jobs: BatchJob列表
+    :param wall_time: 整批任务的实际用时，提供时追加到表尾
+    """
+    headers = ("任务", "状态", "耗时", "日志")
+    rows = [
+        (job.name, job.status, f"{job.elapsed:.1f}s", job.error or job.log_file)
+        for job in jobs
+    ]
+    total = sum(job.elapsed for job in jobs)
+    success_count = sum(1 for job in jobs if job.status == STATUS_SUCCESS)
+    rows.append(("合计", f"{success_count}/{len(jobs)} 成功", f"{total:.1f}s", ""))
+
+    table = format_table([headers] + rows)
+    if wall_time is not None:
+        table += f"\n总用时: {wall_time:.1f}s"
+    return table
@@ -0,0 +1,372 @@
+"""
+代码清洗吞吐量基准测试
+
+用法:
+    python -m bench_cleaner [源码目录] [--repeat 1]
+    python -m bench_cleaner --memory 1 4 16
+
+默认使用当前解释器的标准库作为语料。只在内存中清洗，不写文件，
+输出每种清理选项组合的文件数、源码大小、用时和吞吐量（MB/s、文件/s），
+并与改写前的多遍清洗实现对比，旧实现处理失败的文件只计到出错为止。
+--memory生成指定大小（MB）的模块，比较流式清洗和整体读取清洗的内存峰值
+"""
+import argparse
+import ast
+import io
+import os
+import sys
+import tempfile
+import time
+import tokenize
+import tracemalloc
+
+from code_cleaner import CleanOptions, clean_stream, strip_source
+from text_table import format_table
+
+# 生成大文件时重复的代码片段
+SYNTHETIC_BLOCK = '''
+# 自动生成的代码块 {index}
+def handler_{index}(value):
+    """处理第{index}项"""
+    """
+    说明性的字符串语句，清洗时删除
+    """
+    result = value * {index}  # 行尾注释
+    return result
+
+
+TABLE_{index} = {{
+    "name": "item_{index}",  # 名称
+    "text": """保留的
+多行字符串""",
+}}
+'''
+
+OPTION_SETS = {
+    "全部": CleanOptions(True, True, True),
+    "仅注释": CleanOptions(True, False, False),
+    "不删除": CleanOptions(False, False, False),
+}
+
+
+def legacy_strip_source(source_code, options):
+    """
+    改为单次token扫描之前的清洗实现，只用于基准对比，除读写文件外保持原样：
+    ast解析找文档字符串、按行查找三引号、生成完整token列表、再逐字符补空格重建
+    :return: 清洗后的源码，出错时抛出异常
+    """
+    remove_single, remove_multi, remove_empty = options.remove_single, options.remove_multi, options.remove_empty
+
+    # 首先使用正则表达式删除多行注释（'''或"""包围的内容）
+    # 这样可以避免AST解析时将文档字符串识别为节点
+    if remove_multi:
+        # 使用非贪婪匹配，避免匹配到字符串中的三引号
+        pattern = r'("""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\')'
+        # 但要保留文档字符串（在模块、类或函数定义后的第一个字符串）
+        # 所以我们先找到所有文档字符串的位置
+
+        # 解析AST树，找到所有文档字符串的位置
+        try:
+            tree = ast.parse(source_code)
+            docstring_positions = set()
+
+            # 遍历AST树，找到所有有文档字符串的节点
+            for node in ast.walk(tree):
+                if (isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)) and 
+                    ast.get_docstring(node) is not None):
+                    # 获取文档字符串的起始和结束行号
+                    docstring = ast.get_docstring(node)
+                    # 文档字符串通常在节点定义的下一行开始
+                    doc_start_line = node.lineno + 1 if hasattr(node, 'lineno') else 1
+                    # 计算文档字符串的行数
+                    doc_lines = docstring.count('\n') + 1
+                    doc_end_line = doc_start_line + doc_lines - 1
+                    docstring_positions.add((doc_start_line, doc_end_line))
+        except SyntaxError:
+            # 如果AST解析失败，则不保留任何文档字符串
+            docstring_positions = set()
+
+        # 分割源代码为行
+        lines = source_code.split('\n')
+        new_lines = []
+        i = 0
+
+        while i < len(lines):
+            line = lines[i]
+            # 检查当前行是否是文档字符串的开始
+            is_docstring_start = False
+            docstring_end_line = i
+
+            for start, end in docstring_positions:
+                if i + 1 == start:  # 行号从1开始，列表索引从0开始
+                    is_docstring_start = True
+                    docstring_end_line = end - 1  # 转换为0-based索引
+                    break
+
+            if is_docstring_start:
+                # 保留文档字符串
+                while i <= docstring_end_line and i < len(lines):
+                    new_lines.append(lines[i])
+                    i += 1
+            else:
+                # 检查是否是多行注释的开始
+                if '"""' in line or "'''" in line:
+                    # 找到三引号的开始和结束位置
+                    triple_single_start = line.find("'''")
+                    triple_double_start = line.find('"""')
+
+                    # 确定使用的是哪种三引号
+                    if triple_single_start != -1 and (triple_double_start == -1 or triple_single_start < triple_double_start):
+                        quote_type = "'''"
+                        start_pos = triple_single_start
+                    else:
+                        quote_type = '"""'
+                        start_pos = triple_double_start
+
+                    # 检查三引号是否在同一行结束
+                    end_pos = line.find(quote_type, start_pos + 3)
+                    if end_pos != -1:
+                        # 同一行开始和结束，删除这部分
+                        line = line[:start_pos] + line[end_pos + 3:]
+                        new_lines.append(line)
+                    else:
+                        # 多行注释，跳过直到找到结束的三引号
+                        i += 1
+                        found_end = False
+                        while i < len(lines):
+                            if quote_type in lines[i]:
+                                # 找到结束的三引号
+                                end_pos = lines[i].find(quote_type)
+                                # 保留结束三引号之后的内容
+                                remaining_content = lines[i][end_pos + 3:]
+                                if remaining_content.strip():
+                                    new_lines.append(remaining_content)
+                                found_end = True
+                                break
+                            i += 1
+
+                        if not found_end:
+                            # 没有找到结束的三引号，保留原始行
+                            new_lines.append(line)
+                else:
+                    new_lines.append(line)
+                i += 1
+
+        # 重新组合源代码
+        source_code = '\n'.join(new_lines)
+
+    # 使用tokenize模块处理单行注释和格式化
+    source_buffer = io.StringIO(source_code)
+    tokens = list(tokenize.generate_tokens(source_buffer.readline))
+
+    # 处理token，移除单行注释
+    processed_tokens = []
+    for token in tokens:
+        token_type = token[0]
+        token_string = token[1]
+
+        # 跳过单行注释
+        if token_type == tokenize.COMMENT and remove_single:
+            continue
+
+        # 保留其他token
+        processed_tokens.append(token)
+
+    # 重建源代码，保留原始格式
+    output_lines = []
+    current_line = 1
+    current_col = 0
+    line_buffer = []
+
+    for token in processed_tokens:
+        token_type = token[0]
+        token_string = token[1]
+        start_pos = token[2]  # (srow, scol)
+        end_pos = token[3]    # (erow, ecol)
+
+        # 处理行号变化
+        while current_line < start_pos[0]:
+            if line_buffer or current_line == 1:
+                output_lines.append(''.join(line_buffer) + '\n')
+            line_buffer = []
+            current_line += 1
+            current_col = 0
+
+        # 处理列位置变化（添加空格）
+        while current_col < start_pos[1]:
+            line_buffer.append(' ')
+            current_col += 1
+
+        # 添加token内容
+        line_buffer.append(token_string)
+        current_col = end_pos[1]
+
+        # 如果是换行符，立即添加到输出行中
+        if token_type == tokenize.NEWLINE or token_type == tokenize.ENDMARKER:
+            output_lines.append(''.join(line_buffer))
+            line_buffer = []
+            current_line += 1
+            current_col = 0
+
+    # 添加最后一行（如果有）
+    if line_buffer:
+        output_lines.append(''.join(line_buffer))
+
+    # 处理多余空行
+    if remove_empty:
+        # 删除连续的多个空行，只保留一个
+        cleaned_lines = []
+        prev_empty = False
+
+        for line in output_lines:
+            is_empty = not line.strip()
+
+            # 如果当前行不是空行，或者前一行不是空行，则保留
+            if not is_empty or not prev_empty:
+                cleaned_lines.append(line)
+
+            prev_empty = is_empty
+
+        # 删除文件末尾的空行
+        while cleaned_lines and not cleaned_lines[-1].strip():
+            cleaned_lines.pop()
+
+        output_lines = cleaned_lines
+
+    return ''.join(output_lines)
+
+
+def load_corpus(corpus_dir):
+    """读取目录下全部可以按UTF-8解码的.py文件"""
+    sources = []
+    for root, _, files in os.walk(corpus_dir):
+        for file in files:
+            if not file.endswith(".py"):
+                continue
+            try:
+                with open(os.path.join(root, file), 'r', encoding='utf-8', newline='') as f:
+                    sources.append(f.read())
+            except (OSError, UnicodeDecodeError):
+                pass
+    return sources
+
+
+def run_benchmark(sources, options, repeat, strip=strip_source):
+    """
+    :param strip: 清洗函数，参数为源码和CleanOptions
+    :return: (最短一轮的用时, 失败文件数)
+    """
+    best = None
+    failures = 0
+    for _ in range(repeat):
+        failures = 0
+        start = time.perf_counter()
+        for source in sources:
+            try:
+                strip(source, options)
+            except Exception:
+                failures += 1
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, failures
+
+
+def write_synthetic_module(path, size_mb):
+    """生成大约size_mb大小的模块"""
+    target = size_mb * 1024 * 1024
+    written = 0
+    index = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        while written < target:
+            block = SYNTHETIC_BLOCK.format(index=index)
+            f.write(block)
+            written += len(block.encode("utf-8"))
+            index += 1
+
+
+def measure_peak(func):
+    """
+    :return: Python内存分配峰值字节数
+    """
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure_time(func):
+    """用时单独测量，tracemalloc跟踪每次分配，开启时会慢好几倍"""
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def run_memory_benchmark(sizes):
+    options = CleanOptions()
+    rows = [("文件大小", "流式峰值", "流式用时", "整体读取峰值")]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_path = os.path.join(temp_dir, "generated.py")
+        output_path = os.path.join(temp_dir, "generated_no_comments.py")
+
+        def streaming():
+            with open(source_path, 'r', encoding='utf-8', newline='') as source, \
+                    open(output_path, 'w', encoding='utf-8', newline='') as target:
+                clean_stream(source, target, options)
+
+        def whole_file():
+            with open(source_path, 'r', encoding='utf-8', newline='') as source:
+                output = strip_source(source.read(), options)
+            with open(output_path, 'w', encoding='utf-8', newline='') as target:
+                target.write(output)
+
+        for size_mb in sizes:
+            write_synthetic_module(source_path, size_mb)
+            stream_peak = measure_peak(streaming)
+            stream_time = measure_time(streaming)
+            whole_peak = measure_peak(whole_file)
+            rows.append((
+                f"{size_mb} MB",
+                f"{stream_peak / 1024:.0f} KB",
+                f"{stream_time:.2f}s",
+                f"{whole_peak / 1024:.0f} KB",
+            ))
+    print(format_table(rows))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="bench_cleaner", description="代码清洗吞吐量基准测试")
+    parser.add_argument("corpus", nargs="?", default=os.path.dirname(os.__file__), help="语料目录，默认为标准库")
+    parser.add_argument("--repeat", type=int, default=1, help="重复次数，取最快的一轮")
+    parser.add_argument("--memory", type=int, nargs="+", metavar="MB", help="改为测试这些大小的生成模块的内存峰值")
+    args = parser.parse_args(argv)
+
+    if args.memory:
+        run_memory_benchmark(args.memory)
+        return 0
+
+    sources = load_corpus(args.corpus)
+    total_bytes = sum(len(source.encode("utf-8")) for source in sources)
+    print(f"语料: {args.corpus}，{len(sources)} 个文件，{total_bytes / 1024 / 1024:.1f} MB")
+
+    rows = [("选项", "用时", "MB/s", "文件/s", "失败", "旧实现用时", "旧实现失败", "加速")]
+    for name, options in OPTION_SETS.items():
+        elapsed, failures = run_benchmark(sources, options, args.repeat)
+        legacy_elapsed, legacy_failures = run_benchmark(sources, options, args.repeat, legacy_strip_source)
+        rows.append((
+            name,
+            f"{elapsed:.2f}s",
+            f"{total_bytes / 1024 / 1024 / elapsed:.2f}",
+            f"{len(sources) / elapsed:.0f}",
+            str(failures),
+            f"{legacy_elapsed:.2f}s",
+            str(legacy_failures),
+            f"{legacy_elapsed / elapsed:.1f}x",
+        ))
+    print(format_table(rows))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
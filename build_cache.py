@@ -0,0 +1,243 @@
+"""
+构建缓存
+根据源码、资源、图标、打包选项和解释器版本计算内容指纹，
+指纹相同时直接恢复上次的打包产物，跳过PyInstaller
+"""
+import contextlib
+import hashlib
+import json
+import os
+import secrets
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from import_graph import collect_local_modules
+
+# 项目级缓存目录，位于主程序所在目录，不受清理build/dist影响
+CACHE_DIR_NAME = ".pack_cache"
+
+_version_cache = {}
+
+# 完整写入的缓存条目中的标记文件，没有标记的条目不算命中
+ENTRY_MARKER = ".complete"
+# 超过这个时间仍未完成的临时条目视为中断遗留，淘汰时删除（秒）
+STALE_TEMP_AGE = 24 * 3600
+
+
+
+def hash_file(path, hasher=None, chunk_size=1024 * 1024):
+    """
+    分块计算文件内容哈希
+    :param path: 文件路径
+    :param hasher: 已有的hashlib对象，为None时新建sha256并返回十六进制摘要
+    """
+    own_hasher = hasher is None
+    if own_hasher:
+        hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest() if own_hasher else hasher
+
+
+def _create_temp_file(path):
+    """
+    在目标文件同目录下独占创建唯一的临时文件
+    mkstemp创建的文件只有所有者可读写，这里用0o666交给系统按当前umask裁剪，
+    与open()新建文件的权限一致，且不需要临时修改进程级的umask
+    :return: 临时文件路径
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    prefix = os.path.basename(path) + "."
+    while True:
+        temp_path = os.path.join(directory, prefix + secrets.token_hex(8) + ".tmp")
+        try:
+            fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        except FileExistsError:
+            continue
+        os.close(fd)
+        return temp_path
+
+
+@contextlib.contextmanager
+def atomic_write(path, mode='w', **kwargs):
+    """
+    先写入同目录下的唯一临时文件，写完后替换目标文件
+    并行的打包任务同时保存同一个缓存文件时不会互相覆盖临时文件，最后完成的一份生效
+    :param path: 目标文件路径
+    :param mode: 打开临时文件的模式，其余参数传给open()
+    """
+    temp_path = _create_temp_file(path)
+    try:
+        with open(temp_path, mode, **kwargs) as f:
+            yield f
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _hash_tree(path, hasher):
+    """把文件或目录（按相对路径排序）的内容写入哈希"""
+    if os.path.isfile(path):
+        hash_file(path, hasher)
+        return
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for file in sorted(files):
+            file_path = os.path.join(root, file)
+            hasher.update(os.path.relpath(file_path, path).replace(os.sep, "/").encode("utf-8"))
+            hash_file(file_path, hasher)
+
+
+def get_interpreter_versions(python_cmd="python"):
+    """
+    获取打包所用解释器的Python和PyInstaller版本，按解释器路径缓存
+    :return: (python_version, pyinstaller_version)
+    """
+    python_path = shutil.which(python_cmd) or python_cmd
+    if python_path not in _version_cache:
+        try:
+            output = subprocess.run(
+                [python_path, "-c", "import sys, PyInstaller; print(sys.version); print(PyInstaller.__version__)"],
+                capture_output=True, text=True, timeout=60
+            ).stdout.splitlines()
+        except (OSError, subprocess.SubprocessError):
+            output = []
+        _version_cache[python_path] = (
+            output[0] if len(output) > 0 else sys.version,
+            output[1] if len(output) > 1 else "",
+        )
+    return _version_cache[python_path]
+
+
+def compute_build_fingerprint(main_script, resources, icon_path, options):
+    """
+    计算一次构建的内容指纹
+    :param main_script: 主程序文件路径，其传递导入的本地模块一并计入
+    :param resources: 资源文件和文件夹列表
+    :param icon_path: 图标文件路径，可为空
+    :param options: PyInstaller命令参数列表
+    :return: 十六进制指纹
+    """
+    hasher = hashlib.sha256()
+    root_dir = os.path.dirname(os.path.abspath(main_script))
+
+    for module_path in collect_local_modules(main_script):
+        hasher.update(os.path.relpath(module_path, root_dir).encode("utf-8"))
+        hash_file(module_path, hasher)
+
+    for resource in resources:
+        hasher.update(b"resource:" + os.path.abspath(resource).encode("utf-8"))
+        if os.path.exists(resource):
+            _hash_tree(resource, hasher)
+
+    if icon_path and os.path.exists(icon_path):
+        hasher.update(b"icon:")
+        hash_file(icon_path, hasher)
+
+    python_version, pyinstaller_version = get_interpreter_versions(options[0] if options else "python")
+    hasher.update(json.dumps({
+        "options": list(options),
+        "python": python_version,
+        "pyinstaller": pyinstaller_version,
+    }, sort_keys=True).encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def get_artifact_path(dist_dir, name, kind):
+    """
+    获取打包产物路径
+    :param kind: "onefile" 或 "onedir"
+    """
+    if kind == "onedir":
+        return os.path.join(dist_dir, name)
+    return os.path.join(dist_dir, name + (".exe" if sys.platform == "win32" else ""))
+
+
+def _replace_artifact(src, dst):
+    """
+    用src替换dst处的文件或目录
+    这里始终复制而不用硬链接，PyInstaller原地覆盖dist中的文件时不会损坏缓存
+    """
+    if os.path.isdir(dst):
+        shutil.rmtree(dst)
+    elif os.path.exists(dst):
+        os.remove(dst)
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    if os.path.isdir(src):
+        shutil.copytree(src, dst)
+    else:
+        shutil.copy2(src, dst)
+
+
+class BuildCache:
+    """按指纹保存打包产物，每种打包方式只保留最近的若干份"""
+
+    def __init__(self, project_dir, max_entries=3):
+        self.cache_dir = os.path.join(project_dir, CACHE_DIR_NAME, "artifacts")
+        self.max_entries = max_entries
+
+    def _entry_dir(self, kind, fingerprint):
+        return os.path.join(self.cache_dir, kind, fingerprint)
+
+    def restore(self, kind, fingerprint, dist_dir, name):
+        """
+        指纹命中时把缓存的产物恢复到dist目录
+        :return: 命中并恢复成功返回产物路径，否则返回None
+        """
+        entry_dir = self._entry_dir(kind, fingerprint)
+        cached = get_artifact_path(entry_dir, name, kind)
+        if not os.path.isfile(os.path.join(entry_dir, ENTRY_MARKER)) or not os.path.exists(cached):
+            return None
+        artifact = get_artifact_path(dist_dir, name, kind)
+        _replace_artifact(cached, artifact)
+        # 更新时间戳，淘汰时按最近使用排序
+        os.utime(entry_dir)
+        return artifact
+
+    def store(self, kind, fingerprint, dist_dir, name):
+        """
+        保存本次构建的产物
+        先复制到同目录下的临时条目，写入完成标记后再改名为正式条目，
+        中断、取消或磁盘已满时只会留下临时条目，不会被当作命中
+        :return: 产物存在并保存成功返回True
+        """
+        artifact = get_artifact_path(dist_dir, name, kind)
+        if not os.path.exists(artifact):
+            return False
+        entry_dir = self._entry_dir(kind, fingerprint)
+        kind_dir = os.path.dirname(entry_dir)
+        os.makedirs(kind_dir, exist_ok=True)
+        temp_dir = tempfile.mkdtemp(dir=kind_dir, prefix=fingerprint + ".", suffix=".tmp")
+        try:
+            _replace_artifact(artifact, get_artifact_path(temp_dir, name, kind))
+            with open(os.path.join(temp_dir, ENTRY_MARKER), 'w', encoding='utf-8'):
+                pass
+            if os.path.isdir(entry_dir):
+                shutil.rmtree(entry_dir)
+            os.replace(temp_dir, entry_dir)
+        finally:
+            if os.path.isdir(temp_dir):
+                shutil.rmtree(temp_dir, ignore_errors=True)
+        self._evict(kind)
+        return True
+
+    def _evict(self, kind):
+        """删除超出数量限制的旧缓存和中断遗留的临时条目"""
+        kind_dir = os.path.join(self.cache_dir, kind)
+        entries = []
+        now = time.time()
+        for entry in os.listdir(kind_dir):
+            path = os.path.join(kind_dir, entry)
+            if not entry.endswith(".tmp"):
+                entries.append(path)
+            elif now - os.path.getmtime(path) > STALE_TEMP_AGE:
+                # 其他任务可能正在写入较新的临时条目，只删除很久以前的
+                shutil.rmtree(path, ignore_errors=True)
+        entries.sort(key=os.path.getmtime, reverse=True)
+        for entry in entries[self.max_entries:]:
+            shutil.rmtree(entry, ignore_errors=True)
@@ -0,0 +1,212 @@
+"""
+构建历史
+记录每次打包各步骤和各PyInstaller阶段的用时以及产物大小，按项目保存在.pack_cache/build_history.jsonl，
+并与最近几次构建对比，让构建时间或产物大小的回退一眼可见
+"""
+import json
+import os
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+
+from build_cache import CACHE_DIR_NAME
+from build_progress import PHASE_NAMES
+from text_table import format_table
+
+STEP_NAMES = {
+    "cleanup": "清理旧构建",
+    "staging": "清洗源码",
+    "icon": "检测图标",
+    "imports": "分析导入",
+    "resources": "准备资源参数",
+    "archive": "生成资源归档",
+    "spec": "生成spec文件",
+    "pyinstaller": "PyInstaller",
+    "upx": "UPX压缩",
+    "size_report": "分析产物大小",
+    "post_cleanup": "清理构建文件",
+    "startup": "启动测试",
+    "open_output": "打开输出目录",
+}
+
+# 与最近几次成功构建的中位数比较
+TREND_WINDOW = 5
+# 超过该比例且超过最小差值才标记为回退
+REGRESSION_RATIO = 0.2
+REGRESSION_MIN_SECONDS = 1.0
+REGRESSION_MIN_BYTES = 512 * 1024
+REGRESSION_MIN_STARTUP = 0.2
+
+
+def get_path_size(path):
+    """获取文件大小或目录下全部文件的总大小"""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for file in files:
+            try:
+                total += os.path.getsize(os.path.join(root, file))
+            except OSError:
+                pass
+    return total
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB"):
+        if abs(size) < 1024:
+            return f"{size:.1f}{unit}" if unit != "B" else f"{size}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+
+class StepTimer:
+    """记录打包流程中各步骤的用时，同名步骤累加，可在多个线程中使用"""
+
+    def __init__(self):
+        self.steps = {}
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.steps[name] = self.steps.get(name, 0.0) + seconds
+
+    @contextmanager
+    def step(self, name):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add(name, time.monotonic() - start)
+
+    def total(self):
+        return time.monotonic() - self._start
+
+
+class BuildHistory:
+    """项目的构建历史，每次构建追加一行JSON"""
+
+    def __init__(self, project_dir):
+        self.path = os.path.join(project_dir, CACHE_DIR_NAME, "build_history.jsonl")
+
+    def append(self, record):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def load(self, output_name=None, pack_option=None):
+        """
+        读取历史记录，按时间先后排列
+        :param output_name: 只返回该输出名称的记录
+        :param pack_option: 只返回该打包方式的记录
+        """
+        records = []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if output_name and record.get("name") != output_name:
+                        continue
+                    if pack_option and record.get("pack_option") != pack_option:
+                        continue
+                    records.append(record)
+        except OSError:
+            pass
+        return records
+
+
+def _compare(current, previous_values, min_delta, formatter):
+    """
+    与历史中位数比较
+    :return: (说明文本, 是否回退)
+    """
+    if not previous_values:
+        return formatter(current), False
+    baseline = statistics.median(previous_values)
+    delta = current - baseline
+    ratio = delta / baseline if baseline else 0.0
+    regressed = delta > min_delta and ratio > REGRESSION_RATIO
+    text = f"{formatter(current)}（近{len(previous_values)}次中位数 {formatter(baseline)}，{ratio:+.0%}）"
+    return text, regressed
+
+
+def format_report(record, history):
+    """
+    生成一次构建的用时报告和趋势对比
+    :param record: 本次构建的记录
+    :param history: 本次之前同一项目、同一打包方式的历史记录
+    :return: 报告文本
+    """
+    previous = [item for item in history if item.get("success")][-TREND_WINDOW:]
+    lines = ["构建用时报告:"]
+    regressions = []
+
+    def seconds(value):
+        return f"{value:.1f}s"
+
+    text, regressed = _compare(record["total"], [item["total"] for item in previous], REGRESSION_MIN_SECONDS, seconds)
+    lines.append(f"  总用时: {text}")
+    if regressed:
+        regressions.append("总用时")
+
+    for step, value in record["steps"].items():
+        values = [item["steps"][step] for item in previous if step in item.get("steps", {})]
+        text, regressed = _compare(value, values, REGRESSION_MIN_SECONDS, seconds)
+        lines.append(f"  {STEP_NAMES.get(step, step)}: {text}")
+        if regressed:
+            regressions.append(STEP_NAMES.get(step, step))
+
+    for kind, phases in record["phases"].items():
+        for phase, value in phases.items():
+            values = [item["phases"][kind][phase] for item in previous if phase in item.get("phases", {}).get(kind, {})]
+            text, regressed = _compare(value, values, REGRESSION_MIN_SECONDS, seconds)
+            name = f"{kind} {PHASE_NAMES.get(phase, phase)}"
+            lines.append(f"    {name}: {text}")
+            if regressed:
+                regressions.append(name)
+
+    for kind, size in record["artifact_sizes"].items():
+        values = [item["artifact_sizes"][kind] for item in previous if kind in item.get("artifact_sizes", {})]
+        text, regressed = _compare(size, values, REGRESSION_MIN_BYTES, format_size)
+        lines.append(f"  {kind} 产物大小: {text}")
+        if regressed:
+            regressions.append(f"{kind} 产物大小")
+
+    # 启动时间只与相同UPX设置的构建比较
+    same_upx = [item for item in previous if item.get("enable_upx") == record.get("enable_upx")]
+    for kind, result in record.get("startup", {}).items():
+        values = [item["startup"][kind]["warm"] for item in same_upx if kind in item.get("startup", {})]
+        text, regressed = _compare(result["warm"], values, REGRESSION_MIN_STARTUP, lambda value: f"{value:.2f}s")
+        lines.append(f"  {kind} 热启动: {text}")
+        if regressed:
+            regressions.append(f"{kind} 启动时间")
+
+    if regressions:
+        lines.append(f"  注意: 与最近的构建相比明显变慢或变大: {'、'.join(regressions)}")
+    return "\n".join(lines) + "\n"
+
+
+def format_history(records):
+    """把历史记录格式化为按时间排列的趋势表"""
+    if not records:
+        return "没有构建历史"
+    kinds = sorted({kind for record in records for kind in record.get("artifact_sizes", {})})
+    startup_kinds = sorted({kind for record in records for kind in record.get("startup", {})})
+    headers = ["时间", "结果", "总用时"] + [f"{kind}大小" for kind in kinds] + [f"{kind}启动" for kind in startup_kinds]
+    rows = [headers]
+    for record in records:
+        sizes = record.get("artifact_sizes", {})
+        startup = record.get("startup", {})
+        row = [
+            record.get("time", ""),
+            "成功" if record.get("success") else "失败",
+            f"{record.get('total', 0):.1f}s",
+        ] + [format_size(sizes[kind]) if kind in sizes else "-" for kind in kinds]
+        row.extend(f"{startup[kind]['warm']:.2f}s" if kind in startup else "-" for kind in startup_kinds)
+        rows.append(row)
+    return format_table(rows)
@@ -0,0 +1,176 @@
+"""
+构建阶段进度
+从PyInstaller的输出识别分析、模块依赖图、hooks、PYZ、PKG、EXE、COLLECT各阶段，
+按项目历史上各阶段的用时加权计算进度，并给出当前阶段的已用时间和预计剩余时间
+"""
+import json
+import os
+import threading
+import time
+
+from build_cache import CACHE_DIR_NAME, atomic_write
+
+# (阶段标识, 显示名称, 进入该阶段的日志特征)
+PHASES = [
+    ("analysis", "分析", ("Building Analysis", "checking Analysis", "Running Analysis")),
+    ("modulegraph", "模块依赖图", ("Initializing module dependency graph", "Analyzing base_library.zip")),
+    ("hooks", "hooks", ("Processing module hooks", "Looking for ctypes DLLs", "Analyzing run-time hooks")),
+    ("pyz", "PYZ", ("Building PYZ", "checking PYZ")),
+    ("pkg", "PKG", ("Building PKG", "checking PKG")),
+    ("exe", "EXE", ("Building EXE", "checking EXE")),
+    ("collect", "COLLECT", ("Building COLLECT", "checking COLLECT")),
+]
+PHASE_NAMES = {phase: name for phase, name, _ in PHASES}
+
+# 没有历史记录时各阶段的预计用时（秒）
+DEFAULT_DURATIONS = {
+    "analysis": 2,
+    "modulegraph": 30,
+    "hooks": 20,
+    "pyz": 5,
+    "pkg": 10,
+    "exe": 3,
+    "collect": 5,
+}
+
+# 历史用时采用指数滑动平均，新一次构建所占的比重
+HISTORY_WEIGHT = 0.5
+
+
+def phases_for(kind):
+    """获取某种打包方式会经历的阶段，单文件打包没有COLLECT阶段"""
+    return [phase for phase, _, _ in PHASES if kind == "onedir" or phase != "collect"]
+
+
+def _format_seconds(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}分{seconds}秒" if minutes else f"{seconds}秒"
+
+
+class PhaseTimings:
+    """项目级的各阶段历史用时，保存在.pack_cache/phase_timings.json"""
+
+    def __init__(self, project_dir):
+        self.path = os.path.join(project_dir, CACHE_DIR_NAME, "phase_timings.json")
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+        except (OSError, ValueError):
+            self.data = {}
+
+    def expected(self, kind):
+        """获取某种打包方式各阶段的预计用时"""
+        durations = dict(DEFAULT_DURATIONS)
+        durations.update(self.data.get(kind, {}))
+        return durations
+
+    def update(self, kind, durations):
+        """用本次构建的实际用时更新历史记录"""
+        history = self.data.setdefault(kind, {})
+        for phase, seconds in durations.items():
+            previous = history.get(phase)
+            history[phase] = seconds if previous is None else previous + (seconds - previous) * HISTORY_WEIGHT
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with atomic_write(self.path, encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2)
+
+
+class PhaseTracker:
+    """跟踪一次PyInstaller构建当前所处的阶段"""
+
+    def __init__(self, kind, expected=None, clock=time.monotonic):
+        """
+        :param kind: "onefile" 或 "onedir"
+        :param expected: 各阶段预计用时（秒），为None时使用默认值
+        :param clock: 计时函数
+        """
+        self.kind = kind
+        self.phases = phases_for(kind)
+        self.expected = expected or dict(DEFAULT_DURATIONS)
+        self.clock = clock
+        self.durations = {}
+        self.current = None
+        self._phase_start = None
+        # 输出读取线程推进阶段，定时刷新线程同时读取当前阶段
+        self._lock = threading.RLock()
+
+    def feed(self, line):
+        """
+        处理一行PyInstaller输出
+        :return: 进入新阶段时返回刚结束的阶段标识（第一个阶段返回""），否则返回None
+        """
+        current_index = self.phases.index(self.current) if self.current else -1
+        # 阶段只会前进，后面阶段的日志特征出现时跳过中间没有输出的阶段
+        for index in range(len(self.phases) - 1, current_index, -1):
+            phase = self.phases[index]
+            markers = next(markers for name, _, markers in PHASES if name == phase)
+            if any(marker in line for marker in markers):
+                return self._enter(phase)
+        return None
+
+    def _enter(self, phase):
+        with self._lock:
+            now = self.clock()
+            finished = self.current or ""
+            if self.current:
+                self.durations[self.current] = now - self._phase_start
+            self._phase_start = now
+            self.current = phase
+            return finished
+
+    def finish(self):
+        """构建结束，记录最后一个阶段的用时并返回全部阶段用时"""
+        with self._lock:
+            if self.current:
+                self.durations[self.current] = self.clock() - self._phase_start
+                self.current = None
+            return dict(self.durations)
+
+    def phase_elapsed(self):
+        with self._lock:
+            return self.clock() - self._phase_start if self.current else 0.0
+
+    def progress(self):
+        """按预计用时加权的进度（0-99），构建结束前不会达到100"""
+        total = sum(self.expected[phase] for phase in self.phases)
+        with self._lock:
+            if not self.current or not total:
+                return 0.0
+            index = self.phases.index(self.current)
+            done = sum(self.expected[phase] for phase in self.phases[:index])
+            current_expected = self.expected[self.current]
+            done += min(self.phase_elapsed(), current_expected * 0.95)
+        return min(done / total * 100, 99.0)
+
+    def eta(self):
+        """
+        预计剩余时间
+        :return: (当前阶段剩余秒数, 整个构建剩余秒数)
+        """
+        with self._lock:
+            if not self.current:
+                return 0.0, sum(self.expected[phase] for phase in self.phases)
+            index = self.phases.index(self.current)
+            phase_remaining = max(self.expected[self.current] - self.phase_elapsed(), 0.0)
+        later = sum(self.expected[phase] for phase in self.phases[index + 1:])
+        return phase_remaining, phase_remaining + later
+
+    def status_text(self):
+        """当前阶段的状态说明，如"阶段 3/6 hooks: 已用 12秒，阶段剩余约 8秒，总剩余约 30秒" """
+        with self._lock:
+            if not self.current:
+                return "等待PyInstaller开始..."
+            phase_remaining, total_remaining = self.eta()
+            return (
+                f"阶段 {self.phases.index(self.current) + 1}/{len(self.phases)} {PHASE_NAMES[self.current]}: "
+                f"已用 {_format_seconds(self.phase_elapsed())}，阶段剩余约 {_format_seconds(phase_remaining)}，"
+                f"总剩余约 {_format_seconds(total_remaining)}"
+            )
+
+
+def format_durations(durations):
+    """把各阶段用时格式化为一行，便于看出哪个阶段最慢"""
+    return "，".join(
+        f"{PHASE_NAMES[phase]} {durations[phase]:.1f}s"
+        for phase, _, _ in PHASES if phase in durations
+    )
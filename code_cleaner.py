@@ -0,0 +1,893 @@
+"""
+代码清洗引擎
+删除Python源文件中的注释和多余空行，默认输出为同目录下的*_no_comments.py，
+也可以输出到镜像目录、原地替换源文件，或只在内存中清洗并预览差异。
+大量文件时用进程池并行处理，进度按批次汇报，日志只在界面定时刷新时批量显示；
+单个文件逐行读取、清洗和写入，内存占用与文件大小无关；
+增量清洗时用清单记录每个文件的内容哈希，再次清洗只处理有变化的文件
+"""
+import difflib
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import sys
+import time
+import tokenize
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from itertools import product, repeat
+
+from build_cache import CACHE_DIR_NAME, atomic_write, hash_file
+
+# 文件数少于该值时直接在当前进程处理，避免启动进程池的开销
+PARALLEL_THRESHOLD = 8
+# 进度汇报的最小间隔（秒）
+PROGRESS_INTERVAL = 0.5
+# 预览模式下每个文件最多显示的差异行数
+DIFF_MAX_LINES = 200
+
+# 输出方式
+OUTPUT_SIBLING = "sibling"    # 同目录下的*_no_comments.py
+OUTPUT_MIRROR = "mirror"      # 按相对路径写入单独的镜像目录
+OUTPUT_IN_PLACE = "in_place"  # 原子替换源文件
+OUTPUT_MEMORY = "memory"      # 不写文件，只返回清洗结果
+OUTPUT_MODES = (OUTPUT_SIBLING, OUTPUT_MIRROR, OUTPUT_IN_PLACE, OUTPUT_MEMORY)
+
+
+@dataclass(frozen=True)
+class CleanOptions:
+    """清理选项"""
+    remove_single: bool = True
+    remove_multi: bool = True
+    remove_empty: bool = True
+
+
+@dataclass
+class CleanResult:
+    """一个文件的处理结果"""
+    file_path: str
+    success: bool = False
+    skipped: bool = False
+    new_file_path: str = ""
+    file_size: int = 0
+    new_file_size: int = 0
+    error: str = ""
+    # 增量清洗使用：源文件和输出文件的内容哈希，内容与清单一致时unchanged为True
+    source_hash: str = ""
+    output_hash: str = ""
+    unchanged: bool = False
+    # 内存模式使用：清洗后的文本和与源码的差异
+    output_text: str = None
+    diff: str = ""
+
+
+@dataclass
+class CleanSummary:
+    """一次清洗的汇总"""
+    total: int = 0
+    success_count: int = 0
+    error_count: int = 0
+    unchanged_count: int = 0
+    elapsed: float = 0.0
+    source_bytes: int = 0
+    output_bytes: int = 0
+    results: list = field(default_factory=list, repr=False)
+
+
+def get_output_path(file_path, mode=OUTPUT_SIBLING, base_dir=None, output_dir=None):
+    """
+    清理结果的输出路径
+    :param file_path: 源文件路径
+    :param mode: 输出方式，内存模式返回None
+    :param base_dir: 镜像模式下源文件的根目录，输出保持相对于它的路径
+    :param output_dir: 镜像模式的输出根目录
+    """
+    if mode == OUTPUT_MEMORY:
+        return None
+    if mode == OUTPUT_IN_PLACE:
+        return file_path
+    if mode == OUTPUT_MIRROR:
+        return os.path.join(output_dir, os.path.relpath(os.path.abspath(file_path), base_dir))
+    dir_name, file_name = os.path.split(file_path)
+    base_name, ext = os.path.splitext(file_name)
+    return os.path.join(dir_name, f"{base_name}_no_comments{ext}")
+
+
+def common_dir(files):
+    """一组文件的公共目录"""
+    dirs = [os.path.dirname(os.path.abspath(file_path)) for file_path in files]
+    try:
+        return os.path.commonpath(dirs)
+    except ValueError:
+        # Windows下文件位于不同盘符
+        return dirs[0]
+
+
+# 第1、2行的编码声明和第1行的shebang即使删除注释也要保留
+_CODING_RE = re.compile(r'^[ \t\f]*#.*?coding[:=][ \t]*[-\w.]+')
+# 出现在逻辑行中间时不影响语句结构判断的token
+_PLAIN_TOKENS = {tokenize.NAME, tokenize.OP, tokenize.NUMBER}
+# Python 3.12起tokenize由C实现，直接使用；之前的版本按行扫描，避免纯Python分词器的开销
+_LINE_SCAN = sys.version_info < (3, 12)
+# 按行扫描时需要处理的字符，其余代码整段跳过
+_SPECIAL_RE = re.compile(r"[#'\"\\()\[\]{}]")
+_FIRST_WORD_RE = re.compile(r"\s*(\w+)")
+_STRING_PREFIXES = frozenset(
+    "".join(chars)
+    for prefix in ("r", "u", "f", "b", "br", "fr")
+    for ordered in {prefix, prefix[::-1]}
+    for chars in product(*((char, char.upper()) for char in ordered))
+)
+# 字符串结束位置，与tokenize使用的正则相同
+_STRING_END = {
+    "'": re.compile(tokenize.Single), '"': re.compile(tokenize.Double),
+    "'''": re.compile(tokenize.Single3), '"""': re.compile(tokenize.Double3),
+}
+_CONTINUATIONS = ("\\\n", "\\\r\n", "\\\r")
+_TAB_SIZE = 8
+
+
+def _is_plain_string(token):
+    """普通字符串或bytes字面量，f-string中的表达式可能有副作用，不能删除"""
+    if token.type != tokenize.STRING:
+        return False
+    # 字符串以引号结尾，第一个同样的引号之前是前缀
+    prefix = token.string[:token.string.find(token.string[-1])]
+    return "f" not in prefix.lower()
+
+
+def _split_line_ending(line):
+    if line.endswith("\r\n"):
+        return line[:-2], "\r\n"
+    if line.endswith(("\n", "\r")):
+        return line[:-1], line[-1]
+    return line, ""
+
+
+class _CommentStripper:
+    """
+    按token位置删除注释和非文档字符串的字符串语句，只遍历一次token流
+    源码按物理行缓存，某一行之后不会再有删除时立即输出该行并释放
+    """
+
+    def __init__(self, readline, options):
+        self.options = options
+        self.lines = {}
+        self.cuts = {}
+        self.protected = set()
+        self.next_row = 1
+        self.read_row = 0
+        self.pending_blank = None
+        self._readline = readline
+
+        # 语句结构状态
+        self.line_start = True
+        self.docstring_allowed = True
+        self.header_line = False
+        self.after_async = False
+        self.block_kept = [True]
+        self.pending = None
+        self.deferred = None
+
+    def readline(self):
+        line = self._readline()
+        if line:
+            self.read_row += 1
+            self.lines[self.read_row] = line
+        return line
+
+    def _cut(self, start, end):
+        """删除从start到end的源码，位置为(行, 列)"""
+        (start_row, start_col), (end_row, end_col) = start, end
+        for row in range(start_row, end_row + 1):
+            self.cuts.setdefault(row, []).append((
+                start_col if row == start_row else 0,
+                end_col if row == end_row else None
+            ))
+
+    def _cut_comment(self, start, end, text):
+        row, col = start
+        if row == 1 and text.startswith("#!"):
+            return
+        if row <= 2 and _CODING_RE.match(text):
+            return
+        # 注释前的空白一起删除，避免留下行尾空格
+        before = self.lines[row][:col]
+        self._cut((row, len(before.rstrip(" \t\f"))), end)
+
+    def _emit_rows(self, last_row):
+        """输出直到last_row的全部行"""
+        while self.next_row <= last_row:
+            row = self.next_row
+            self.next_row += 1
+            line = self.lines.pop(row, "")
+            cuts = self.cuts.pop(row, None)
+            protected = row in self.protected
+            self.protected.discard(row)
+            content, ending = _split_line_ending(line)
+            if cuts:
+                pieces = []
+                position = 0
+                for start_col, end_col in sorted(cuts, key=lambda cut: cut[0]):
+                    pieces.append(content[position:max(start_col, position)])
+                    position = len(content) if end_col is None else max(end_col, position)
+                pieces.append(content[position:])
+                content = "".join(pieces)
+                # 删除后只剩空白的行整行删除
+                if not content.strip():
+                    continue
+            yield from self._emit_line(content + ending, protected)
+
+    def _emit_line(self, line, protected):
+        if not self.options.remove_empty or protected:
+            if self.pending_blank is not None:
+                yield self.pending_blank
+                self.pending_blank = None
+            yield line
+            return
+        if not line.strip():
+            # 连续空行只保留一个，文件末尾的空行全部删除
+            if self.pending_blank is None:
+                self.pending_blank = line
+            return
+        if self.pending_blank is not None:
+            yield self.pending_blank
+            self.pending_blank = None
+        yield line
+
+    def _safe_row(self, row):
+        """row之前、且不属于待定字符串语句的行都可以输出"""
+        row -= 1
+        for held in (self.pending, self.deferred):
+            if held:
+                row = min(row, held[0][0] - 1)
+        return row
+
+    def _statement_kept(self):
+        """当前代码块中出现了保留的语句，之前暂缓的字符串语句可以删除"""
+        self.block_kept[-1] = True
+        if self.deferred:
+            self._cut(*self.deferred)
+            self.deferred = None
+
+    def _string_statement(self, start, end):
+        """一条只有字符串的语句，代码块中没有其他语句时保留一条，避免代码块变空"""
+        if self.block_kept[-1] or self.deferred:
+            self._cut(start, end)
+        else:
+            self.deferred = (start, end)
+
+    def _feed(self, token):
+        token_type = token.type
+        if token_type in _PLAIN_TOKENS and not self.line_start and not self.pending:
+            # 绝大多数token只需要记录逻辑行开头是否为def/class
+            if self.after_async:
+                self.after_async = False
+                self.header_line = token.string == "def"
+            return
+        if token.end[0] > token.start[0]:
+            # 跨行字符串内部的行不属于空行处理范围
+            self.protected.update(range(token.start[0] + 1, token.end[0] + 1))
+
+        if token_type == tokenize.COMMENT:
+            if self.options.remove_single:
+                self._cut_comment(token.start, token.end, token.string)
+            return
+        if token_type == tokenize.NL:
+            return
+
+        if self.pending:
+            if _is_plain_string(token):
+                self.pending = (self.pending[0], token.end)
+                return
+            start, end = self.pending
+            self.pending = None
+            if token_type == tokenize.NEWLINE:
+                self._string_statement(start, end)
+            else:
+                self._statement_kept()
+
+        if token_type == tokenize.INDENT:
+            self.block_kept.append(False)
+            self.docstring_allowed = self.header_line
+            return
+        if token_type == tokenize.DEDENT:
+            self.block_kept.pop()
+            # 代码块只有被暂缓的字符串语句，保留它
+            self.deferred = None
+            return
+        if token_type == tokenize.NEWLINE:
+            self.line_start = True
+            self.after_async = False
+            return
+        if token_type == tokenize.ENDMARKER:
+            return
+
+        if self.line_start:
+            self.line_start = False
+            self.header_line = token.string in ("def", "class")
+            self.after_async = token.string == "async"
+            docstring = self.docstring_allowed
+            self.docstring_allowed = False
+            if self.options.remove_multi and not docstring and _is_plain_string(token):
+                self.pending = (token.start, token.end)
+                if len(self.block_kept) == 1:
+                    # 模块级的语句删光也不影响语法
+                    self.block_kept[0] = True
+            else:
+                self._statement_kept()
+        elif self.after_async:
+            self.after_async = False
+            self.header_line = token.string == "def"
+
+    def run(self):
+        current_row = 0
+        for token in tokenize.generate_tokens(self.readline):
+            self._feed(token)
+            # 进入新的一行时才检查是否有可以输出的行
+            if token.start[0] != current_row:
+                current_row = token.start[0]
+                row = self._safe_row(current_row)
+                if row >= self.next_row:
+                    yield from self._emit_rows(row)
+        yield from self._emit_rows(self.read_row)
+
+
+class _LineScanStripper(_CommentStripper):
+    """
+    不经过tokenize，按行扫描出注释、字符串、括号和缩进，其余token整段跳过
+    判断规则与_CommentStripper完全相同，只是找token的方式不同：
+    Python 3.12之前tokenize是纯Python实现，逐个生成token是清洗的主要开销
+    """
+
+    def _other(self, segment):
+        """一段不含字符串和注释的代码（名称、运算符、数字等）"""
+        if self.pending:
+            # 字符串后面还有其他内容，不是只有字符串的语句
+            self.pending = None
+            self._statement_kept()
+            return
+        if self.line_start:
+            self.line_start = False
+            match = _FIRST_WORD_RE.match(segment)
+            word = match.group(1) if match else ""
+            self.header_line = word in ("def", "class")
+            self.docstring_allowed = False
+            self._statement_kept()
+            if word != "async":
+                return
+            # async之后的token决定是不是async def
+            match = _FIRST_WORD_RE.match(segment, match.end())
+            if not match:
+                self.after_async = True
+                return
+            self.header_line = match.group(1) == "def"
+        elif self.after_async:
+            self.after_async = False
+            match = _FIRST_WORD_RE.match(segment)
+            self.header_line = bool(match) and match.group(1) == "def"
+
+    def _string(self, start, end, plain):
+        if end[0] > start[0]:
+            # 跨行字符串内部的行不属于空行处理范围
+            self.protected.update(range(start[0] + 1, end[0] + 1))
+        if self.pending:
+            if plain:
+                self.pending = (self.pending[0], end)
+            else:
+                self.pending = None
+                self._statement_kept()
+            return
+        if self.line_start:
+            self.line_start = False
+            self.header_line = False
+            docstring = self.docstring_allowed
+            self.docstring_allowed = False
+            if self.options.remove_multi and not docstring and plain:
+                self.pending = (start, end)
+                if len(self.block_kept) == 1:
+                    # 模块级的语句删光也不影响语法
+                    self.block_kept[0] = True
+            else:
+                self._statement_kept()
+        elif self.after_async:
+            self.after_async = False
+            self.header_line = False
+
+    def _comment(self, row, col, line):
+        if self.options.remove_single:
+            content = line.rstrip("\r\n")
+            self._cut_comment((row, col), (row, len(content)), content[col:])
+
+    def _newline(self):
+        if self.pending:
+            self._string_statement(*self.pending)
+            self.pending = None
+        self.line_start = True
+        self.after_async = False
+
+    def _set_indent(self, indents, line, pos):
+        """新逻辑行的缩进与缩进栈比较，相当于tokenize的INDENT和DEDENT"""
+        whitespace = line[:pos]
+        if "\t" not in whitespace and "\f" not in whitespace:
+            column = pos
+        else:
+            column = 0
+            for char in whitespace:
+                if char == " ":
+                    column += 1
+                elif char == "\t":
+                    column = (column // _TAB_SIZE + 1) * _TAB_SIZE
+                elif char == "\f":
+                    column = 0
+        if column > indents[-1]:
+            indents.append(column)
+            self.block_kept.append(False)
+            self.docstring_allowed = self.header_line
+            return
+        while column < indents[-1]:
+            indents.pop()
+            self.block_kept.pop()
+            # 代码块只有被暂缓的字符串语句，保留它
+            self.deferred = None
+        if column != indents[-1]:
+            raise IndentationError("unindent does not match any outer indentation level",
+                                   ("<tokenize>", self.read_row, pos, line))
+
+    def run(self):
+        indents = [0]
+        string = None  # 跨行的字符串：(起点, 结束位置的正则, 是否三引号, 是否普通字符串)
+        depth = 0
+        continued = False
+        while True:
+            line = self.readline()
+            if not line:
+                break
+            row = self.read_row
+            pos = 0
+            if string:
+                start, end_pattern, triple, plain = string
+                match = end_pattern.match(line)
+                if not match:
+                    if not triple and not line.endswith(_CONTINUATIONS):
+                        raise tokenize.TokenError("unterminated string literal", start)
+                    continue
+                pos = match.end()
+                string = None
+                self._string(start, (row, pos), plain)
+            elif depth == 0 and not continued:
+                content = line.lstrip(" \t\f")
+                pos = len(line) - len(content)
+                if not content or content[0] in "#\r\n":
+                    # 空行和只有注释的行不影响语句结构
+                    if content[:1] == "#":
+                        self._comment(row, pos, line)
+                    row = self._safe_row(row + 1)
+                    if row >= self.next_row:
+                        yield from self._emit_rows(row)
+                    continue
+                self._set_indent(indents, line, pos)
+            continued = False
+
+            length = len(line)
+            while True:
+                match = _SPECIAL_RE.search(line, pos)
+                stop = match.start() if match else length
+                char = match.group() if match else ""
+                segment_end = stop
+                prefix = ""
+                if char == '"' or char == "'":
+                    # 引号前紧挨着的字母是字符串前缀
+                    word_start = stop
+                    while word_start > pos and word_start > stop - 3 and \
+                            (line[word_start - 1].isalnum() or line[word_start - 1] == "_"):
+                        word_start -= 1
+                    if word_start < stop and line[word_start:stop] in _STRING_PREFIXES and not (
+                            word_start > pos and (line[word_start - 1].isalnum() or line[word_start - 1] == "_")):
+                        prefix = line[word_start:stop]
+                        segment_end = word_start
+                if segment_end > pos and not line[pos:segment_end].isspace():
+                    self._other(line[pos:segment_end])
+                if not match:
+                    break
+                if char == "#":
+                    self._comment(row, stop, line)
+                    break
+                if char == '"' or char == "'":
+                    triple = line.startswith(char * 3, stop)
+                    quote = char * 3 if triple else char
+                    end_pattern = _STRING_END[quote]
+                    start = (row, stop - len(prefix))
+                    plain = "f" not in prefix and "F" not in prefix
+                    end_match = end_pattern.match(line, stop + len(quote))
+                    if end_match:
+                        pos = end_match.end()
+                        self._string(start, (row, pos), plain)
+                        continue
+                    if not triple and not line.endswith(_CONTINUATIONS):
+                        raise tokenize.TokenError("unterminated string literal", start)
+                    string = (start, end_pattern, triple, plain)
+                    break
+                if char == "\\":
+                    if line.startswith(("\n", "\r"), stop + 1):
+                        continued = True
+                        break
+                    raise tokenize.TokenError("unexpected character after line continuation character", (row, stop))
+                # 括号
+                self._other(char)
+                depth += 1 if char in "([{" else -1
+                pos = stop + 1
+
+            if not string and not continued and depth <= 0:
+                self._newline()
+            # 未结束的字符串所在的行之后可能整体删除，暂不输出
+            limit = self._safe_row(row + 1)
+            if string:
+                limit = min(limit, string[0][0] - 1)
+            if limit >= self.next_row:
+                yield from self._emit_rows(limit)
+
+        if string:
+            raise tokenize.TokenError("EOF in multi-line string", string[0])
+        if continued or depth:
+            raise tokenize.TokenError("EOF in multi-line statement", (self.read_row, 0))
+        self.pending = None
+        self.deferred = None
+        yield from self._emit_rows(self.read_row)
+
+
+def iter_stripped_lines(readline, options):
+    """
+    单次遍历token流，删除注释和非文档字符串的字符串语句
+    除被删除的内容外输出与源码逐字节一致，保留shebang和编码声明
+    :param readline: 读取源码行的函数，行尾保留原始换行符
+    :param options: CleanOptions
+    :return: 输出行的生成器
+    """
+    stripper = _LineScanStripper if _LINE_SCAN else _CommentStripper
+    return stripper(readline, options).run()
+
+
+def strip_source(source, options):
+    """清理一段源码字符串"""
+    return "".join(iter_stripped_lines(io.StringIO(source, newline="").readline, options))
+
+
+class _HashingStream:
+    """包装文本流，按UTF-8字节累计读写内容的哈希和大小"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.hasher = hashlib.sha256()
+        self.size = 0
+
+    def _count(self, text):
+        data = text.encode('utf-8')
+        self.hasher.update(data)
+        self.size += len(data)
+
+    def readline(self):
+        line = self.stream.readline()
+        self._count(line)
+        return line
+
+    def write(self, text):
+        self._count(text)
+        self.stream.write(text)
+
+
+def clean_stream(source, target, options):
+    """
+    流式清洗：从source逐行读取、逐行写入target，内存占用与文件大小无关，
+    只有跨越多行的单个token（如很长的三引号字符串）需要整体留在内存中
+    :param source: 以newline=''打开的源码文本流
+    :param target: 以newline=''打开的输出文本流
+    :param options: CleanOptions
+    :return: (源码哈希, 源码字节数, 输出哈希, 输出字节数)
+    """
+    reader = _HashingStream(source)
+    writer = _HashingStream(target)
+    for line in iter_stripped_lines(reader.readline, options):
+        writer.write(line)
+    return reader.hasher.hexdigest(), reader.size, writer.hasher.hexdigest(), writer.size
+
+
+def _diff_text(file_path, source, output, max_lines):
+    lines = difflib.unified_diff(
+        source.splitlines(keepends=True), output.splitlines(keepends=True),
+        fromfile=file_path, tofile=f"{file_path} (清洗后)"
+    )
+    diff = []
+    for index, line in enumerate(lines):
+        if index >= max_lines:
+            diff.append(f"... 差异超过 {max_lines} 行，已省略\n")
+            break
+        diff.append(line if line.endswith(("\n", "\r")) else line + "\n")
+    return "".join(diff)
+
+
+def clean_file(file_path, options, output_path="", known_hash=None, diff_lines=0):
+    """
+    处理一个文件，在工作进程中执行，异常转换为失败结果返回
+    写文件时先流式写入同目录的临时文件，成功后再原子替换目标文件，失败时不会留下不完整的输出
+    :param file_path: 源文件路径
+    :param options: CleanOptions
+    :param output_path: 输出路径，空字符串表示同目录下的*_no_comments.py，None表示只在内存中清洗
+    :param known_hash: 清单中记录的源文件哈希，内容相同且输出完好时不再重新清洗
+    :param diff_lines: 内存模式下生成的差异最多行数，0表示不生成
+    :return: CleanResult，内存模式下output_text为清洗后的文本
+    """
+    result = CleanResult(file_path)
+    try:
+        if not os.path.exists(file_path):
+            result.error = "文件不存在"
+            return result
+        if not file_path.lower().endswith('.py'):
+            result.skipped = True
+            return result
+
+        if output_path is None:
+            with open(file_path, 'r', encoding='utf-8', newline='') as source:
+                source_text = source.read()
+            target = io.StringIO(newline='')
+            result.source_hash, result.file_size, result.output_hash, result.new_file_size = \
+                clean_stream(io.StringIO(source_text, newline=''), target, options)
+            result.output_text = target.getvalue()
+            if diff_lines:
+                result.diff = _diff_text(file_path, source_text, result.output_text, diff_lines)
+            result.success = True
+            return result
+
+        result.new_file_path = output_path or get_output_path(file_path)
+        if known_hash and hash_file(file_path) == known_hash:
+            result.source_hash = known_hash
+            result.file_size = os.path.getsize(file_path)
+            result.unchanged = True
+            result.success = True
+            return result
+
+        with open(file_path, 'r', encoding='utf-8', newline='') as source, \
+                atomic_write(result.new_file_path, encoding='utf-8', newline='') as target:
+            result.source_hash, result.file_size, result.output_hash, result.new_file_size = \
+                clean_stream(source, target, options)
+            if result.new_file_path == file_path:
+                # 原地替换时保留源文件的权限
+                shutil.copymode(file_path, target.name)
+        result.success = True
+    except Exception as e:
+        result.error = str(e)
+    return result
+
+
+class CleanManifest:
+    """
+    增量清洗清单，默认保存在所选文件公共目录下的.pack_cache/clean_manifest.json
+    每个源文件记录内容哈希、清理选项和输出文件哈希，以及两者的大小和修改时间
+    """
+
+    def __init__(self, project_dir, path=None):
+        """
+        :param project_dir: 清单所在的项目目录
+        :param path: 清单文件路径，用于与清洗标签页的清单分开保存（如打包前的源码暂存）
+        """
+        self.path = path or os.path.join(project_dir, CACHE_DIR_NAME, "clean_manifest.json")
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    @staticmethod
+    def _stat(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def check(self, file_path, options, output_path):
+        """
+        检查文件是否需要重新清洗
+        :param output_path: 本次的输出路径，与上次不同时需要重新清洗
+        :return: (是否确定未变化, 需要在读取内容后比较的源文件哈希)
+        """
+        entry = self.entries.get(os.path.abspath(file_path))
+        if not entry or entry["options"] != asdict(options):
+            return False, None
+        if entry["output"] != os.path.abspath(output_path):
+            return False, None
+        # 输出文件被删除或修改时必须重新清洗
+        if self._stat(entry["output"]) != entry["output_stat"]:
+            return False, None
+        # 源文件大小和修改时间都没有变化，不必读取内容
+        if self._stat(file_path) == entry["source_stat"]:
+            return True, None
+        return False, entry["source_hash"]
+
+    def update(self, result, options):
+        key = os.path.abspath(result.file_path)
+        if not result.success:
+            self.entries.pop(key, None)
+            return
+        entry = self.entries.get(key) if result.unchanged else None
+        if entry is None:
+            entry = {"output_hash": result.output_hash}
+        # 原地替换后源文件就是输出文件
+        in_place = os.path.abspath(result.new_file_path) == key
+        entry.update(
+            options=asdict(options),
+            source_hash=entry["output_hash"] if in_place else result.source_hash,
+            source_stat=self._stat(result.file_path),
+            output=os.path.abspath(result.new_file_path),
+            output_stat=self._stat(result.new_file_path),
+        )
+        self.entries[key] = entry
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with atomic_write(self.path, encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+
+
+def format_result(result):
+    """把一个文件的处理结果格式化为日志"""
+    if result.skipped:
+        return f"警告: 跳过非Python文件 - {result.file_path}\n"
+    if not result.success:
+        return f"处理出错: {result.file_path} - {result.error}\n"
+    target = result.new_file_path or f"{result.file_path} (未写入文件)"
+    if result.file_size:
+        size_reduction = (result.file_size - result.new_file_size) / result.file_size * 100
+        return f"处理完成: {target} (大小减少: {size_reduction:.1f}%)\n"
+    return f"处理完成: {target}\n"
+
+
+def format_summary(summary):
+    """生成与逐个处理时相同的总结信息"""
+    minutes, seconds = divmod(summary.elapsed, 60)
+    text = (
+        f"\n处理完成！\n"
+        f"总文件数: {summary.total}\n"
+        f"成功处理: {summary.success_count}\n"
+        f"处理失败: {summary.error_count}\n"
+        f"总耗时: {int(minutes)}分{int(seconds)}秒\n"
+    )
+    if summary.unchanged_count:
+        text += f"未变化跳过: {summary.unchanged_count}\n"
+    if summary.source_bytes:
+        reduction = (summary.source_bytes - summary.output_bytes) / summary.source_bytes * 100
+        text += f"总大小: {summary.source_bytes / 1024:.1f} KB -> {summary.output_bytes / 1024:.1f} KB (减少 {reduction:.1f}%)\n"
+    if summary.error_count > 0:
+        text += f"\n注意: 有 {summary.error_count} 个文件处理失败，请检查上述错误信息\n"
+    return text
+
+
+class CleanEngine:
+    """并行清洗引擎，文件分批提交给进程池，结果按完成顺序汇报"""
+
+    def __init__(self, options, max_workers=None, log=None, incremental=False,
+                 output_mode=OUTPUT_SIBLING, output_dir=None, show_diff=False, base_dir=None,
+                 manifest_path=None):
+        """
+        :param options: CleanOptions
+        :param max_workers: 进程数，默认为CPU核数
+        :param log: 日志回调，可以在任意线程调用
+        :param incremental: 增量清洗，跳过清单中记录的未变化文件，内存模式下无效
+        :param output_mode: 输出方式，见OUTPUT_MODES
+        :param output_dir: 镜像模式的输出根目录
+        :param show_diff: 内存模式下在日志中输出每个文件的差异预览
+        :param base_dir: 镜像模式计算相对路径的基准目录，同时是增量清单所在目录，默认为文件的公共目录
+        :param manifest_path: 增量清单文件路径，默认为基准目录下的.pack_cache/clean_manifest.json
+        """
+        if output_mode not in OUTPUT_MODES:
+            raise ValueError(f"未知的输出方式: {output_mode}")
+        if output_mode == OUTPUT_MIRROR and not output_dir:
+            raise ValueError("镜像输出需要指定输出目录")
+        self.options = options
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.log = log or (lambda message: None)
+        self.incremental = incremental and output_mode != OUTPUT_MEMORY
+        self.output_mode = output_mode
+        self.output_dir = output_dir
+        self.show_diff = show_diff
+        self.base_dir = base_dir
+        self.manifest_path = manifest_path
+
+    def _chunksize(self, total):
+        # 每个进程约分到4批，兼顾负载均衡和进程间通信次数
+        return max(1, min(64, total // (self.max_workers * 4)))
+
+    def _results(self, files, output_paths, known_hashes):
+        diff_lines = DIFF_MAX_LINES if self.show_diff and self.output_mode == OUTPUT_MEMORY else 0
+        args = (files, repeat(self.options), output_paths, known_hashes, repeat(diff_lines))
+        if len(files) < PARALLEL_THRESHOLD or self.max_workers == 1:
+            yield from map(clean_file, *args)
+            return
+        with ProcessPoolExecutor(max_workers=min(self.max_workers, len(files))) as executor:
+            yield from executor.map(clean_file, *args, chunksize=self._chunksize(len(files)))
+
+    def _output_paths(self, files):
+        """计算全部输出路径，镜像模式下一次性创建需要的目录，工作进程只负责写文件"""
+        base_dir = (self.base_dir or common_dir(files)) if self.output_mode == OUTPUT_MIRROR else None
+        output_paths = [get_output_path(file_path, self.output_mode, base_dir, self.output_dir) for file_path in files]
+        if self.output_mode == OUTPUT_MIRROR:
+            for directory in {os.path.dirname(path) for path in output_paths}:
+                os.makedirs(directory, exist_ok=True)
+        return output_paths
+
+    def run(self, files):
+        """
+        处理全部文件，阻塞直到结束
+        :param files: 文件路径列表
+        :return: CleanSummary，results中包含每个文件的CleanResult
+        """
+        files = list(files)
+        summary = CleanSummary(total=len(files))
+        if not files:
+            self.log("没有文件需要处理\n")
+            return summary
+
+        self.log(f"开始处理 {summary.total} 个文件...\n")
+        start_time = time.time()
+
+        # 增量清洗：大小和修改时间都没变的文件直接跳过，其余文件在工作进程中比较内容哈希
+        manifest = None
+        if self.incremental:
+            manifest = CleanManifest(self.base_dir or common_dir(files), self.manifest_path)
+        pending_files = []
+        pending_outputs = []
+        known_hashes = []
+        for file_path, output_path in zip(files, self._output_paths(files)):
+            known_hash = None
+            if manifest:
+                unchanged, known_hash = manifest.check(file_path, self.options, output_path)
+                if unchanged:
+                    summary.unchanged_count += 1
+                    continue
+            pending_files.append(file_path)
+            pending_outputs.append(output_path)
+            known_hashes.append(known_hash)
+        if summary.unchanged_count:
+            self.log(f"跳过 {summary.unchanged_count} 个未变化的文件\n")
+
+        last_report = start_time
+        processed_count = summary.unchanged_count
+        try:
+            for result in self._results(pending_files, pending_outputs, known_hashes):
+                processed_count += 1
+                summary.results.append(result)
+                if manifest:
+                    manifest.update(result, self.options)
+                if result.unchanged:
+                    summary.unchanged_count += 1
+                else:
+                    if result.success:
+                        summary.success_count += 1
+                        summary.source_bytes += result.file_size
+                        summary.output_bytes += result.new_file_size
+                    elif not result.skipped:
+                        summary.error_count += 1
+                    self.log(format_result(result))
+                    if result.diff:
+                        self.log(result.diff)
+
+                # 进度按时间间隔汇报，而不是每个文件一次
+                now = time.time()
+                if now - last_report >= PROGRESS_INTERVAL or processed_count == summary.total:
+                    last_report = now
+                    progress = int(processed_count / summary.total * 100)
+                    self.log(f"[{progress}%] 已处理 {processed_count}/{summary.total}\n")
+        finally:
+            if manifest:
+                # 清单只用于跳过未变化的文件，保存失败时下次全部重新清洗
+                try:
+                    manifest.save()
+                except OSError as e:
+                    self.log(f"保存清洗清单失败: {str(e)}\n")
+
+        summary.elapsed = time.time() - start_time
+        self.log(format_summary(summary))
+        return summary
@@ -0,0 +1,69 @@
+"""
+文件集合
+保持添加顺序、用集合去重的文件列表，删除时一次重建而不是逐个下标删除，
+并提供按关键字过滤后的可见视图，供虚拟列表显示
+"""
+
+
+class FileCollection:
+    """有序、去重的文件列表，迭代和len()针对全部文件，visible为过滤后的视图"""
+
+    def __init__(self, items=()):
+        self.items = []
+        self._index = set()
+        self.filter_text = ""
+        self._visible = None
+        self.add(items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __contains__(self, item):
+        return item in self._index
+
+    def add(self, items):
+        """
+        追加文件，已存在的跳过
+        :return: 实际添加的数量
+        """
+        added = 0
+        for item in items:
+            if item not in self._index:
+                self._index.add(item)
+                self.items.append(item)
+                added += 1
+        if added:
+            self._visible = None
+        return added
+
+    def remove(self, items):
+        """删除一组文件"""
+        removed = set(items) & self._index
+        if removed:
+            self._index -= removed
+            self.items = [item for item in self.items if item not in removed]
+            self._visible = None
+
+    def clear(self):
+        self.items = []
+        self._index = set()
+        self._visible = None
+
+    def set_filter(self, text):
+        """只显示包含关键字的文件，不区分大小写，空字符串显示全部"""
+        text = text.strip().lower()
+        if text != self.filter_text:
+            self.filter_text = text
+            self._visible = None
+
+    @property
+    def visible(self):
+        """过滤后的文件列表"""
+        if not self.filter_text:
+            return self.items
+        if self._visible is None:
+            self._visible = [item for item in self.items if self.filter_text in item.lower()]
+        return self._visible
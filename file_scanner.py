@@ -0,0 +1,108 @@
+"""
+文件夹扫描
+用os.scandir在线程池中并行遍历目录树，跳过版本库、虚拟环境、node_modules和构建输出等目录，
+找到的文件按批次交给回调，调用方可以边扫描边显示结果
+"""
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# 默认跳过的目录名
+DEFAULT_SKIP_DIRS = frozenset({
+    ".git", ".hg", ".svn", ".idea", ".vscode",
+    "__pycache__", ".mypy_cache", ".pytest_cache", ".tox", ".nox",
+    ".venv", "venv", "env", "node_modules",
+    "build", "dist", ".pack_cache",
+})
+# 每批交给回调的文件数
+CHUNK_SIZE = 500
+# 扫描线程数，目录遍历主要等待磁盘，线程数可以多于CPU核数
+MAX_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+
+def is_virtualenv(path):
+    """任意名称的虚拟环境目录都有pyvenv.cfg"""
+    return os.path.isfile(os.path.join(path, "pyvenv.cfg"))
+
+
+class FolderScanner:
+    """并行扫描目录树，按批次回调找到的文件"""
+
+    def __init__(self, root_dir, suffixes=(".py",), skip_dirs=DEFAULT_SKIP_DIRS,
+                 on_chunk=None, chunk_size=CHUNK_SIZE, max_workers=MAX_WORKERS):
+        """
+        :param root_dir: 要扫描的目录
+        :param suffixes: 需要的文件扩展名，为空时返回全部文件
+        :param skip_dirs: 跳过的目录名
+        :param on_chunk: 回调，参数为一批文件路径列表，在扫描线程中调用
+        :param chunk_size: 每批的文件数
+        :param max_workers: 并行扫描的线程数
+        """
+        self.root_dir = root_dir
+        self.suffixes = tuple(suffix.lower() for suffix in suffixes)
+        self.skip_dirs = skip_dirs
+        self.on_chunk = on_chunk or (lambda chunk: None)
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.file_count = 0
+        self.error_count = 0
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    @property
+    def stop_requested(self):
+        return self._stop_event.is_set()
+
+    def _scan_dir(self, path):
+        """
+        扫描一个目录，不递归
+        :return: (文件列表, 子目录列表, 是否出错)
+        """
+        files = []
+        subdirs = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in self.skip_dirs and not is_virtualenv(entry.path):
+                                subdirs.append(entry.path)
+                        elif not self.suffixes or entry.name.lower().endswith(self.suffixes):
+                            files.append(entry.path)
+                    except OSError:
+                        continue
+        except OSError:
+            return files, subdirs, True
+        files.sort()
+        return files, subdirs, False
+
+    def run(self):
+        """
+        扫描整个目录树，阻塞直到结束或被停止
+        :return: 找到的文件数
+        """
+        buffer = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            running = {executor.submit(self._scan_dir, self.root_dir)}
+            while running and not self.stop_requested:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    files, subdirs, failed = future.result()
+                    self.error_count += failed
+                    buffer.extend(files)
+                    for subdir in subdirs:
+                        running.add(executor.submit(self._scan_dir, subdir))
+                while len(buffer) >= self.chunk_size:
+                    self._emit(buffer[:self.chunk_size])
+                    del buffer[:self.chunk_size]
+            for future in running:
+                future.cancel()
+        if buffer and not self.stop_requested:
+            self._emit(buffer)
+        return self.file_count
+
+    def _emit(self, chunk):
+        self.file_count += len(chunk)
+        self.on_chunk(chunk)
@@ -0,0 +1,205 @@
+"""
+图标检测
+遍历主程序及其本地模块的语法树，查找iconbitmap、wm_iconbitmap、iconphoto调用和icon=设置，
+找不到时再从资源文件和主程序目录中找.ico文件；
+检测结果按涉及的文件和目录的大小、修改时间缓存在.pack_cache/icon_cache.json，都没有变化时不再解析源码
+"""
+import ast
+import json
+import os
+
+from build_cache import CACHE_DIR_NAME, atomic_write
+from import_graph import collect_local_modules
+
+ICON_SUFFIXES = (".ico", ".png")
+# 设置窗口图标的方法，参数为图标路径或PhotoImage
+ICON_METHODS = frozenset({"iconbitmap", "wm_iconbitmap", "iconphoto", "wm_iconphoto"})
+# 主程序目录中有多个.ico文件时优先使用的文件名
+COMMON_ICON_NAMES = ("icon.ico", "app.ico", "main.ico", "favicon.ico")
+
+
+def _string_value(node, names):
+    """
+    求出表达式对应的路径字符串
+    支持字符串常量、本文件中赋值过的变量名，以及PhotoImage(file=...)这类带file参数的调用
+    """
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.Name):
+        return names.get(node.id)
+    if isinstance(node, ast.Call):
+        for keyword in node.keywords:
+            if keyword.arg == "file":
+                return _string_value(keyword.value, names)
+    return None
+
+
+def find_icon_references(tree):
+    """
+    在一次语法树遍历中找出代码里设置的图标路径
+    :param tree: ast.Module
+    :return: 按在源码中出现的位置排列的图标路径列表，只包含ICON_SUFFIXES中的扩展名
+    """
+    names = {}
+    candidates = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    names[target.id] = node.value
+                # icon = "app.ico" 或 app.icon = "app.ico"
+                name = target.id if isinstance(target, ast.Name) else getattr(target, "attr", None)
+                if name == "icon":
+                    candidates.append((node, node.value))
+        elif isinstance(node, ast.Call):
+            func = node.func
+            method = func.attr if isinstance(func, ast.Attribute) else getattr(func, "id", None)
+            if method in ICON_METHODS:
+                candidates.extend((node, arg) for arg in node.args)
+                candidates.extend((node, keyword.value) for keyword in node.keywords)
+            else:
+                candidates.extend((node, keyword.value) for keyword in node.keywords if keyword.arg == "icon")
+
+    # 变量名可能在使用之后才赋值（如在函数中引用模块级常量），遍历结束后再解析
+    names = {name: _string_value(value, {}) for name, value in names.items()}
+    candidates.sort(key=lambda item: (item[0].lineno, item[0].col_offset))
+    found = []
+    for _, value in candidates:
+        path = _string_value(value, names)
+        if path and path.lower().endswith(ICON_SUFFIXES):
+            found.append(path)
+    return found
+
+
+def _list_icons(directory):
+    """目录中的.ico文件名，按文件名排序；目录不存在时返回空列表"""
+    try:
+        return sorted(file for file in os.listdir(directory) if file.lower().endswith(".ico"))
+    except OSError:
+        return []
+
+
+def _find_ico_in_dir(directory, icons):
+    """目录中的.ico文件，优先常见的图标文件名，其余按文件名排序"""
+    for name in COMMON_ICON_NAMES:
+        if name in icons:
+            return os.path.join(directory, name)
+    return os.path.join(directory, icons[0]) if icons else None
+
+
+def _detect(main_script, resources):
+    """
+    :return: (图标路径或None, 检测结果依赖的文件列表, 检测时查找过.ico的目录)
+    """
+    main_script = os.path.abspath(main_script)
+    main_dir = os.path.dirname(main_script)
+    references = []
+
+    def visit(file_path, tree):
+        references.extend((file_path, path) for path in find_icon_references(tree))
+
+    modules = collect_local_modules(main_script, visit=visit)
+    # 只记录模块和图标候选文件本身：目录的修改时间会随build、dist等目录的创建和删除而变化
+    watched = list(modules)
+    icon_dirs = []
+
+    # 相对路径先按所在文件的目录查找，再按主程序目录（程序通常在这里启动）查找
+    for file_path, icon_path in references:
+        for base_dir in dict.fromkeys((os.path.dirname(file_path), main_dir)):
+            candidate = os.path.abspath(os.path.join(base_dir, icon_path))
+            # 不存在的候选也记录，之后补上图标文件时缓存失效
+            watched.append(candidate)
+            if os.path.isfile(candidate):
+                return candidate, watched, icon_dirs
+
+    # 检查资源文件中是否有图标文件
+    for resource in resources:
+        if os.path.isdir(resource):
+            icon_dirs.append(resource)
+            icon = _find_ico_in_dir(resource, _list_icons(resource))
+            if icon:
+                return icon, watched, icon_dirs
+            continue
+        watched.append(resource)
+        if resource.lower().endswith(".ico") and os.path.isfile(resource):
+            return resource, watched, icon_dirs
+
+    # 检查主程序文件所在目录中是否有.ico文件
+    icon_dirs.append(main_dir)
+    return _find_ico_in_dir(main_dir, _list_icons(main_dir)), watched, icon_dirs
+
+
+class IconCache:
+    """
+    图标检测结果缓存，每个主程序一条，记录检测时依赖的文件状态，
+    以及查找过图标的目录中的.ico文件名（新增图标时失效，而不是按目录的修改时间）
+    """
+
+    def __init__(self, project_dir):
+        self.path = os.path.join(project_dir, CACHE_DIR_NAME, "icon_cache.json")
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    @staticmethod
+    def _stat(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def lookup(self, main_script, resources):
+        """
+        :return: (是否命中, 缓存的图标路径)
+        """
+        entry = self.entries.get(os.path.abspath(main_script))
+        if not entry or entry["resources"] != list(resources) or "icon_dirs" not in entry:
+            return False, None
+        if any(self._stat(path) != stat for path, stat in entry["watched"].items()):
+            return False, None
+        if any(_list_icons(directory) != icons for directory, icons in entry["icon_dirs"].items()):
+            return False, None
+        if entry["icon"] and not os.path.isfile(entry["icon"]):
+            return False, None
+        return True, entry["icon"]
+
+    def store(self, main_script, resources, icon, watched, icon_dirs):
+        # 先创建缓存目录，再读取文件状态
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.entries[os.path.abspath(main_script)] = {
+            "resources": list(resources),
+            "watched": {path: self._stat(path) for path in watched},
+            "icon_dirs": {directory: _list_icons(directory) for directory in icon_dirs},
+            "icon": icon,
+        }
+        with atomic_write(self.path, encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+
+
+def detect_icon_from_code(main_script, resources, log=None):
+    """
+    从代码中检测图标设置
+    :param main_script: 主程序文件路径
+    :param resources: 资源文件列表
+    :param log: 日志回调
+    :return: 检测到的图标文件路径，如果没有检测到则返回None
+    """
+    try:
+        cache = IconCache(os.path.dirname(os.path.abspath(main_script)))
+        hit, icon = cache.lookup(main_script, resources)
+        if hit:
+            return icon
+        icon, watched, icon_dirs = _detect(main_script, resources)
+        try:
+            cache.store(main_script, resources, icon, watched, icon_dirs)
+        except OSError as e:
+            if log:
+                log(f"保存图标检测缓存失败: {str(e)}\n")
+        return icon
+    except Exception as e:
+        if log:
+            log(f"检测图标时出错: {str(e)}\n")
+        return None
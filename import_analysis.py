@@ -0,0 +1,165 @@
+"""
+导入分析
+在打包前遍历主程序的导入图，按文件内容哈希缓存每个文件的导入语句，
+据此生成PyInstaller的--hidden-import和--collect-*参数：
+动态导入的模块作为隐藏导入，没有用到tkinter时不再附带--collect-all=tkinter。
+导入图只包含项目直接的导入，第三方库内部的导入仍由PyInstaller自己分析，所以不生成--exclude-module
+"""
+import json
+import os
+from dataclasses import dataclass, field
+
+from build_cache import CACHE_DIR_NAME, atomic_write, hash_file
+from import_graph import extract_imports, parse_module, resolve_imports
+
+# 导入这些模块（或以它们开头的子模块）时需要tkinter及其Tcl/Tk数据
+TK_USERS = (
+    "tkinter", "Tkinter", "_tkinter", "turtle", "idlelib",
+    "PIL.ImageTk", "matplotlib", "customtkinter", "ttkbootstrap", "PySimpleGUI", "tkinterdnd2", "pygubu",
+)
+
+
+def _matches(name, prefixes):
+    return any(name == prefix or name.startswith(prefix + ".") for prefix in prefixes)
+
+
+def _package_sources(package, search_dirs):
+    """
+    查找本地包目录中的全部源文件，动态拼接模块名时运行时可能导入其中任何一个
+    :param package: 点分包名
+    :return: 源文件绝对路径列表，不是本地包时返回空列表
+    """
+    for base_dir in search_dirs:
+        package_dir = os.path.join(base_dir, *package.split("."))
+        if not os.path.isdir(package_dir):
+            continue
+        sources = []
+        for root, dirs, files in os.walk(package_dir):
+            dirs[:] = sorted(name for name in dirs if name != "__pycache__" and not name.startswith("."))
+            sources.extend(os.path.abspath(os.path.join(root, file)) for file in sorted(files) if file.endswith(".py"))
+        return sources
+    return []
+
+
+@dataclass
+class ImportAnalysis:
+    """导入分析结果"""
+    modules: list = field(default_factory=list)  # 本地模块源文件，第一个为主程序
+    external: list = field(default_factory=list)  # 导入的外部模块点分名称
+    hidden_imports: list = field(default_factory=list)  # 动态导入的模块，PyInstaller静态分析找不到
+    collect_submodules: list = field(default_factory=list)  # 动态拼接模块名时的包，需要收集全部子模块
+
+    @property
+    def uses_tkinter(self):
+        return any(_matches(name, TK_USERS) for name in self.external)
+
+    def pyinstaller_args(self):
+        """生成PyInstaller参数"""
+        args = ["--collect-all=tkinter"] if self.uses_tkinter else []
+        args.extend(f"--hidden-import={name}" for name in self.hidden_imports)
+        args.extend(f"--collect-submodules={name}" for name in self.collect_submodules)
+        return args
+
+
+class ImportCache:
+    """
+    每个源文件的导入语句缓存，保存在项目的.pack_cache/import_graph.json
+    文件大小和修改时间不变时直接使用；变化时先比较内容哈希，哈希也变了才重新解析
+    """
+
+    def __init__(self, project_dir):
+        self.path = os.path.join(project_dir, CACHE_DIR_NAME, "import_graph.json")
+        self.changed = False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    @staticmethod
+    def _stat(path):
+        stat = os.stat(path)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def get(self, file_path):
+        """
+        :return: extract_imports的结果，文件无法读取或解析时返回None
+        """
+        try:
+            stat = self._stat(file_path)
+        except OSError:
+            return None
+        entry = self.entries.get(file_path)
+        if entry and entry["stat"] == stat:
+            return entry["imports"]
+        file_hash = hash_file(file_path)
+        if not entry or entry["hash"] != file_hash:
+            tree = parse_module(file_path)
+            if tree is None:
+                self.entries.pop(file_path, None)
+                return None
+            entry = {"hash": file_hash, "imports": extract_imports(tree)}
+        entry["stat"] = stat
+        self.entries[file_path] = entry
+        self.changed = True
+        return entry["imports"]
+
+    def save(self):
+        if not self.changed:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with atomic_write(self.path, encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+        self.changed = False
+
+
+def analyze_imports(main_script, search_dirs=None, cache=None):
+    """
+    遍历主程序的导入图
+    :param main_script: 主程序文件路径
+    :param search_dirs: 本地模块的搜索目录列表，默认为主程序所在目录
+    :param cache: ImportCache，为None时每个文件都重新解析
+    :return: ImportAnalysis
+    """
+    main_script = os.path.abspath(main_script)
+    if search_dirs is None:
+        search_dirs = [os.path.dirname(main_script)]
+
+    result = ImportAnalysis(modules=[main_script])
+    seen = {main_script}
+    external = {}
+    hidden = {}
+    prefixes = {}
+    index = 0
+    while index < len(result.modules):
+        file_path = result.modules[index]
+        index += 1
+        if cache:
+            info = cache.get(file_path)
+        else:
+            tree = parse_module(file_path)
+            info = extract_imports(tree) if tree else None
+        if info is None:
+            continue
+
+        local, names = resolve_imports(file_path, info["imports"], search_dirs)
+        external.update(dict.fromkeys(names))
+        for name in info["dynamic"]:
+            hidden[name] = None
+            dynamic_local, dynamic_external = resolve_imports(file_path, [[0, name, None]], search_dirs)
+            local.extend(dynamic_local)
+            external.update(dict.fromkeys(dynamic_external))
+        for prefix in info["dynamic_prefixes"]:
+            if prefix not in prefixes:
+                prefixes[prefix] = None
+                # 本地包中的模块也要分析，它们的导入（如tkinter）同样会打包进去
+                local.extend(_package_sources(prefix, search_dirs))
+        for path in local:
+            if path not in seen:
+                seen.add(path)
+                result.modules.append(path)
+
+    result.external = sorted(external)
+    result.hidden_imports = list(hidden)
+    result.collect_submodules = list(prefixes)
+    return result
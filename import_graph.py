@@ -0,0 +1,171 @@
+"""
+本地导入分析
+从主程序出发，沿import语句查找项目目录内被引用的Python模块
+"""
+import ast
+import os
+
+
+def _resolve_module(module_name, search_dirs):
+    """
+    在搜索目录中查找模块对应的源文件
+    :param module_name: 点分模块名，如 "pkg.sub"
+    :param search_dirs: 搜索目录列表
+    :return: 源文件路径，找不到时返回None
+    """
+    parts = module_name.split(".")
+    for base_dir in search_dirs:
+        module_path = os.path.join(base_dir, *parts)
+        if os.path.isfile(module_path + ".py"):
+            return module_path + ".py"
+        init_file = os.path.join(module_path, "__init__.py")
+        if os.path.isfile(init_file):
+            return init_file
+    return None
+
+
+def _package_dir(file_path, level):
+    """计算相对导入的基准目录，level为相对导入的点数"""
+    base_dir = os.path.dirname(file_path)
+    for _ in range(level - 1):
+        base_dir = os.path.dirname(base_dir)
+    return base_dir
+
+
+def parse_module(file_path):
+    """
+    解析源文件
+    :return: ast.Module，文件无法读取或解析时返回None
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            return ast.parse(f.read(), filename=file_path)
+    except (OSError, SyntaxError, ValueError):
+        return None
+
+
+def _dynamic_import_target(node):
+    """
+    解析importlib.import_module(...)或__import__(...)调用的模块名
+    :return: (完整模块名, 动态拼接时的固定包名前缀)，无法静态确定时对应项为None
+    """
+    func = node.func
+    name = func.attr if isinstance(func, ast.Attribute) else getattr(func, "id", None)
+    if name not in ("import_module", "__import__") or not node.args:
+        return None, None
+    arg = node.args[0]
+    if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+        return (arg.value, None) if not arg.value.startswith(".") else (None, None)
+    # f"plugins.{name}" 或 "plugins." + name，只能确定所在的包
+    if isinstance(arg, ast.JoinedStr) and arg.values:
+        head = arg.values[0]
+    elif isinstance(arg, ast.BinOp) and isinstance(arg.op, ast.Add):
+        head = arg.left
+    else:
+        return None, None
+    if isinstance(head, ast.Constant) and isinstance(head.value, str) and "." in head.value:
+        prefix = head.value.rsplit(".", 1)[0]
+        if prefix and not prefix.startswith("."):
+            return None, prefix
+    return None, None
+
+
+def extract_imports(tree):
+    """
+    提取语法树中的导入语句，结果只含基本类型，可以直接保存为JSON
+    :return: {"imports": [[相对导入层级, 模块名, from导入的名称列表或None], ...],
+              "dynamic": [动态导入的模块名], "dynamic_prefixes": [动态导入所在的包名]}
+    """
+    imports = []
+    dynamic = []
+    prefixes = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.extend([0, alias.name, None] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            names = [alias.name for alias in node.names if alias.name != "*"]
+            imports.append([node.level, node.module or "", names])
+        elif isinstance(node, ast.Call):
+            name, prefix = _dynamic_import_target(node)
+            if name:
+                dynamic.append(name)
+            elif prefix:
+                prefixes.append(prefix)
+    return {"imports": imports, "dynamic": dynamic, "dynamic_prefixes": prefixes}
+
+
+def resolve_imports(file_path, imports, search_dirs):
+    """
+    把extract_imports得到的导入语句解析为本地模块文件和外部模块名
+    :param file_path: 导入语句所在的源文件
+    :param imports: extract_imports结果中的"imports"
+    :param search_dirs: 绝对导入的搜索目录列表
+    :return: (本地模块源文件绝对路径列表, 外部模块的点分名称列表)
+    """
+    found = []
+    external = []
+    for level, module_name, names in imports:
+        if names is None:
+            # import a.b.c 会依次导入 a、a.b、a.b.c
+            parts = module_name.split(".")
+            paths = [_resolve_module(".".join(parts[:i]), search_dirs) for i in range(1, len(parts) + 1)]
+            found.extend(paths)
+            if paths[0] is None:
+                external.append(module_name)
+            continue
+        dirs = [_package_dir(file_path, level)] if level else search_dirs
+        if module_name:
+            found.append(_resolve_module(module_name, dirs))
+        # from pkg import name 中的name也可能是子模块
+        prefix = module_name + "." if module_name else ""
+        for name in names:
+            found.append(_resolve_module(prefix + name, dirs))
+        if not level and _resolve_module(module_name.split(".")[0], dirs) is None:
+            external.append(module_name)
+            external.extend(prefix + name for name in names)
+    return [os.path.abspath(path) for path in found if path], external
+
+
+def find_local_imports(file_path, search_dirs, tree=None):
+    """
+    查找单个文件直接导入的本地模块
+    :param file_path: Python源文件路径
+    :param search_dirs: 绝对导入的搜索目录列表
+    :param tree: 已解析的语法树，为None时读取文件解析
+    :return: 本地模块源文件路径列表，文件无法解析时返回空列表
+    """
+    if tree is None:
+        tree = parse_module(file_path)
+        if tree is None:
+            return []
+    return resolve_imports(file_path, extract_imports(tree)["imports"], search_dirs)[0]
+
+
+def collect_local_modules(main_script, search_dirs=None, visit=None):
+    """
+    递归收集主程序及其传递导入的全部本地模块
+    :param main_script: 主程序文件路径
+    :param search_dirs: 搜索目录列表，默认为主程序所在目录
+    :param visit: 回调，参数为(文件路径, 语法树)，让调用方在同一次解析中做其他分析
+    :return: 按发现顺序排列的源文件绝对路径列表，第一个元素为主程序
+    """
+    main_script = os.path.abspath(main_script)
+    if search_dirs is None:
+        search_dirs = [os.path.dirname(main_script)]
+
+    modules = [main_script]
+    seen = {main_script}
+    index = 0
+    while index < len(modules):
+        tree = parse_module(modules[index])
+        if tree is None:
+            index += 1
+            continue
+        if visit:
+            visit(modules[index], tree)
+        for path in find_local_imports(modules[index], search_dirs, tree):
+            if path not in seen:
+                seen.add(path)
+                modules.append(path)
+        index += 1
+    return modules
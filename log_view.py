@@ -0,0 +1,140 @@
+"""
+日志面板
+每个文本控件只有一个定时刷新循环：后台线程只往队列里放日志，
+界面线程每个周期把队列中的全部日志合并成一次插入，控件只保留最近的若干行；
+完整日志同时写入磁盘文件，需要时再搜索或打开
+"""
+import os
+import queue
+import threading
+import time
+import tkinter as tk
+
+from build_cache import CACHE_DIR_NAME
+
+# 每个项目保留的完整日志文件数量
+MAX_LOG_FILES = 20
+
+
+def new_log_file_path(project_dir, name):
+    """
+    为一次构建生成完整日志文件路径，并删除超出数量限制的旧日志
+    :param project_dir: 项目目录，日志保存在其中的.pack_cache/logs
+    :param name: 日志名前缀，通常为输出名称
+    """
+    log_dir = os.path.join(project_dir, CACHE_DIR_NAME, "logs")
+    os.makedirs(log_dir, exist_ok=True)
+    old_logs = sorted(
+        (os.path.join(log_dir, file) for file in os.listdir(log_dir) if file.endswith(".log")),
+        key=os.path.getmtime
+    )
+    for old_log in old_logs[:max(0, len(old_logs) - MAX_LOG_FILES + 1)]:
+        os.remove(old_log)
+    return os.path.join(log_dir, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.log")
+
+
+class LogPane:
+    """把日志队列批量刷新到Text控件，控件只保留最近max_lines行，完整日志可同时写入文件"""
+
+    def __init__(self, root, text_widget, log_queue=None, max_lines=5000, interval=100):
+        """
+        :param root: Tk根窗口，用于调度定时刷新
+        :param text_widget: 显示日志的Text控件
+        :param log_queue: 日志队列，为None时新建
+        :param max_lines: 控件最多保留的行数，超出时删除最早的行
+        :param interval: 刷新间隔（毫秒）
+        """
+        self.root = root
+        self.text_widget = text_widget
+        self.log_queue = log_queue if log_queue is not None else queue.Queue()
+        self.max_lines = max_lines
+        self.interval = interval
+        self._after_id = None
+        self.log_file = None
+        self._log_stream = None
+        self._file_lock = threading.Lock()
+
+    def write(self, message):
+        """写入一条日志，可以在任意线程调用"""
+        with self._file_lock:
+            if self._log_stream:
+                self._log_stream.write(message)
+        self.log_queue.put(message)
+
+    def open_log_file(self, path):
+        """开始把完整日志写入文件，之前打开的日志文件会被关闭"""
+        self.close_log_file()
+        with self._file_lock:
+            self._log_stream = open(path, 'w', encoding='utf-8')
+            self.log_file = path
+
+    def close_log_file(self):
+        """停止写入完整日志，日志文件路径保留，仍可搜索或打开"""
+        with self._file_lock:
+            if self._log_stream:
+                self._log_stream.close()
+                self._log_stream = None
+
+    def flush_log_file(self):
+        with self._file_lock:
+            if self._log_stream:
+                self._log_stream.flush()
+
+    def search(self, keyword, max_results=500):
+        """
+        在完整日志文件中逐行搜索，不区分大小写
+        :param keyword: 搜索关键字
+        :param max_results: 最多返回的结果数
+        :return: [(行号, 行内容)]
+        """
+        if not self.log_file or not os.path.exists(self.log_file):
+            return []
+        self.flush_log_file()
+        keyword = keyword.lower()
+        results = []
+        with open(self.log_file, 'r', encoding='utf-8', errors='replace') as f:
+            for line_number, line in enumerate(f, 1):
+                if keyword in line.lower():
+                    results.append((line_number, line.rstrip("\n")))
+                    if len(results) >= max_results:
+                        break
+        return results
+
+    def start(self):
+        """启动刷新循环，重复调用不会产生多个循环"""
+        if self._after_id is None:
+            self._after_id = self.root.after(self.interval, self._drain)
+
+    def clear(self):
+        self.text_widget.delete(1.0, tk.END)
+
+    def _drain(self):
+        """取出队列中的全部日志，合并为一次插入"""
+        lines = []
+        try:
+            while True:
+                lines.append(self.log_queue.get_nowait())
+        except queue.Empty:
+            pass
+
+        if lines:
+            self.flush_log_file()
+            # 只有在用户没有向上翻看时才自动滚动到底部
+            at_bottom = self.text_widget.yview()[1] >= 1.0
+            if len(lines) >= self.max_lines:
+                # 一批日志就超过上限时，旧内容和这批日志的前半部分都不会显示，直接丢弃
+                self.text_widget.delete(1.0, tk.END)
+                lines = lines[-self.max_lines:]
+            self.text_widget.insert(tk.END, "".join(lines))
+            self._trim()
+            if at_bottom:
+                self.text_widget.see(tk.END)
+
+        self._after_id = self.root.after(self.interval, self._drain)
+
+    def _trim(self):
+        """删除超出行数上限的最早日志"""
+        line_count = int(self.text_widget.index("end-1c").split(".")[0])
+        excess = line_count - self.max_lines
+        if excess > 0:
+            self.text_widget.delete(1.0, f"{excess + 1}.0")
@@ -0,0 +1,181 @@
+"""
+命令行入口，无需图形界面即可打包
+
+用法:
+    python -m pack_cli build config.json [--pack-option both] [--incremental] ...
+    python -m pack_cli batch a.py b.py project.json [--output-dir batch_dist] [--jobs 4]
+    python -m pack_cli history config.json [--pack-option both] [--limit 20]
+
+配置文件为JSON，键名与PackConfig的字段一致，其中的相对路径相对于配置文件所在目录，例如:
+    {
+        "main_script": "app.py",
+        "resources": ["assets"],
+        "pack_option": "single_file",
+        "build_cache": true
+    }
+"""
+import argparse
+import sys
+import threading
+
+from batch_pack import BatchRunner, create_batch_jobs, format_summary
+from build_history import BuildHistory, format_history
+from pack_core import PACK_OPTIONS, PackConfig, PackPipeline
+from startup_bench import format_startup_comparison
+
+
+def _print_log(message):
+    sys.stdout.write(message if message.endswith("\n") else message + "\n")
+    sys.stdout.flush()
+
+
+def _apply_overrides(config, args):
+    """用命令行参数覆盖配置文件中的选项"""
+    if args.pack_option:
+        config.pack_option = args.pack_option
+    for name in ("parallel_build", "incremental", "build_cache", "strip_sources", "analyze_imports",
+                 "resource_manifest", "resource_archive", "analyze_size", "enable_upx", "selective_upx"):
+        if getattr(args, name):
+            setattr(config, name, True)
+    if args.startup_runs:
+        config.startup_runs = args.startup_runs
+    if args.python:
+        config.python = args.python
+    return config
+
+
+def _run_interruptible(target, stop):
+    """
+    在后台线程中执行target，主线程保持响应Ctrl+C
+    中断时调用stop结束正在运行的构建，并等待清理完成
+    :return: (target的返回值, 是否被中断)
+    """
+    result = []
+    done = threading.Event()
+
+    def worker():
+        try:
+            result.append(target())
+        finally:
+            done.set()
+
+    threading.Thread(target=worker, daemon=True).start()
+    try:
+        # 用Event轮询而不是Thread.join，join被Ctrl+C打断后可能提前返回
+        while not done.wait(0.2):
+            pass
+    except KeyboardInterrupt:
+        _print_log("正在停止打包...")
+        stop()
+        done.wait()
+        return (result[0] if result else None), True
+    return (result[0] if result else None), False
+
+
+def _load_config(config_file):
+    """读取配置文件，出错时输出原因并返回None"""
+    try:
+        return PackConfig.load(config_file)
+    except ValueError as e:
+        _print_log(str(e))
+        return None
+
+
+def cmd_build(args):
+    config = _load_config(args.config)
+    if config is None:
+        return 2
+    config = _apply_overrides(config, args)
+    pipeline = PackPipeline(config, log=_print_log)
+    success, interrupted = _run_interruptible(pipeline.run, pipeline.stop)
+    if interrupted:
+        return 130
+    return 0 if success else 1
+
+
+def cmd_batch(args):
+    defaults = {}
+    if args.pack_option:
+        defaults["pack_option"] = args.pack_option
+    if args.python:
+        defaults["python"] = args.python
+    jobs = create_batch_jobs(args.items, args.output_dir, defaults)
+    for job in jobs:
+        if job.error:
+            _print_log(f"[{job.name}] {job.status}: {job.error}")
+        else:
+            _apply_overrides(job.config, args)
+
+    print_lock = threading.Lock()
+
+    def on_status(job):
+        with print_lock:
+            _print_log(f"[{job.name}] {job.status}")
+
+    runner = BatchRunner(jobs, args.jobs, on_status)
+    success, interrupted = _run_interruptible(runner.run, runner.stop)
+    _print_log(format_summary(jobs, runner.wall_time))
+    if interrupted:
+        return 130
+    return 0 if success else 1
+
+
+def cmd_history(args):
+    config = _load_config(args.config)
+    if config is None:
+        return 2
+    records = BuildHistory(config.root_dir).load(config.output_name, args.pack_option or config.pack_option)
+    _print_log(format_history(records[-args.limit:]))
+    comparison = format_startup_comparison(BuildHistory(config.root_dir).load(config.output_name))
+    if comparison:
+        _print_log(comparison)
+    return 0
+
+
+def _add_override_arguments(parser):
+    parser.add_argument("--pack-option", choices=PACK_OPTIONS, help="覆盖配置中的打包方式")
+    parser.add_argument("--parallel-build", action="store_true", help="both模式下并行执行两种打包")
+    parser.add_argument("--incremental", action="store_true", help="增量构建")
+    parser.add_argument("--build-cache", action="store_true", help="启用构建缓存")
+    parser.add_argument("--strip-sources", action="store_true", help="清洗主程序和本地模块后再打包")
+    parser.add_argument("--analyze-imports", action="store_true", help="预先分析导入图，生成隐藏导入和排除模块参数")
+    parser.add_argument("--resource-manifest", action="store_true", help="资源展开为清单写入spec文件，按规则过滤并统计大小")
+    parser.add_argument("--resource-archive", action="store_true", help="资源合并为程序旁边的resources.pak，运行时按需读取")
+    parser.add_argument("--analyze-size", action="store_true", help="打包后分析产物中各模块、二进制和数据文件的大小")
+    parser.add_argument("--enable-upx", action="store_true", help="启用UPX压缩")
+    parser.add_argument("--selective-upx", action="store_true", help="文件夹模式打包后只压缩值得压缩的二进制文件，并行执行并缓存结果")
+    parser.add_argument("--startup-runs", type=int, metavar="N", help="打包后以测试模式启动程序N次，测量启动时间和内存峰值")
+    parser.add_argument("--python", help="执行PyInstaller的解释器")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="pack_cli", description="Python打包工具命令行")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="按配置文件执行一次打包")
+    build.add_argument("config", help="JSON配置文件")
+    _add_override_arguments(build)
+    build.set_defaults(func=cmd_build)
+
+    batch = subparsers.add_parser("batch", help="并发打包多个脚本或项目")
+    batch.add_argument("items", nargs="+", help=".py主程序或.json配置文件")
+    batch.add_argument("--output-dir", default="batch_dist", help="批量输出根目录，每个任务使用独立子目录")
+    batch.add_argument("--jobs", type=int, help="并发任务数，默认为CPU核数")
+    _add_override_arguments(batch)
+    batch.set_defaults(func=cmd_batch)
+
+    history = subparsers.add_parser("history", help="查看项目的构建用时和产物大小历史")
+    history.add_argument("config", help="JSON配置文件")
+    history.add_argument("--pack-option", choices=PACK_OPTIONS, help="打包方式，默认使用配置中的打包方式")
+    history.add_argument("--limit", type=int, default=20, help="显示最近的记录数")
+    history.set_defaults(func=cmd_history)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1067 @@
+"""
+打包核心流程
+不依赖Tk，图形界面和命令行共用：资源参数准备、PyInstaller命令组装与执行、图标检测和构建清理
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass, field, fields
+
+import resource_runtime
+from build_cache import CACHE_DIR_NAME, BuildCache, atomic_write, compute_build_fingerprint, get_artifact_path
+from build_history import BuildHistory, StepTimer, format_report, format_size, get_path_size
+from build_progress import PHASE_NAMES, PhaseTimings, PhaseTracker, format_durations
+from code_cleaner import OUTPUT_MIRROR, CleanEngine, CleanOptions
+from icon_detect import detect_icon_from_code
+from import_analysis import ImportCache, analyze_imports
+from import_graph import collect_local_modules
+from resource_archive import ArchiveBuilder
+from resource_manifest import DEFAULT_RESOURCE_EXCLUDES, ResourceManifest, matches_any
+from size_report import SizeReport, get_xref_path
+from startup_bench import benchmark, format_startup, format_startup_comparison, get_executable_path, write_runtime_hook
+from upx_stage import DEFAULT_UPX_EXCLUDES, UpxStage, format_upx_report, summarize
+
+PACK_OPTIONS = ("single_file", "single_dir", "both")
+
+# 停止打包时先请求进程退出，超过该秒数仍未退出则强制结束
+TERMINATE_TIMEOUT = 5
+
+# spec文件中Analysis的datas参数，collect-*等选项会让它成为变量而不是[]
+SPEC_DATAS_PATTERN = re.compile(r"(Analysis\(.*?\n\s*datas=)([^\n]*?),\n", re.S)
+
+# PyInstaller长时间没有输出时，刷新阶段状态的间隔（秒）
+STATUS_INTERVAL = 1
+
+
+class BuildCancelled(Exception):
+    """打包被用户取消"""
+
+
+@dataclass
+class PackConfig:
+    """一次打包的全部设置，对应图形界面上的各项输入"""
+    main_script: str
+    icon_path: str = ""
+    output_name: str = ""
+    resources: list = field(default_factory=list)
+    pack_option: str = "single_dir"  # "single_file"、"single_dir" 或 "both"
+    enable_upx: bool = False
+    selective_upx: bool = False  # 文件夹模式打包后只压缩值得压缩的二进制文件，并行执行并缓存结果
+    upx_exclude: list = field(default_factory=lambda: list(DEFAULT_UPX_EXCLUDES))  # 不用UPX压缩的二进制文件
+    upx_dir: str = ""  # UPX所在目录，为空时在PATH中查找
+    parallel_build: bool = False
+    incremental: bool = False
+    build_cache: bool = False
+    strip_sources: bool = False  # 先清洗主程序和本地模块的注释、文档字符串，再交给PyInstaller
+    analyze_imports: bool = False  # 预先分析导入图，生成隐藏导入和排除模块参数，不再总是收集tkinter
+    resource_manifest: bool = False  # 把资源展开为清单写入spec的datas，代替逐个--add-data参数
+    resource_include: list = field(default_factory=list)  # 资源文件夹中只打包匹配这些规则的文件
+    resource_exclude: list = field(default_factory=lambda: list(DEFAULT_RESOURCE_EXCLUDES))
+    resource_archive: bool = False  # 资源合并为程序旁边的resources.pak，程序用resource_runtime按需读取
+    startup_runs: int = 0  # 大于0时打包后以测试模式启动程序这么多次，测量启动时间和内存峰值
+    analyze_size: bool = False  # 打包后按模块、二进制和数据文件分析产物大小，给出可以精简的项
+    python: str = "python"  # 执行PyInstaller的解释器
+    dist_dir: str = ""  # 为空时使用主程序目录下的dist，打包前会被清空
+    build_dir: str = ""  # 为空时使用主程序目录下的build，指定后workpath和specpath都放在这里
+    open_output_dir: bool = False
+
+    def __post_init__(self):
+        if self.pack_option not in PACK_OPTIONS:
+            raise ValueError(f"未知的打包方式: {self.pack_option}")
+        if not self.output_name:
+            self.output_name = os.path.splitext(os.path.basename(self.main_script))[0]
+
+    @classmethod
+    def from_dict(cls, data, base_dir=None):
+        """
+        从字典创建配置
+        :param data: 配置字典，键名与字段名一致
+        :param base_dir: 相对路径的基准目录，通常为配置文件所在目录
+        """
+        if not isinstance(data, dict):
+            raise ValueError("配置必须是JSON对象")
+        known = {f.name for f in fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"未知的配置项: {', '.join(sorted(unknown))}")
+        if not isinstance(data.get("main_script"), str) or not data["main_script"]:
+            raise ValueError("缺少配置项: main_script")
+        data = dict(data)
+        if base_dir:
+            for key in ("main_script", "icon_path", "dist_dir", "build_dir", "upx_dir"):
+                if data.get(key):
+                    data[key] = os.path.join(base_dir, data[key])
+            data["resources"] = [os.path.join(base_dir, item) for item in data.get("resources", [])]
+        return cls(**data)
+
+    @classmethod
+    def load(cls, config_file):
+        """
+        从JSON配置文件读取配置，相对路径相对于配置文件所在目录
+        文件不存在、JSON格式错误、配置项未知或类型不对时统一抛出ValueError，消息中带有文件名
+        """
+        try:
+            with open(config_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return cls.from_dict(data, os.path.dirname(os.path.abspath(config_file)))
+        except (OSError, ValueError, TypeError) as e:
+            raise ValueError(f"无法读取配置文件 {config_file}: {e}") from e
+
+    @property
+    def root_dir(self):
+        return os.path.dirname(os.path.abspath(self.main_script))
+
+
+def clean_build(root_dir, build_dir=None, dist_dir=None):
+    """
+    清理build、dist、__pycache__和.spec文件
+    :param root_dir: 项目根目录
+    :param build_dir: 自定义的build目录，为None时使用根目录下的build
+    :param dist_dir: 自定义的dist目录，为None时使用根目录下的dist
+    """
+    dir_paths = [
+        build_dir or os.path.join(root_dir, "build"),
+        dist_dir or os.path.join(root_dir, "dist"),
+        os.path.join(root_dir, "__pycache__"),
+    ]
+    for dir_path in dir_paths:
+        if os.path.exists(dir_path):
+            shutil.rmtree(dir_path, ignore_errors=True)
+
+    # 清理.spec文件
+    for file in os.listdir(root_dir):
+        if file.endswith(".spec"):
+            os.remove(os.path.join(root_dir, file))
+
+
+def clean_build_files_only(root_dir, build_dir=None, log=None):
+    """
+    只清理build文件夹和spec文件，保留dist文件夹
+    :param root_dir: 项目根目录
+    :param build_dir: 自定义的build目录，为None时使用根目录下的build
+    :param log: 日志回调，为None时不输出清理信息
+    :return: 清理成功返回True
+    """
+    try:
+        # 清理文件夹和文件
+        clean_items = [
+            (build_dir or os.path.join(root_dir, "build"), "build文件夹"),
+            (os.path.join(root_dir, "__pycache__"), "__pycache__文件夹")
+        ]
+
+        for dir_path, display_name in clean_items:
+            if os.path.exists(dir_path):
+                shutil.rmtree(dir_path, ignore_errors=True)
+                if log:
+                    log(f"已清理{display_name}: {dir_path}\n")
+
+        # 清理.spec文件
+        for file in os.listdir(root_dir):
+            if file.endswith(".spec"):
+                spec_file = os.path.join(root_dir, file)
+                os.remove(spec_file)
+                if log:
+                    log(f"已清理spec文件: {spec_file}\n")
+
+        return True
+    except Exception as e:
+        if log:
+            log(f"清理构建文件时出错: {str(e)}\n")
+        return False
+
+
+def prepare_resource_params(resources, root_dir):
+    """
+    准备资源文件参数
+    :param resources: 资源文件和文件夹列表
+    :param root_dir: 主程序所在目录，资源的目标路径相对于它计算
+    """
+    resource_params = []
+    separator = ";" if sys.platform == "win32" else ":"
+    for resource in resources:
+        if os.path.exists(resource):
+            rel_path = os.path.relpath(resource, root_dir)
+            if os.path.isfile(resource):
+                dest_path = os.path.dirname(rel_path)
+            else:
+                dest_path = os.path.basename(rel_path) if rel_path != "." else ""
+            if not dest_path:
+                dest_path = "."
+            resource_path = resource if ' ' not in resource else f'"{resource}"'
+            resource_params.extend(["--add-data", f"{resource_path}{separator}{dest_path}"])
+    return resource_params
+
+
+def inject_spec_datas(spec, datas):
+    """
+    把资源清单追加到spec文件中Analysis的datas参数
+    :param spec: makespec生成的spec文件内容
+    :param datas: [(源文件, 目标目录)]
+    :return: 修改后的spec内容，找不到datas参数时返回None
+    """
+    spec, count = SPEC_DATAS_PATTERN.subn(lambda match: f"{match.group(1)}{match.group(2)} + {datas!r},\n", spec, 1)
+    return spec if count else None
+
+
+def _popen_group_kwargs():
+    """让子进程成为独立进程组的组长，停止时可以一并结束它启动的所有子进程"""
+    if sys.platform == "win32":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+
+def terminate_process_tree(process, timeout=TERMINATE_TIMEOUT):
+    """
+    结束进程及其全部子进程：先正常终止，超时后强制结束
+    :param process: subprocess.Popen对象，需以_popen_group_kwargs()创建
+    :param timeout: 等待正常退出的秒数
+    """
+    if process.poll() is not None:
+        return
+    if sys.platform == "win32":
+        # 不加 /F 的taskkill只向窗口发送关闭消息，控制台中的python收不到，只能等到超时；
+        # 改为向子进程所在的进程组发送CTRL_BREAK_EVENT，Python默认收到后退出
+        try:
+            os.kill(process.pid, signal.CTRL_BREAK_EVENT)
+            process.wait(timeout)
+            return
+        except (OSError, subprocess.TimeoutExpired):
+            # 超时未退出，或与子进程不在同一控制台（如用pythonw启动界面）无法发送时，直接强制结束
+            pass
+        # taskkill /T 连同子进程一起结束
+        subprocess.run(["taskkill", "/PID", str(process.pid), "/T", "/F"], capture_output=True)
+        process.wait()
+        return
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+    except ProcessLookupError:
+        pass
+
+
+def open_path(path):
+    """用系统默认程序打开目录或文件"""
+    # 在控制台中执行命令打开目录
+    if sys.platform == "win32":
+        subprocess.run(f"explorer {path}", shell=True)
+    # 在macOS上使用open打开目录
+    elif sys.platform == "darwin":
+        subprocess.run(f"open {path}", shell=True)
+    # 在Linux上使用xdg-open打开目录
+    else:
+        subprocess.run(f"xdg-open {path}", shell=True)
+
+
+class PackPipeline:
+    """
+    执行一次完整的打包流程
+    日志、进度和阶段状态通过回调输出，图形界面把它们接到日志队列、进度条和状态标签，命令行则直接打印
+    """
+
+    def __init__(self, config, log=None, progress=None, status=None):
+        """
+        :param config: PackConfig打包配置
+        :param log: 日志回调，参数为一条日志文本
+        :param progress: 进度回调，参数为0-100的进度值
+        :param status: 阶段状态回调，参数为当前阶段、已用时间和预计剩余时间的说明文本
+        """
+        self.config = config
+        self.log = log or (lambda message: None)
+        self._progress_callback = progress or (lambda value: None)
+        self._status_callback = status or (lambda text: None)
+        self.progress_value = 0
+        self._build_progress = {}
+        self._progress_span = (0, 100)
+        self._build_status = {}
+        self._phase_timings = None
+        self._timings_lock = threading.Lock()
+        self.step_timer = StepTimer()
+        self.phase_durations = {}
+        self.artifact_sizes = {}
+        self.entry_script = config.main_script  # 交给PyInstaller的主程序，清洗源码时为暂存目录中的副本
+        self.import_args = ["--collect-all=tkinter"]  # 导入相关的PyInstaller参数，分析导入后替换
+        self.import_analysis = None  # 分析导入后的ImportAnalysis
+        self.resource_manifest = None  # 启用资源清单或资源归档时的ResourceManifest
+        self.archive_builder = None  # 启用资源归档时的ArchiveBuilder
+        self.startup_hook = None  # 启动测试的运行时钩子
+        self.startup_token = None  # 让钩子生效的令牌
+        self.startup_results = {}
+        self.upx_stage = None  # 启用选择性UPX时的UpxStage
+        self.upx_results = {}
+        self._stop_event = threading.Event()
+        self._processes = set()
+        self._process_lock = threading.Lock()
+
+    @property
+    def dist_dir(self):
+        return self.config.dist_dir or os.path.join(self.config.root_dir, "dist")
+
+    @property
+    def build_dir(self):
+        return self.config.build_dir or os.path.join(self.config.root_dir, "build")
+
+    @property
+    def staging_dir(self):
+        """清洗后源码的暂存目录，保留在项目缓存中供下次增量清洗"""
+        return os.path.join(self.config.root_dir, CACHE_DIR_NAME, "staging", self.config.output_name)
+
+    @property
+    def staging_manifest(self):
+        """
+        暂存目录的增量清洗清单，放在暂存目录旁边：暂存目录中多余的文件会被删除，
+        也不能与清洗标签页的.pack_cache/clean_manifest.json共用，两边保存时会互相覆盖
+        """
+        return self.staging_dir + ".clean_manifest.json"
+
+    @property
+    def stop_requested(self):
+        return self._stop_event.is_set()
+
+    def stop(self):
+        """
+        请求停止打包并结束正在运行的PyInstaller进程树
+        结束进程可能需要等待超时，在后台线程中进行，不阻塞调用方（如界面线程）
+        """
+        self._stop_event.set()
+        with self._process_lock:
+            processes = list(self._processes)
+        for process in processes:
+            threading.Thread(target=terminate_process_tree, args=(process,), daemon=True).start()
+
+    def _check_stopped(self):
+        if self.stop_requested:
+            raise BuildCancelled()
+
+    def _cleanup_cancelled_build(self, build_type, work_dir):
+        """删除被取消的构建留下的工作目录和不完整的产物"""
+        kind = build_type.lstrip("-")
+        partial_dirs = [
+            work_dir or os.path.join(self.build_dir, self.config.output_name),
+            get_artifact_path(self.dist_dir, self.config.output_name, kind),
+        ]
+        for path in partial_dirs:
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            elif os.path.exists(path):
+                os.remove(path)
+
+    def set_progress(self, value):
+        self.progress_value = value
+        self._progress_callback(value)
+
+    def run(self):
+        """
+        执行打包流程
+        :return: 打包成功返回True，出错返回False
+        """
+        config = self.config
+        timer = self.step_timer
+        try:
+            # 清理之前的构建文件，增量构建时保留工作目录
+            if not config.incremental:
+                with timer.step("cleanup"):
+                    clean_build(config.root_dir, config.build_dir or None, config.dist_dir or None)
+
+            if config.strip_sources:
+                with timer.step("staging"):
+                    self.stage_sources()
+
+            # 准备资源文件和图标参数
+            resources = list(config.resources)
+            icon_param = ""
+            # 如果用户设置了图标，优先使用用户设置的图标
+            if config.icon_path and os.path.exists(config.icon_path):
+                icon_param = f"--icon={config.icon_path}"
+            else:
+                # 如果用户没有设置图标，尝试从代码中检测图标设置
+                main_script = config.main_script
+                if main_script and os.path.exists(main_script):
+                    with timer.step("icon"):
+                        detected_icon = detect_icon_from_code(main_script, resources, self.log)
+                    if detected_icon and os.path.exists(detected_icon):
+                        icon_param = f"--icon={detected_icon}"
+                        self.log(f"检测到代码中设置的图标: {detected_icon}\n")
+
+            if config.analyze_imports:
+                with timer.step("imports"):
+                    self.prepare_import_args()
+
+            if (config.resource_manifest or config.resource_archive) and resources:
+                with timer.step("resources"):
+                    self.resource_manifest = ResourceManifest(
+                        config.root_dir, config.resource_include, config.resource_exclude
+                    ).build(resources)
+                self.log(self.resource_manifest.format_report())
+                if config.resource_archive:
+                    with timer.step("archive"):
+                        self.build_archive()
+
+            if config.startup_runs:
+                self.startup_hook, self.startup_token = write_runtime_hook(config.root_dir)
+                self.log("启动测试：测试用的运行时钩子会打包进本次生成的程序，"
+                         "只在环境变量等于项目令牌时退出，发布前可以关闭启动测试重新打包\n")
+
+            if config.selective_upx:
+                self.upx_stage = UpxStage(config.root_dir, config.upx_dir, config.upx_exclude)
+                if self.upx_stage.available:
+                    self.log(f"选择性UPX: {self.upx_stage.upx}（{self.upx_stage.version}）\n")
+                else:
+                    self.log("未找到UPX，不压缩二进制文件\n")
+
+            # 根据选择的选项执行打包
+            # 增量构建或指定了build目录时，每种打包方式使用固定的工作目录
+            use_work_dir = config.incremental or bool(config.build_dir)
+            onefile_work_dir = self.get_work_dir("onefile") if use_work_dir else None
+            onedir_work_dir = self.get_work_dir("onedir") if use_work_dir else None
+            if config.pack_option == "single_file":
+                self.build_single_file(resources, icon_param, onefile_work_dir)
+            elif config.pack_option == "single_dir":
+                self.build_folder(resources, icon_param, onedir_work_dir)
+            elif config.pack_option == "both":
+                if config.parallel_build:
+                    self.build_both_parallel(resources, icon_param)
+                else:
+                    self.build_single_file(resources, icon_param, onefile_work_dir)
+                    self.build_folder(resources, icon_param, onedir_work_dir)
+
+            self.log("打包完成！")
+
+            if config.startup_runs:
+                with timer.step("startup"):
+                    self.benchmark_startup()
+
+            # 自动清理build文件夹和spec文件，增量构建时保留供下次复用
+            if config.incremental:
+                self.log("增量构建：保留工作目录和spec文件供下次打包复用\n")
+            else:
+                self.log("正在清理多余的构建文件...\n")
+                with timer.step("post_cleanup"):
+                    clean_build_files_only(config.root_dir, config.build_dir or None, self.log)
+                self.log("构建文件清理完成。\n")
+
+            # 打开输出目录
+            if config.open_output_dir:
+                try:
+                    with timer.step("open_output"):
+                        open_path(self.dist_dir)
+                    self.log(f"已打开输出目录: {self.dist_dir}\n")
+                except Exception as e:
+                    self.log(f"打开输出目录失败: {str(e)}\n")
+            self._record_history(True)
+            return True
+        except BuildCancelled:
+            self.log("打包已取消\n")
+            return False
+        except Exception as e:
+            self.log(f"打包失败: {str(e)}")
+            self._record_history(False)
+            return False
+
+    def stage_sources(self):
+        """
+        把主程序及其导入的本地模块清洗到暂存目录，保持相对路径不变，之后PyInstaller从暂存的主程序开始分析
+        未变化的文件沿用上次的清洗结果；主程序清洗失败时改用原始源码打包
+        """
+        config = self.config
+        root_dir = config.root_dir
+        staging_dir = self.staging_dir
+        # 相对导入可能指向主程序目录之外，这些模块保留原样，由--paths找到
+        modules = [path for path in collect_local_modules(config.main_script)
+                   if os.path.commonpath([root_dir, path]) == root_dir]
+        modules, data_files = self._package_files(modules)
+        self.log(f"正在清洗源码到暂存目录: {staging_dir}\n")
+        engine = CleanEngine(CleanOptions(), log=self.log, incremental=True,
+                             output_mode=OUTPUT_MIRROR, output_dir=staging_dir, base_dir=root_dir,
+                             manifest_path=self.staging_manifest)
+        summary = engine.run(modules)
+        self._check_stopped()
+
+        # 清洗失败的模块复制原始源码，保证暂存目录中的导入完整
+        staged = set()
+        for path in modules:
+            staged_path = os.path.join(staging_dir, os.path.relpath(path, root_dir))
+            staged.add(os.path.normcase(staged_path))
+        failed = [result.file_path for result in summary.results if not result.success]
+        for path in failed:
+            staged_path = os.path.join(staging_dir, os.path.relpath(path, root_dir))
+            shutil.copy2(path, staged_path)
+            self.log(f"清洗失败，使用原始源码: {path}\n")
+        # 包中的数据文件原样复制，大小和修改时间没有变化时跳过
+        for path in data_files:
+            staged_path = os.path.join(staging_dir, os.path.relpath(path, root_dir))
+            staged.add(os.path.normcase(staged_path))
+            source_stat = os.stat(path)
+            try:
+                staged_stat = os.stat(staged_path)
+                if (staged_stat.st_size, staged_stat.st_mtime_ns) == (source_stat.st_size, source_stat.st_mtime_ns):
+                    continue
+            except OSError:
+                pass
+            os.makedirs(os.path.dirname(staged_path), exist_ok=True)
+            shutil.copy2(path, staged_path)
+        # 删除项目中已不再导入的旧暂存文件，避免PyInstaller用到过期的副本
+        for root, _, files in os.walk(staging_dir):
+            for file in files:
+                path = os.path.join(root, file)
+                if os.path.normcase(path) not in staged:
+                    os.remove(path)
+
+        if os.path.abspath(config.main_script) in failed:
+            self.entry_script = config.main_script
+        else:
+            self.entry_script = os.path.join(staging_dir, os.path.relpath(os.path.abspath(config.main_script), root_dir))
+
+    def _package_files(self, modules):
+        """
+        暂存了任一模块的顶层包整个暂存：PyInstaller按暂存副本的__path__查找包的子模块，
+        只在运行时导入的子模块（如importlib.import_module）不在静态分析结果中，缺少时打包后无法导入
+        :param modules: 静态分析找到的主程序目录中的模块
+        :return: (需要清洗的.py文件列表, 原样复制的数据文件列表)
+        """
+        root_dir = self.config.root_dir
+        packages = sorted({os.path.relpath(path, root_dir).split(os.sep, 1)[0]
+                           for path in modules if os.path.dirname(path) != root_dir})
+        sources = list(modules)
+        seen = {os.path.normcase(path) for path in modules}
+        data_files = []
+        for package in packages:
+            for root, dirs, files in os.walk(os.path.join(root_dir, package)):
+                dirs[:] = [name for name in dirs if not matches_any(name, DEFAULT_RESOURCE_EXCLUDES)]
+                for file in files:
+                    if matches_any(file, DEFAULT_RESOURCE_EXCLUDES):
+                        continue
+                    path = os.path.join(root, file)
+                    if not file.endswith(".py"):
+                        data_files.append(path)
+                    elif os.path.normcase(path) not in seen:
+                        seen.add(os.path.normcase(path))
+                        sources.append(path)
+        return sources, data_files
+
+    def prepare_import_args(self):
+        """分析主程序的导入图，用分析结果生成的参数代替默认的--collect-all=tkinter"""
+        config = self.config
+        cache = ImportCache(config.root_dir)
+        analysis = analyze_imports(config.main_script, cache=cache)
+        self.import_analysis = analysis
+        try:
+            cache.save()
+        except OSError as e:
+            self.log(f"保存导入分析缓存失败: {str(e)}\n")
+        self.import_args = analysis.pyinstaller_args()
+        self.log(f"导入分析: {len(analysis.modules)} 个本地模块，{len(analysis.external)} 个外部导入，"
+                 f"{'需要' if analysis.uses_tkinter else '不需要'}tkinter\n")
+        if self.import_args:
+            self.log(f"导入参数: {' '.join(self.import_args)}\n")
+
+    def benchmark_startup(self):
+        """以测试模式反复启动生成的程序，测量冷启动、热启动用时和内存峰值"""
+        config = self.config
+        kinds = {"single_file": ["onefile"], "single_dir": ["onedir"], "both": ["onefile", "onedir"]}[config.pack_option]
+        for kind in kinds:
+            executable = get_executable_path(self.dist_dir, config.output_name, kind)
+            if not os.path.isfile(executable):
+                self.log(f"找不到生成的程序，跳过启动测试: {executable}\n")
+                continue
+            self.log(f"启动测试: {executable}，{config.startup_runs} 次\n")
+            try:
+                result = benchmark(executable, self.startup_token, config.startup_runs, should_stop=lambda: self.stop_requested)
+            except (OSError, RuntimeError) as e:
+                self.log(f"启动测试失败: {str(e)}\n")
+                continue
+            self._check_stopped()
+            if result:
+                self.startup_results[kind] = result
+        if self.startup_results:
+            self.log(format_startup(self.startup_results))
+
+    def _record_history(self, success):
+        """把本次构建的步骤用时、阶段用时和产物大小写入项目构建历史，并输出与历史的对比"""
+        config = self.config
+        record = {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "name": config.output_name,
+            "pack_option": config.pack_option,
+            "success": success,
+            "total": self.step_timer.total(),
+            "steps": dict(self.step_timer.steps),
+            "phases": dict(self.phase_durations),
+            "artifact_sizes": dict(self.artifact_sizes),
+            "enable_upx": config.enable_upx or config.selective_upx,
+            "startup": dict(self.startup_results),
+            "upx": dict(self.upx_results),
+        }
+        try:
+            history = BuildHistory(config.root_dir)
+            previous = history.load(config.output_name, config.pack_option)
+            history.append(record)
+            if success:
+                self.log(format_report(record, previous))
+            if self.startup_results:
+                self.log(format_startup_comparison(history.load(config.output_name)))
+        except OSError as e:
+            self.log(f"保存构建历史失败: {str(e)}\n")
+
+    def build_common_params(self, build_type, icon_param, work_dir=None):
+        """
+        构建PyInstaller命令的通用参数
+        :param build_type: "--onefile" 或 "--onedir"
+        :param icon_param: 图标参数，为空时不设置图标
+        :param work_dir: 独立的工作目录，同时用作spec目录；为None时使用PyInstaller默认值
+        """
+        # 构建PyInstaller命令
+        cmd = [
+            self.config.python,
+            "-m", "PyInstaller",
+            build_type,  # "--onefile" 或 "--onedir"
+            "--windowed",
+            *self.import_args,
+            f"--name={self.config.output_name}",
+            f"--distpath={self.dist_dir}",
+            "--noconfirm"  # 增量构建时dist目录会保留，避免PyInstaller交互确认
+        ]
+
+        if work_dir:
+            # 并行打包时每个构建使用自己的workpath和specpath，避免互相覆盖
+            cmd.extend([f"--workpath={work_dir}", f"--specpath={work_dir}"])
+
+        if self.upx_stage:
+            # 文件夹模式打包后由UPX阶段压缩；单文件模式的二进制文件在归档内部，交给PyInstaller按排除规则压缩
+            if build_type == "--onefile" and self.upx_stage.available:
+                cmd.extend(self.upx_stage.pyinstaller_args())
+            else:
+                cmd.append("--noupx")
+        elif not self.config.enable_upx:
+            cmd.append("--noupx")
+
+        if icon_param:
+            cmd.append(icon_param)
+
+        if self.startup_hook:
+            cmd.append(f"--runtime-hook={self.startup_hook}")
+
+        return cmd
+
+    def run_pyinstaller(self, build_type, resources, icon_param, work_dir=None, label=None):
+        """
+        组装并执行一次PyInstaller构建
+        启用构建缓存时，内容指纹命中则直接恢复上次的产物而不启动PyInstaller；
+        增量构建时先校验工作目录的状态指纹，指纹不一致才清空工作目录重新分析
+        """
+        config = self.config
+        prefix = f"[{label}] " if label else ""
+        # 已取消时不再启动新的构建，例如"both"模式的第二次打包
+        self._check_stopped()
+
+        # 准备资源文件参数，使用资源清单时资源写入spec文件
+        resource_params = []
+        if self.resource_manifest is None:
+            with self.step_timer.step("resources"):
+                resource_params = prepare_resource_params(resources, config.root_dir)
+
+        # 构建PyInstaller命令
+        cmd = self.build_common_params(build_type, icon_param, work_dir)
+        cmd.extend(resource_params)
+        if self.archive_builder:
+            # 程序通过resource_runtime读取归档，项目中没有这个模块时从打包工具目录找到
+            runtime_dir = os.path.dirname(os.path.abspath(resource_runtime.__file__))
+            cmd.extend(["--hidden-import=resource_runtime", f"--paths={runtime_dir}"])
+        if self.entry_script != config.main_script:
+            # 暂存目录排在前面，未暂存的模块仍从项目目录查找
+            cmd.append(f"--paths={config.root_dir}")
+        cmd.append(self.entry_script)
+
+        build_cache = None
+        if config.build_cache:
+            kind = build_type.lstrip("-")
+            icon_path = icon_param.split("=", 1)[1] if icon_param else None
+            build_cache = BuildCache(config.root_dir)
+            options = cmd + [self.resource_manifest.digest] if self.resource_manifest else list(cmd)
+            if self.upx_stage and self.upx_stage.available:
+                options.append(self.upx_stage.settings_key)
+            build_key = compute_build_fingerprint(config.main_script, resources, icon_path, options)
+            artifact = build_cache.restore(kind, build_key, self.dist_dir, config.output_name)
+            if artifact:
+                self.log(f"{prefix}构建缓存命中，跳过PyInstaller: {artifact}\n")
+                self._place_archive(build_type)
+                self._record_artifact_size(build_type)
+                self.report_artifact_size(build_type, work_dir, label)
+                return
+
+        fingerprint = None
+        if work_dir and config.incremental:
+            fingerprint = self.prepare_incremental_work_dir(work_dir, cmd, label)
+
+        # 执行命令
+        try:
+            if self.resource_manifest and not self.archive_builder:
+                with self.step_timer.step("spec"):
+                    cmd = self.write_spec(cmd, build_type, work_dir, label)
+            with self.step_timer.step("pyinstaller"):
+                self.execute_command(cmd, label, build_type.lstrip("-"))
+        except BuildCancelled:
+            self._cleanup_cancelled_build(build_type, work_dir)
+            raise
+        self._place_archive(build_type)
+        self.compress_binaries(build_type, label)
+        self._record_artifact_size(build_type)
+        self.report_artifact_size(build_type, work_dir, label)
+
+        if fingerprint and not self.stop_requested:
+            self.save_incremental_state(work_dir, fingerprint)
+
+        if build_cache and not self.stop_requested:
+            # 产物已经构建成功，缓存保存失败（如磁盘已满）只影响下次构建
+            try:
+                if build_cache.store(kind, build_key, self.dist_dir, config.output_name):
+                    self.log(f"{prefix}已保存构建缓存\n")
+            except OSError as e:
+                self.log(f"{prefix}保存构建缓存失败: {str(e)}\n")
+
+    def write_spec(self, cmd, build_type, work_dir=None, label=None):
+        """
+        用pyi-makespec按命令行参数生成spec文件，再把资源清单写入Analysis的datas
+        命令行参数和资源清单都没有变化时直接复用上次生成的spec
+        :param cmd: 不含资源参数的PyInstaller命令
+        :return: 按spec文件构建的命令
+        """
+        config = self.config
+        spec_dir = work_dir or os.path.join(self.build_dir, config.output_name, build_type.lstrip("-"))
+        # 构建目录相关的参数只能在按spec构建时指定
+        spec_args = [arg for arg in cmd[3:]
+                     if not arg.startswith(("--distpath=", "--workpath=", "--specpath=")) and arg != "--noconfirm"]
+        makespec_cmd = [cmd[0], "-m", "PyInstaller.utils.cliutils.makespec", f"--specpath={spec_dir}"] + spec_args
+        spec_key = hashlib.sha256(json.dumps([makespec_cmd, self.resource_manifest.digest]).encode("utf-8")).hexdigest()
+        spec_file = os.path.join(spec_dir, f"{config.output_name}.spec")
+        header = f"# pack-key: {spec_key}\n"
+
+        prefix = f"[{label}] " if label else ""
+        try:
+            with open(spec_file, 'r', encoding='utf-8') as f:
+                reuse = f.readline() == header
+        except OSError:
+            reuse = False
+        if reuse:
+            self.log(f"{prefix}复用spec文件: {spec_file}\n")
+        else:
+            os.makedirs(spec_dir, exist_ok=True)
+            self.execute_command(makespec_cmd, label)
+            with open(spec_file, 'r', encoding='utf-8') as f:
+                spec = f.read()
+            spec = inject_spec_datas(spec, self.resource_manifest.datas)
+            if spec is None:
+                raise RuntimeError(f"无法在spec文件中写入资源清单: {spec_file}")
+            with atomic_write(spec_file, encoding='utf-8') as f:
+                f.write(header + spec)
+
+        build_cmd = [cmd[0], "-m", "PyInstaller", f"--distpath={self.dist_dir}", "--noconfirm"]
+        if work_dir:
+            build_cmd.append(f"--workpath={work_dir}")
+        build_cmd.append(spec_file)
+        return build_cmd
+
+    def build_archive(self):
+        """把资源清单中的文件合并为资源归档，资源没有变化时复用上次生成的归档"""
+        config = self.config
+        self.archive_builder = ArchiveBuilder(config.root_dir, config.output_name)
+        created, total, archive_size = self.archive_builder.build(self.resource_manifest)
+        state = "已生成" if created else "未变化，复用"
+        self.log(f"资源归档{state}: {len(self.resource_manifest.files)} 个文件，"
+                 f"{format_size(total)} -> {format_size(archive_size)}\n")
+
+    def _place_archive(self, build_type):
+        """把资源归档放到程序旁边：单文件放在输出目录，文件夹放在程序目录"""
+        if not self.archive_builder:
+            return
+        kind = build_type.lstrip("-")
+        target_dir = self.dist_dir if kind == "onefile" else get_artifact_path(self.dist_dir, self.config.output_name, kind)
+        self.log(f"资源归档: {self.archive_builder.place(target_dir)}\n")
+
+    def compress_binaries(self, build_type, label=None):
+        """文件夹模式打包后，用UPX并行压缩程序目录中挑选出的二进制文件"""
+        if not self.upx_stage or not self.upx_stage.available or build_type != "--onedir":
+            return
+        config = self.config
+        prefix = f"[{label}] " if label else ""
+        target_dir = get_artifact_path(self.dist_dir, config.output_name, "onedir")
+        executable = os.path.basename(get_executable_path(self.dist_dir, config.output_name, "onedir"))
+        try:
+            with self.step_timer.step("upx"):
+                results, skipped, elapsed = self.upx_stage.run(
+                    target_dir, executable, should_stop=lambda: self.stop_requested
+                )
+        except OSError as e:
+            self.log(f"{prefix}UPX压缩失败: {str(e)}\n")
+            return
+        self._check_stopped()
+        self.upx_results["onedir"] = summarize(results, elapsed)
+        self.log(prefix + format_upx_report(results, skipped, elapsed, self.upx_stage.workers))
+
+    def _record_artifact_size(self, build_type):
+        kind = build_type.lstrip("-")
+        artifact = get_artifact_path(self.dist_dir, self.config.output_name, kind)
+        if os.path.exists(artifact):
+            self.artifact_sizes[kind] = get_path_size(artifact)
+
+    def report_artifact_size(self, build_type, work_dir=None, label=None):
+        """
+        分析产物中各项的大小和带入它们的导入，在清理构建文件之前读取PyInstaller生成的导入关系图
+        构建缓存命中时工作目录中可能没有导入关系图，按顶层包归属
+        """
+        config = self.config
+        if not config.analyze_size:
+            return
+        kind = build_type.lstrip("-")
+        prefix = f"[{label}] " if label else ""
+        artifact = get_artifact_path(self.dist_dir, config.output_name, kind)
+        xref_path = get_xref_path(work_dir or self.build_dir, config.output_name)
+        uses_tkinter = self.import_analysis.uses_tkinter if self.import_analysis else None
+        try:
+            with self.step_timer.step("size_report"):
+                report = SizeReport(artifact, kind).analyze(xref_path, config.main_script, uses_tkinter)
+        except (OSError, ValueError) as e:
+            self.log(f"{prefix}产物分析失败: {str(e)}\n")
+            return
+        self.log(prefix + report.format_report())
+
+    def get_work_dir(self, kind):
+        """获取当前项目某种打包方式的固定工作目录: build/<输出名称>/<kind>"""
+        return os.path.join(self.build_dir, self.config.output_name, kind)
+
+    def build_state_fingerprint(self, cmd):
+        """
+        计算增量构建的状态指纹
+        命令行已包含脚本路径、资源文件和全部打包选项，再加上解释器的位置和版本信息；
+        脚本内容的变化交给PyInstaller自身的缓存检查处理，这样修改一行代码仍能复用分析结果
+        """
+        python_path = shutil.which(cmd[0]) or cmd[0]
+        try:
+            stat = os.stat(python_path)
+            interpreter = [os.path.realpath(python_path), stat.st_size, stat.st_mtime]
+        except OSError:
+            interpreter = [python_path]
+        state = {"cmd": cmd, "interpreter": interpreter}
+        return hashlib.sha256(json.dumps(state, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def prepare_incremental_work_dir(self, work_dir, cmd, label=None):
+        """
+        校验增量构建工作目录，状态指纹变化时清空工作目录
+        :return: 本次构建的状态指纹
+        """
+        prefix = f"[{label}] " if label else ""
+        fingerprint = self.build_state_fingerprint(cmd)
+        state_file = os.path.join(work_dir, "pack_state.json")
+        try:
+            with open(state_file, 'r', encoding='utf-8') as f:
+                saved_fingerprint = json.load(f).get("fingerprint")
+        except (OSError, ValueError):
+            saved_fingerprint = None
+
+        if saved_fingerprint == fingerprint:
+            self.log(f"{prefix}复用增量构建缓存: {work_dir}\n")
+        else:
+            if os.path.exists(work_dir):
+                shutil.rmtree(work_dir, ignore_errors=True)
+                self.log(f"{prefix}脚本、资源、选项或解释器已变化，重新分析\n")
+            os.makedirs(work_dir, exist_ok=True)
+        return fingerprint
+
+    def save_incremental_state(self, work_dir, fingerprint):
+        """构建成功后记录工作目录的状态指纹"""
+        os.makedirs(work_dir, exist_ok=True)
+        with open(os.path.join(work_dir, "pack_state.json"), 'w', encoding='utf-8') as f:
+            json.dump({"fingerprint": fingerprint}, f)
+
+    def build_single_file(self, resources, icon_param, work_dir=None, label=None):
+        self.log("开始打包成单文件...\n")
+
+        # 依次执行两种打包时，单文件打包占进度条的前一半
+        self._progress_span = (0, 50) if self.config.pack_option == "both" else (0, 100)
+        self.run_pyinstaller("--onefile", resources, icon_param, work_dir, label)
+
+        if not self.stop_requested:
+            self.log("单文件打包完成\n")
+            if label is None:
+                self.set_progress(50 if self.config.pack_option == "both" else 100)
+
+    def build_folder(self, resources, icon_param, work_dir=None, label=None):
+        self.log("开始打包成文件夹...\n")
+
+        self._progress_span = (50, 100) if self.config.pack_option == "both" else (0, 100)
+        self.run_pyinstaller("--onedir", resources, icon_param, work_dir, label)
+
+        if not self.stop_requested:
+            self.log("文件夹打包完成\n")
+            if label is None:
+                self.set_progress(100)
+
+    def build_both_parallel(self, resources, icon_param):
+        """
+        同时执行单文件和文件夹两种打包
+        每个构建使用build目录下独立的工作目录，进度和取消状态按构建分别报告
+        :param resources: 资源文件列表
+        :param icon_param: 图标参数
+        """
+        builds = [
+            ("单文件", self.build_single_file, self.get_work_dir("onefile")),
+            ("文件夹", self.build_folder, self.get_work_dir("onedir")),
+        ]
+
+        self._build_progress = {label: 0 for label, _, _ in builds}
+        errors = {}
+
+        def run_build(label, build_func, work_dir):
+            try:
+                build_func(resources, icon_param, work_dir, label)
+                self.set_build_progress(label, 100)
+            except BuildCancelled:
+                self.log(f"[{label}] 打包已取消\n")
+            except Exception as e:
+                errors[label] = e
+                self.log(f"[{label}] 打包失败: {str(e)}\n")
+
+        threads = []
+        for label, build_func, work_dir in builds:
+            thread = threading.Thread(target=run_build, args=(label, build_func, work_dir))
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+
+        for thread in threads:
+            thread.join()
+
+        self._check_stopped()
+        if errors:
+            raise RuntimeError("、".join(errors) + "打包失败")
+
+    def set_build_progress(self, label, value):
+        """更新某个并行构建的进度，总进度取所有构建的平均值"""
+        self._build_progress[label] = value
+        self.set_progress(sum(self._build_progress.values()) / len(self._build_progress))
+
+    def _get_phase_timings(self):
+        if self._phase_timings is None:
+            self._phase_timings = PhaseTimings(self.config.root_dir)
+        return self._phase_timings
+
+    def _report_phase(self, tracker, label=None):
+        """根据阶段跟踪器更新进度条和阶段状态"""
+        value = tracker.progress()
+        if label:
+            self.set_build_progress(label, value)
+        else:
+            start, end = self._progress_span
+            self.set_progress(start + value * (end - start) / 100)
+        self._build_status[label] = (f"[{label}] " if label else "") + tracker.status_text()
+        self._status_callback(" | ".join(self._build_status.values()))
+
+    def execute_command(self, cmd, label=None, kind=None):
+        """
+        执行打包命令并把输出写入日志
+        :param cmd: 命令参数列表
+        :param label: 并行构建的名称，设置后日志加前缀并单独统计进度
+        :param kind: "onefile" 或 "onedir"，提供时按PyInstaller的构建阶段计算进度
+        """
+        prefix = f"[{label}] " if label else ""
+        tracker = None
+        if kind:
+            with self._timings_lock:
+                tracker = PhaseTracker(kind, self._get_phase_timings().expected(kind))
+        ticker_done = threading.Event()
+        ticker = None
+
+        def stop_ticker():
+            # 等刷新线程退出后再结束阶段统计，避免它读到结束了一半的状态
+            ticker_done.set()
+            if ticker:
+                ticker.join()
+
+        try:
+            # 记录执行的命令（用于日志显示）
+            cmd_str = ' '.join(cmd)
+            self.log(f"{prefix}执行命令: {cmd_str}\n")
+
+            # 直接在Python环境中执行命令，工作目录设为主程序目录，PyInstaller的默认build和spec位置与清理逻辑一致
+            process = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1,  # 行缓冲
+                universal_newlines=True,
+                cwd=self.config.root_dir,
+                **_popen_group_kwargs()
+            )
+            with self._process_lock:
+                self._processes.add(process)
+            # 进程启动前已请求停止时，stop()不会看到这个进程，这里补一次
+            if self.stop_requested:
+                self.stop()
+
+            if tracker:
+                # PyInstaller在压缩等步骤可能长时间没有输出，定时刷新已用时间和剩余时间
+                def tick():
+                    while not ticker_done.wait(STATUS_INTERVAL):
+                        self._report_phase(tracker, label)
+                ticker = threading.Thread(target=tick, daemon=True)
+                ticker.start()
+
+            # 实时读取输出并更新到日志
+            while True:
+                output = process.stdout.readline()
+                if output == '' and process.poll() is not None:
+                    break
+                if output:
+                    self.log(prefix + output.strip() + '\n')
+
+                    # 按构建阶段更新进度条
+                    if tracker:
+                        finished = tracker.feed(output)
+                        if finished:
+                            self.log(f"{prefix}[阶段] {PHASE_NAMES[finished]} 完成，用时 {tracker.durations[finished]:.1f}s\n")
+                        self._report_phase(tracker, label)
+            stop_ticker()
+
+            # 获取返回码
+            return_code = process.poll()
+            with self._process_lock:
+                self._processes.discard(process)
+
+            self._check_stopped()
+            if return_code != 0:
+                raise subprocess.CalledProcessError(return_code, cmd)
+
+            if tracker:
+                durations = tracker.finish()
+                if durations:
+                    self.log(f"{prefix}各阶段用时: {format_durations(durations)}\n")
+                    self.phase_durations[kind] = durations
+                    with self._timings_lock:
+                        try:
+                            self._get_phase_timings().update(kind, durations)
+                        except OSError as e:
+                            self.log(f"{prefix}保存阶段用时失败: {str(e)}\n")
+
+            # 更新进度条到本次构建的终点
+            if tracker and not self.stop_requested and not label:
+                self.set_progress(self._progress_span[1])
+
+        except BuildCancelled:
+            raise
+        except Exception as e:
+            if self.stop_requested:
+                raise BuildCancelled()
+            self.log(f"{prefix}执行命令时出错: {str(e)}\n")
+            raise e
+        finally:
+            stop_ticker()
@@ -0,0 +1,126 @@
+"""
+资源归档
+打包时把资源清单中的文件合并为一个带索引的归档（格式见resource_runtime），放在生成的程序旁边；
+已经压缩过的格式原样存储，运行时可以直接映射读取，其余文件用zlib压缩，压缩后不变小的也原样存储。
+归档按文件列表、大小和修改时间缓存在.pack_cache，资源没有变化时不再重新生成
+"""
+import hashlib
+import json
+import os
+import shutil
+import zlib
+
+from build_cache import CACHE_DIR_NAME, atomic_write
+from resource_runtime import ARCHIVE_NAME, DEFLATED, MAGIC, STORED, TRAILER, ResourceArchive, normalize_name
+
+# 本身已压缩的格式，再压缩收益很小，原样存储
+STORED_SUFFIXES = frozenset({
+    ".png", ".jpg", ".jpeg", ".gif", ".webp",
+    ".mp3", ".ogg", ".flac", ".m4a", ".mp4", ".avi", ".mkv", ".webm",
+    ".zip", ".gz", ".bz2", ".xz", ".7z", ".rar", ".whl", ".jar",
+    ".woff", ".woff2", ".pak",
+})
+CHUNK_SIZE = 1024 * 1024
+COMPRESS_LEVEL = 6
+
+
+def archive_key(manifest):
+    """按资源名、源文件、大小和修改时间计算归档的缓存键"""
+    entries = [[normalize_name(item.target), item.source, item.size, item.mtime_ns] for item in manifest.files]
+    return hashlib.sha256(json.dumps(entries).encode("utf-8")).hexdigest()
+
+
+def _write_entry(target, source_path, compress):
+    """
+    把一个文件写入归档的当前位置
+    :return: (原始大小, 存储大小, 存储方式)
+    """
+    start = target.tell()
+    size = 0
+    with open(source_path, 'rb') as source:
+        if compress:
+            compressor = zlib.compressobj(COMPRESS_LEVEL)
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                size += len(chunk)
+                target.write(compressor.compress(chunk))
+            target.write(compressor.flush())
+            stored_size = target.tell() - start
+            if stored_size < size:
+                return size, stored_size, DEFLATED
+            # 压缩后没有变小，改为原样存储
+            source.seek(0)
+            target.seek(start)
+            target.truncate()
+        shutil.copyfileobj(source, target, CHUNK_SIZE)
+    stored_size = target.tell() - start
+    return stored_size, stored_size, STORED
+
+
+def write_archive(path, manifest):
+    """
+    把资源清单中的文件写入归档
+    :param path: 归档路径
+    :param manifest: ResourceManifest
+    :return: (原始总大小, 归档大小)
+    """
+    index = {}
+    total = 0
+    with atomic_write(path, 'wb') as target:
+        for item in manifest.files:
+            compress = os.path.splitext(item.source)[1].lower() not in STORED_SUFFIXES
+            offset = target.tell()
+            size, stored_size, method = _write_entry(target, item.source, compress)
+            index[normalize_name(item.target)] = [offset, size, stored_size, method]
+            total += size
+        index_data = json.dumps(index, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        index_offset = target.tell()
+        target.write(index_data)
+        target.write(TRAILER.pack(index_offset, len(index_data), MAGIC))
+        archive_size = target.tell()
+    return total, archive_size
+
+
+class ArchiveBuilder:
+    """生成并缓存资源归档，再放到每个打包产物旁边"""
+
+    def __init__(self, project_dir, output_name):
+        self.cache_dir = os.path.join(project_dir, CACHE_DIR_NAME, "archives", output_name)
+        self.path = os.path.join(self.cache_dir, ARCHIVE_NAME)
+        self.key_file = self.path + ".key"
+
+    def build(self, manifest):
+        """
+        资源没有变化时复用缓存的归档
+        :return: (是否新生成, 原始总大小, 归档大小)
+        """
+        key = archive_key(manifest)
+        try:
+            with open(self.key_file, 'r', encoding='utf-8') as f:
+                cached = f.read() == key and os.path.isfile(self.path)
+        except OSError:
+            cached = False
+        if cached:
+            return False, manifest.total_size, os.path.getsize(self.path)
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        total, archive_size = write_archive(self.path, manifest)
+        # 写入后立即校验索引可以读取
+        ResourceArchive(self.path).close()
+        with atomic_write(self.key_file, encoding='utf-8') as f:
+            f.write(key)
+        return True, total, archive_size
+
+    def place(self, target_dir):
+        """
+        把归档放到产物目录，优先使用硬链接避免复制大文件
+        :return: 归档在产物中的路径
+        """
+        os.makedirs(target_dir, exist_ok=True)
+        target = os.path.join(target_dir, ARCHIVE_NAME)
+        if os.path.exists(target):
+            os.remove(target)
+        try:
+            os.link(self.path, target)
+        except OSError:
+            shutil.copy2(self.path, target)
+        return target
@@ -0,0 +1,233 @@
+"""
+资源清单
+把资源文件和文件夹展开为逐个文件的清单：按包含/排除规则过滤，跳过缓存和版本库目录，
+合并重复添加的文件，按内容哈希找出内容相同的文件，统计每个目标目录的大小，
+并生成写入spec文件的datas列表，代替逐个资源的--add-data参数
+"""
+import fnmatch
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+
+from build_cache import CACHE_DIR_NAME, atomic_write, hash_file
+from build_history import format_size
+from text_table import format_table
+
+# 默认排除的文件和目录
+DEFAULT_RESOURCE_EXCLUDES = (
+    "__pycache__", "*.pyc", "*.pyo", ".git", ".svn", ".hg",
+    ".DS_Store", "Thumbs.db", "desktop.ini", CACHE_DIR_NAME,
+)
+
+
+def matches_any(rel_path, patterns):
+    """
+    判断相对路径是否匹配任一规则
+    含/的规则匹配整个相对路径，否则匹配路径中的任一级名称，如"*.png"、"cache"
+    :param rel_path: 以/分隔的相对路径
+    """
+    parts = rel_path.split("/")
+    for pattern in patterns:
+        if "/" in pattern:
+            if fnmatch.fnmatch(rel_path, pattern):
+                return True
+        elif any(fnmatch.fnmatch(part, pattern) for part in parts):
+            return True
+    return False
+
+
+def resource_dest(resource, root_dir):
+    """资源在打包结果中的目标目录，与逐个--add-data时的规则一致"""
+    rel_path = os.path.relpath(resource, root_dir)
+    if os.path.isfile(resource):
+        dest_path = os.path.dirname(rel_path)
+    else:
+        dest_path = os.path.basename(rel_path) if rel_path != "." else ""
+    return dest_path or "."
+
+
+@dataclass
+class ResourceFile:
+    source: str
+    dest: str  # 目标目录，相对于打包结果的根目录，"."为根目录
+    size: int
+    mtime_ns: int
+
+    @property
+    def target(self):
+        """打包后的相对路径，用于合并重复添加的文件"""
+        return os.path.normpath(os.path.join(self.dest, os.path.basename(self.source)))
+
+
+class HashCache:
+    """资源文件的内容哈希缓存，按大小和修改时间判断是否需要重新计算"""
+
+    def __init__(self, project_dir):
+        self.path = os.path.join(project_dir, CACHE_DIR_NAME, "resource_hashes.json")
+        self.changed = False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get(self, item):
+        entry = self.entries.get(item.source)
+        if entry and entry[0] == item.size and entry[1] == item.mtime_ns:
+            return entry[2]
+        digest = hash_file(item.source)
+        self.entries[item.source] = [item.size, item.mtime_ns, digest]
+        self.changed = True
+        return digest
+
+    def save(self):
+        if not self.changed:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with atomic_write(self.path, encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+
+
+class ResourceManifest:
+    """展开后的资源清单"""
+
+    def __init__(self, root_dir, include=(), exclude=DEFAULT_RESOURCE_EXCLUDES):
+        """
+        :param root_dir: 主程序所在目录，资源的目标路径相对于它计算，哈希缓存也保存在这里
+        :param include: 包含规则，非空时文件夹中只打包匹配的文件；单独添加的文件不受影响
+        :param exclude: 排除规则，匹配的文件和目录都不打包
+        """
+        self.root_dir = root_dir
+        self.include = tuple(include)
+        self.exclude = tuple(exclude)
+        self.files = []
+        self.missing = []  # 不存在的资源
+        self.excluded_count = 0
+        self.overlap_count = 0  # 重复添加（目标路径相同）而合并的文件数
+        self.duplicates = []  # (文件, 内容相同的第一个文件)
+
+    def _walk(self, folder, dest):
+        """用scandir遍历文件夹，排除的目录整个跳过"""
+        stack = [(folder, "")]
+        while stack:
+            path, rel_dir = stack.pop()
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                        if matches_any(rel_path, self.exclude):
+                            self.excluded_count += 1
+                            continue
+                        if entry.is_dir():
+                            stack.append((entry.path, rel_path))
+                            continue
+                        if self.include and not matches_any(rel_path, self.include):
+                            self.excluded_count += 1
+                            continue
+                        stat = entry.stat()
+                        sub_dir = os.path.dirname(rel_path)
+                        yield ResourceFile(entry.path, os.path.join(dest, sub_dir) if sub_dir else dest,
+                                           stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                continue
+
+    def build(self, resources):
+        """
+        展开资源列表并查找重复文件
+        :return: self
+        """
+        targets = set()
+        for resource in resources:
+            try:
+                stat = os.stat(resource)
+            except OSError:
+                self.missing.append(resource)
+                continue
+            dest = resource_dest(resource, self.root_dir)
+            if os.path.isdir(resource):
+                items = self._walk(resource, dest)
+            elif matches_any(os.path.basename(resource), self.exclude):
+                self.excluded_count += 1
+                continue
+            else:
+                items = [ResourceFile(resource, dest, stat.st_size, stat.st_mtime_ns)]
+            for item in items:
+                target = os.path.normcase(item.target)
+                if target in targets:
+                    self.overlap_count += 1
+                    continue
+                targets.add(target)
+                self.files.append(item)
+        self._find_duplicates()
+        return self
+
+    def _find_duplicates(self):
+        """先按大小分组，只对大小相同的文件计算内容哈希"""
+        by_size = {}
+        for item in self.files:
+            if item.size:
+                by_size.setdefault(item.size, []).append(item)
+        candidates = [group for group in by_size.values() if len(group) > 1]
+        if not candidates:
+            return
+        cache = HashCache(self.root_dir)
+        for group in candidates:
+            first_by_hash = {}
+            for item in group:
+                digest = cache.get(item)
+                if digest in first_by_hash:
+                    self.duplicates.append((item, first_by_hash[digest]))
+                else:
+                    first_by_hash[digest] = item
+        try:
+            cache.save()
+        except OSError:
+            pass
+
+    @property
+    def total_size(self):
+        return sum(item.size for item in self.files)
+
+    @property
+    def datas(self):
+        """spec文件Analysis的datas列表"""
+        return [(item.source, item.dest) for item in self.files]
+
+    @property
+    def digest(self):
+        """datas列表的摘要，包含/排除规则或文件增删后改变"""
+        return hashlib.sha256(json.dumps(self.datas).encode("utf-8")).hexdigest()
+
+    def format_report(self):
+        """按顶层目标目录统计文件数、大小和内容重复的大小"""
+        groups = {}
+        for item in self.files:
+            top = item.target.split(os.sep, 1)[0] if os.sep in item.target else "."
+            groups.setdefault(top, [0, 0, 0])
+            groups[top][0] += 1
+            groups[top][1] += item.size
+        for item, _ in self.duplicates:
+            top = item.target.split(os.sep, 1)[0] if os.sep in item.target else "."
+            groups[top][2] += item.size
+
+        rows = [("目标目录", "文件数", "大小", "重复内容")]
+        for top in sorted(groups, key=lambda name: -groups[name][1]):
+            count, size, duplicate = groups[top]
+            rows.append((top, str(count), format_size(size), format_size(duplicate) if duplicate else "-"))
+        duplicate_size = sum(item.size for item, _ in self.duplicates)
+        rows.append(("合计", str(len(self.files)), format_size(self.total_size),
+                     format_size(duplicate_size) if duplicate_size else "-"))
+
+        lines = ["资源清单:", format_table(rows)]
+        if self.excluded_count:
+            lines.append(f"按规则排除: {self.excluded_count} 项")
+        if self.overlap_count:
+            lines.append(f"重复添加已合并: {self.overlap_count} 个文件")
+        for item, original in self.duplicates[:10]:
+            lines.append(f"内容相同: {item.target} = {original.target} ({format_size(item.size)})")
+        if len(self.duplicates) > 10:
+            lines.append(f"……另有 {len(self.duplicates) - 10} 个内容相同的文件")
+        for resource in self.missing:
+            lines.append(f"警告: 资源不存在 - {resource}")
+        return "\n".join(lines) + "\n"
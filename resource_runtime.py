@@ -0,0 +1,160 @@
+"""
+资源归档运行时
+打包时启用资源归档后，资源不再作为零散文件放进程序，而是合并为程序旁边的resources.pak，
+单文件程序启动时不必把全部资源解压到临时目录。程序通过本模块按相对路径读取资源，
+归档用mmap映射，只有读取到的条目才会真正从磁盘读入；没有归档（如直接运行源码）时读取主程序目录下的文件。
+本模块只依赖标准库，打包时会自动加入程序，开发时可以复制到项目中。
+
+用法:
+    from resource_runtime import open_resource, read_resource
+    data = read_resource("assets/logo.png")
+"""
+import io
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import zlib
+
+ARCHIVE_NAME = "resources.pak"
+MAGIC = b"PYRSPAK1"
+# 文件末尾: 索引偏移、索引长度、魔数
+TRAILER = struct.Struct("<QQ8s")
+STORED = 0
+DEFLATED = 1
+
+_archive = None
+_archive_loaded = False
+_lock = threading.Lock()
+
+
+def normalize_name(name):
+    """资源名统一为/分隔的相对路径"""
+    return os.path.normpath(name).replace(os.sep, "/")
+
+
+class ResourceArchive:
+    """只读的资源归档，索引在打开时读入，条目按需读取"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._read_lock = threading.Lock()
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # 不支持mmap时退回到普通文件读取
+            self._map = None
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            if size < TRAILER.size:
+                raise ValueError(f"不是资源归档: {path}")
+            index_offset, index_size, magic = TRAILER.unpack(self._read(size - TRAILER.size, TRAILER.size))
+            if magic != MAGIC:
+                raise ValueError(f"不是资源归档: {path}")
+            self.index = json.loads(self._read(index_offset, index_size).decode("utf-8"))
+        except Exception:
+            self.close()
+            raise
+
+    def _read(self, offset, length):
+        if self._map is not None:
+            return self._map[offset:offset + length]
+        with self._read_lock:
+            self._file.seek(offset)
+            return self._file.read(length)
+
+    def __contains__(self, name):
+        return normalize_name(name) in self.index
+
+    def names(self):
+        return list(self.index)
+
+    def read(self, name):
+        """读取条目的完整内容"""
+        offset, size, stored_size, method = self.index[normalize_name(name)]
+        data = self._read(offset, stored_size)
+        return zlib.decompress(data) if method == DEFLATED else data
+
+    def view(self, name):
+        """
+        未压缩条目直接返回归档映射上的memoryview，不复制数据；压缩条目或未映射时返回bytes
+        """
+        offset, size, stored_size, method = self.index[normalize_name(name)]
+        if method == STORED and self._map is not None:
+            return memoryview(self._map)[offset:offset + size]
+        return self.read(name)
+
+    def close(self):
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # 仍有view()返回的memoryview在使用，随进程退出释放
+                pass
+        self._file.close()
+
+
+def base_dir():
+    """零散资源文件的根目录：打包后为解压目录，直接运行源码时为主程序所在目录"""
+    if getattr(sys, "frozen", False):
+        return getattr(sys, "_MEIPASS", os.path.dirname(sys.executable))
+    return os.path.dirname(os.path.abspath(sys.argv[0])) if sys.argv and sys.argv[0] else os.getcwd()
+
+
+def find_archive():
+    """查找程序旁边的资源归档"""
+    candidates = []
+    if getattr(sys, "frozen", False):
+        candidates.append(os.path.dirname(sys.executable))
+    candidates.append(base_dir())
+    for directory in candidates:
+        path = os.path.join(directory, ARCHIVE_NAME)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def get_archive():
+    """
+    打开的资源归档，首次调用时查找并打开
+    :return: ResourceArchive，没有归档时返回None
+    """
+    global _archive, _archive_loaded
+    if not _archive_loaded:
+        with _lock:
+            if not _archive_loaded:
+                path = find_archive()
+                _archive = ResourceArchive(path) if path else None
+                _archive_loaded = True
+    return _archive
+
+
+def resource_exists(name):
+    archive = get_archive()
+    if archive and name in archive:
+        return True
+    return os.path.exists(os.path.join(base_dir(), name))
+
+
+def read_resource(name):
+    """
+    读取资源内容
+    :param name: 相对于主程序目录的路径，与添加资源时的目标路径一致，如"assets/logo.png"
+    :return: bytes
+    """
+    archive = get_archive()
+    if archive and name in archive:
+        return archive.read(name)
+    with open(os.path.join(base_dir(), name), 'rb') as f:
+        return f.read()
+
+
+def open_resource(name):
+    """以二进制只读文件对象的形式打开资源"""
+    archive = get_archive()
+    if archive and name in archive:
+        return io.BytesIO(archive.read(name))
+    return open(os.path.join(base_dir(), name), 'rb')
@@ -0,0 +1,480 @@
+"""
+产物大小分析
+读取生成的程序：文件夹模式遍历程序目录，单文件模式读取程序末尾的PyInstaller归档（PKG）目录，
+两种模式都读取其中的PYZ目录，得到每个Python模块、二进制文件和数据文件在产物中占用的大小；
+再按PyInstaller生成的xref导入关系图，把每一项归到主程序直接导入的模块上，
+并标出看起来用不到的大件：没有用到的tkinter及Tcl/Tk数据、包中的测试和文档、C头文件和静态库等
+
+用法:
+    python -m size_report dist/app [--xref build/app/xref-app.html] [--script app.py] [--top 20]
+"""
+import argparse
+import html
+import marshal
+import os
+import re
+import struct
+import sys
+from dataclasses import dataclass, field
+
+from build_history import format_size
+from import_analysis import analyze_imports
+from import_graph import extract_imports, parse_module
+from text_table import format_table
+
+# PyInstaller归档（CArchive）末尾的cookie: 魔数、归档长度、目录偏移、目录长度、Python版本、Python库名
+COOKIE_MAGIC = b"MEI\014\013\012\013\016"
+COOKIE = struct.Struct("!8sIIII64s")
+# 目录项: 项长度、数据偏移、存储长度、原始长度、是否压缩、类型码，之后是以\0补齐的名称
+TOC_ENTRY = struct.Struct("!IIIIBc")
+PYZ_MAGIC = b"PYZ\0"
+SEARCH_CHUNK_SIZE = 8192
+
+KIND_NAMES = {"module": "模块", "binary": "二进制", "data": "数据"}
+
+SOURCE_APP = "主程序"
+SOURCE_RUNTIME = "Python运行时"
+SOURCE_BOOTSTRAP = "PyInstaller引导"
+SOURCE_OTHER = "其他依赖"
+# 主程序源码中没有导入、由PyInstaller基础模块或--hidden-import、--collect-*参数加入的模块
+IMPLICIT_SUFFIX = " (隐式)"
+
+# 属于tkinter的Tcl/Tk数据目录和动态库
+TK_DIRS = ("_tcl_data", "_tk_data", "tcl", "tk", "tcl8", "tcl8.6", "tk8.6")
+TK_LIB_PATTERN = re.compile(r"^(lib)?(tcl|tk)\d", re.I)
+# 扩展模块的文件名: 模块名.cpython-311-x86_64-linux-gnu.so、模块名.cp311-win_amd64.pyd等
+EXTENSION_SUFFIXES = (".so", ".pyd")
+TEST_DIRS = frozenset({"test", "tests", "testing"})
+DOC_DIRS = frozenset({"doc", "docs", "example", "examples", "sample", "samples"})
+DOC_SUFFIXES = (".md", ".rst", ".ipynb")
+DEVEL_SUFFIXES = (".h", ".hpp", ".c", ".cpp", ".pyx", ".pxd", ".pyi", ".lib", ".a")
+
+FLAG_NAMES = {
+    "tkinter": "未使用的tkinter",
+    "tests": "测试",
+    "docs": "文档/示例",
+    "devel": "头文件/源码/静态库",
+}
+FLAG_ADVICE = {
+    "tkinter": "程序没有用到tkinter，启用\"分析导入\"（--analyze-imports）后不再用--collect-all=tkinter收集",
+    "tests": "可以用--exclude-module排除",
+    "docs": "运行时不需要，可以在spec文件或钩子中排除",
+    "devel": "只在编译时需要，可以在spec文件或钩子中排除",
+}
+
+XREF_NODE_PATTERN = re.compile(r'<div class="node">\s*<a name="([^"]+)"></a>(.*?)\n</div>', re.S)
+XREF_TYPE_PATTERN = re.compile(r'class="moduletype">(\w*)')
+XREF_LINK_PATTERN = re.compile(r'href="#([^"]+)"')
+XREF_CODE_PATTERN = re.compile(r'<a target="code" href="([^"]*)"')
+
+
+@dataclass
+class ArtifactItem:
+    name: str  # 模块名或在产物中的相对路径（/分隔）
+    kind: str  # "module"、"binary"或"data"
+    size: int  # 在产物中占用的字节数，归档中的条目为压缩后的大小
+    module: str = ""  # 对应的模块（点分），用于按导入关系归属
+    source: str = ""  # 把它带进产物的导入
+    flags: list = field(default_factory=list)
+
+
+def _find_cookie(f):
+    """从文件末尾向前查找归档cookie，返回其位置，找不到时返回-1"""
+    f.seek(0, os.SEEK_END)
+    end = f.tell()
+    while end >= len(COOKIE_MAGIC):
+        start = max(end - SEARCH_CHUNK_SIZE, 0)
+        f.seek(start)
+        pos = f.read(end - start).rfind(COOKIE_MAGIC)
+        if pos != -1:
+            return start + pos
+        if start == 0:
+            break
+        # 相邻的两块留出重叠，避免魔数被切开
+        end = start + len(COOKIE_MAGIC) - 1
+    return -1
+
+
+def read_pkg(path):
+    """
+    读取程序中的PyInstaller归档目录
+    :return: [(名称, 类型码, 存储大小, 数据在文件中的偏移)]
+    """
+    with open(path, 'rb') as f:
+        cookie_pos = _find_cookie(f)
+        if cookie_pos < 0:
+            raise ValueError(f"不是PyInstaller生成的程序: {path}")
+        f.seek(cookie_pos)
+        _, length, toc_offset, toc_length, _, _ = COOKIE.unpack(f.read(COOKIE.size))
+        start = cookie_pos + COOKIE.size - length
+        f.seek(start + toc_offset)
+        data = f.read(toc_length)
+
+    entries = []
+    pos = 0
+    while pos < len(data):
+        entry_length, offset, stored_size, _, _, typecode = TOC_ENTRY.unpack_from(data, pos)
+        if entry_length < TOC_ENTRY.size:
+            raise ValueError(f"归档目录损坏: {path}")
+        name = data[pos + TOC_ENTRY.size:pos + entry_length].rstrip(b"\0").decode("utf-8")
+        entries.append((name.replace("\\", "/"), typecode.decode("ascii"), stored_size, start + offset))
+        pos += entry_length
+    return entries
+
+
+def read_pyz(path, offset=0):
+    """
+    读取PYZ归档的目录
+    :param offset: PYZ在文件中的起始位置
+    :return: [(模块名, 压缩后的大小)]
+    """
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        if f.read(len(PYZ_MAGIC)) != PYZ_MAGIC:
+            raise ValueError(f"不是PYZ归档: {path}")
+        f.read(4)  # 字节码魔数
+        toc_offset, = struct.unpack("!i", f.read(4))
+        f.seek(offset + toc_offset)
+        try:
+            toc = marshal.load(f)
+        except (EOFError, ValueError, TypeError) as e:
+            raise ValueError(f"无法读取PYZ目录: {path}") from e
+    if isinstance(toc, dict):
+        toc = toc.items()
+    # 各版本PyInstaller的目录项最后一个字段都是长度
+    return [(name, entry[-1]) for name, entry in toc]
+
+
+def _scan_executable(path, name, with_files):
+    """
+    读取程序中的归档条目
+    :param name: 程序在产物中的名称
+    :param with_files: 是否包含二进制和数据文件，文件夹模式下它们在程序目录中，归档里只有模块
+    """
+    items = []
+    stored_total = 0
+    for entry_name, typecode, stored_size, offset in read_pkg(path):
+        stored_total += stored_size
+        if typecode == "z":
+            items.extend(ArtifactItem(module, "module", size, module=module) for module, size in read_pyz(path, offset))
+        elif typecode == "s":
+            source = SOURCE_BOOTSTRAP if entry_name.startswith(("pyi_rth_", "pyiboot")) else SOURCE_APP
+            items.append(ArtifactItem(entry_name, "module", stored_size, source=source))
+        elif typecode in ("m", "M"):
+            items.append(ArtifactItem(entry_name, "module", stored_size, source=SOURCE_BOOTSTRAP))
+        elif with_files and typecode == "b":
+            items.append(ArtifactItem(entry_name, "binary", stored_size))
+        elif with_files and typecode in ("x", "Z", "l"):
+            items.append(ArtifactItem(entry_name, "data", stored_size))
+    # 归档之外的部分是启动程序（bootloader）和文件格式的开销
+    rest = os.path.getsize(path) - stored_total
+    if rest > 0:
+        items.append(ArtifactItem(f"{name} (启动程序)", "binary", rest, source=SOURCE_BOOTSTRAP))
+    return items
+
+
+def scan_artifact(path):
+    """
+    列出产物中的全部条目
+    :param path: 单文件程序或文件夹模式的程序目录
+    :return: [ArtifactItem]
+    """
+    if os.path.isfile(path):
+        return _scan_executable(path, os.path.basename(path), with_files=True)
+
+    name = os.path.basename(os.path.normpath(path))
+    executables = {name, name + ".exe"}
+    items = []
+    for root, _, files in os.walk(path):
+        for file in files:
+            file_path = os.path.join(root, file)
+            rel_path = os.path.relpath(file_path, path).replace(os.sep, "/")
+            if root == path and file in executables:
+                items.extend(_scan_executable(file_path, file, with_files=False))
+                continue
+            # PyInstaller 6把依赖放在_internal目录中，去掉这一级使名称与单文件模式一致
+            if rel_path.startswith("_internal/"):
+                rel_path = rel_path[len("_internal/"):]
+            kind = "binary" if _is_binary(file) else "data"
+            items.append(ArtifactItem(rel_path, kind, os.path.getsize(file_path)))
+    return items
+
+
+def _is_binary(file_name):
+    lower = file_name.lower()
+    return lower.endswith((".so", ".pyd", ".dll", ".dylib", ".exe")) or ".so." in lower
+
+
+def _file_module(path):
+    """
+    推断二进制或数据文件属于哪个模块
+    :return: 模块名，Python运行时返回SOURCE_RUNTIME，无法判断时返回""
+    """
+    parts = path.split("/")
+    base = parts[-1]
+    if parts[0] in TK_DIRS or (len(parts) == 1 and TK_LIB_PATTERN.match(base)):
+        return "_tkinter"
+    if base == "base_library.zip" or base.lower().startswith(("libpython", "python3")):
+        return SOURCE_RUNTIME
+    if parts[0] == "lib-dynload":
+        parts = parts[1:]
+    if parts[0].endswith((".dist-info", ".egg-info")):
+        return parts[0].split("-", 1)[0]
+    if parts[0].endswith(".libs"):
+        return parts[0][:-len(".libs")]
+    if base.lower().endswith(EXTENSION_SUFFIXES):
+        return ".".join(parts[:-1] + [base.split(".", 1)[0]])
+    if len(parts) > 1:
+        return parts[0]
+    return ""
+
+
+def _item_flags(item, tkinter_unused):
+    parts = item.name.split(".") if item.kind == "module" else item.name.split("/")
+    flags = []
+    if tkinter_unused and item.module.split(".", 1)[0] in ("tkinter", "_tkinter"):
+        flags.append("tkinter")
+    if any(part in TEST_DIRS for part in parts):
+        flags.append("tests")
+    if item.kind != "module":
+        lower = item.name.lower()
+        if any(part.lower() in DOC_DIRS for part in parts[:-1]) or lower.endswith(DOC_SUFFIXES):
+            flags.append("docs")
+        if lower.endswith(DEVEL_SUFFIXES):
+            flags.append("devel")
+    return flags
+
+
+def load_xref(path):
+    """
+    读取PyInstaller生成的xref-<名称>.html导入关系图
+    :return: {节点名: (类型, 导入的节点列表, 源文件路径)}，入口脚本的节点名以.py结尾
+    """
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        text = f.read()
+    nodes = {}
+    for match in XREF_NODE_PATTERN.finditer(text):
+        name = html.unescape(match.group(1))
+        body = match.group(2)
+        type_match = XREF_TYPE_PATTERN.search(body)
+        code_match = XREF_CODE_PATTERN.search(body)
+        # "imports:"在"imported by:"之前，只取前一部分的链接
+        imports_part = body.split("imported by:", 1)[0]
+        imports = [html.unescape(link) for link in XREF_LINK_PATTERN.findall(imports_part)]
+        nodes[name] = (type_match.group(1) if type_match else "", imports,
+                       html.unescape(code_match.group(1)) if code_match else "")
+    return nodes
+
+
+def _direct_imports(main_script):
+    """主程序源码中直接导入的模块名（点分）"""
+    tree = parse_module(main_script) if main_script else None
+    if tree is None:
+        return set()
+    info = extract_imports(tree)
+    names = {module for level, module, _ in info["imports"] if level == 0 and module}
+    for level, module, imported in info["imports"]:
+        if level == 0 and module and imported:
+            names.update(f"{module}.{name}" for name in imported)
+    names.update(info["dynamic"])
+    return names
+
+
+def attribute_modules(nodes, main_script=None):
+    """
+    按导入关系图把每个模块归到入口脚本直接导入的模块
+    从入口脚本导入的全部模块同时开始广度优先遍历，每个模块归到最先到达它的那个；
+    主程序源码中没有的导入标为隐式，只被运行时钩子导入的模块归到该钩子
+    :param main_script: 主程序路径，为None时使用图中的入口脚本
+    :return: {模块名: 来源}
+    """
+    scripts = [name for name, (node_type, _, _) in nodes.items() if node_type == "Script"]
+    hooks = [name for name in scripts if os.path.basename(name).startswith("pyi_rth_")]
+    mains = [name for name in scripts if name not in hooks]
+    if not mains:
+        return {}
+    main = mains[0]
+    direct = _direct_imports(main_script or nodes[main][2])
+
+    queue = []
+    for name in nodes[main][1]:
+        top = name.split(".", 1)[0]
+        queue.append((name, top if name in direct or top in direct else top + IMPLICIT_SUFFIX))
+    # 直接导入优先于隐式导入
+    queue.sort(key=lambda pair: pair[1].endswith(IMPLICIT_SUFFIX))
+    for hook in hooks:
+        queue.extend((name, f"运行时钩子 {hook}") for name in nodes[hook][1])
+
+    sources = {}
+    index = 0
+    while index < len(queue):
+        name, source = queue[index]
+        index += 1
+        if name in sources or name not in nodes:
+            continue
+        sources[name] = source
+        queue.extend((imported, source) for imported in nodes[name][1] if imported not in sources)
+    return sources
+
+
+def _lookup_source(module, sources):
+    """模块没有出现在导入关系图中时，按它的上级包查找"""
+    while module:
+        if module in sources:
+            return sources[module]
+        module = module.rpartition(".")[0]
+    return ""
+
+
+class SizeReport:
+    """一个产物的大小分析结果"""
+
+    def __init__(self, artifact, kind=""):
+        """
+        :param artifact: 单文件程序或文件夹模式的程序目录
+        :param kind: "onefile"或"onedir"，只用于报告标题
+        """
+        self.artifact = artifact
+        self.kind = kind or ("onefile" if os.path.isfile(artifact) else "onedir")
+        self.items = []
+        self.has_xref = False
+
+    def analyze(self, xref_path=None, main_script=None, uses_tkinter=None):
+        """
+        :param xref_path: PyInstaller生成的导入关系图，不存在时按模块的顶层包归属
+        :param main_script: 主程序路径，用于区分源码中的导入和隐式导入
+        :param uses_tkinter: 程序是否用到tkinter，为None时按主程序的导入分析判断，没有主程序时按导入关系图判断
+        :return: self
+        """
+        self.items = scan_artifact(self.artifact)
+        sources = {}
+        if xref_path and os.path.isfile(xref_path):
+            sources = attribute_modules(load_xref(xref_path), main_script)
+            self.has_xref = bool(sources)
+        if uses_tkinter is None:
+            if main_script and os.path.isfile(main_script):
+                uses_tkinter = analyze_imports(main_script).uses_tkinter
+            elif self.has_xref:
+                tk_source = _lookup_source("tkinter", sources) or _lookup_source("_tkinter", sources)
+                uses_tkinter = not tk_source or not tk_source.endswith(IMPLICIT_SUFFIX)
+            else:
+                uses_tkinter = True
+
+        for item in self.items:
+            if not item.module and not item.source:
+                item.module = _file_module(item.name) if item.kind != "module" else item.name
+            if item.module == SOURCE_RUNTIME:
+                item.source = SOURCE_RUNTIME
+            elif not item.source:
+                if item.module:
+                    item.source = _lookup_source(item.module, sources) or item.module.split(".", 1)[0]
+                else:
+                    item.source = SOURCE_OTHER
+            item.flags = _item_flags(item, not uses_tkinter)
+        self.items.sort(key=lambda item: -item.size)
+        return self
+
+    @property
+    def total_size(self):
+        return sum(item.size for item in self.items)
+
+    def _format_sources(self, limit):
+        groups = {}
+        for item in self.items:
+            group = groups.setdefault(item.source, {"module": 0, "binary": 0, "data": 0})
+            group[item.kind] += item.size
+        ordered = sorted(groups.items(), key=lambda pair: -sum(pair[1].values()))
+        if len(ordered) > limit:
+            rest = {"module": 0, "binary": 0, "data": 0}
+            for _, group in ordered[limit:]:
+                for kind, size in group.items():
+                    rest[kind] += size
+            ordered = ordered[:limit] + [(f"其他 {len(ordered) - limit} 项", rest)]
+
+        total = self.total_size or 1
+        rows = [("来源", "模块", "二进制", "数据", "合计", "占比")]
+        for source, group in ordered:
+            size = sum(group.values())
+            rows.append((source, *(format_size(group[kind]) if group[kind] else "-" for kind in KIND_NAMES),
+                         format_size(size), f"{size * 100 / total:.1f}%"))
+        return format_table(rows)
+
+    def _format_advice(self):
+        lines = []
+        for flag, flag_name in FLAG_NAMES.items():
+            flagged = [item for item in self.items if flag in item.flags]
+            if not flagged:
+                continue
+            size = sum(item.size for item in flagged)
+            line = f"  {flag_name}: {len(flagged)} 项，{format_size(size)}，{FLAG_ADVICE[flag]}"
+            if flag == "tests":
+                # 列出测试所在的包，可以直接作为--exclude-module的参数
+                packages = {}
+                for item in flagged:
+                    if item.kind != "module":
+                        continue
+                    parts = item.name.split(".")
+                    index = next(i for i, part in enumerate(parts) if part in TEST_DIRS)
+                    package = ".".join(parts[:index + 1])
+                    packages[package] = packages.get(package, 0) + item.size
+                if packages:
+                    top = sorted(packages, key=lambda name: -packages[name])[:5]
+                    line += ": " + " ".join(f"--exclude-module={name}" for name in top)
+            lines.append(line)
+        return lines
+
+    def format_report(self, top=20, source_limit=15):
+        """
+        :param top: 列出最大的条目数
+        :param source_limit: 按来源汇总时列出的来源数，其余合并为一行
+        """
+        by_kind = {kind: [0, 0] for kind in KIND_NAMES}
+        for item in self.items:
+            by_kind[item.kind][0] += 1
+            by_kind[item.kind][1] += item.size
+        kinds = "，".join(f"{KIND_NAMES[kind]} {count} 项 {format_size(size)}"
+                         for kind, (count, size) in by_kind.items() if count)
+        lines = [f"产物分析 ({self.kind}): {self.artifact}，共 {format_size(self.total_size)}（{kinds}）"]
+        if not self.has_xref:
+            lines.append("没有找到PyInstaller的导入关系图，按顶层包归属")
+        lines.append("按来源:")
+        lines.append(self._format_sources(source_limit))
+
+        rows = [("大小", "类型", "名称", "来源", "标记")]
+        for item in self.items[:top]:
+            rows.append((format_size(item.size), KIND_NAMES[item.kind], item.name, item.source,
+                         "，".join(FLAG_NAMES[flag] for flag in item.flags)))
+        lines.append(f"最大的 {min(top, len(self.items))} 项:")
+        lines.append(format_table(rows))
+
+        advice = self._format_advice()
+        if advice:
+            lines.append("可以精简:")
+            lines.extend(advice)
+        return "\n".join(lines) + "\n"
+
+
+def get_xref_path(work_dir, name):
+    """PyInstaller在工作目录下的<名称>目录中生成xref-<名称>.html"""
+    return os.path.join(work_dir, name, f"xref-{name}.html")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="size_report", description="分析PyInstaller产物中各模块、二进制和数据文件的大小")
+    parser.add_argument("artifact", help="单文件程序或文件夹模式的程序目录")
+    parser.add_argument("--xref", help="PyInstaller生成的xref-<名称>.html，用于把条目归到带入它的导入")
+    parser.add_argument("--script", help="主程序，用于区分源码中的导入和隐式导入、判断是否用到tkinter")
+    parser.add_argument("--top", type=int, default=20, help="列出最大的条目数")
+    args = parser.parse_args(argv)
+
+    try:
+        report = SizeReport(args.artifact).analyze(args.xref, args.script)
+    except (OSError, ValueError) as e:
+        print(f"分析失败: {str(e)}", file=sys.stderr)
+        return 1
+    print(report.format_report(args.top))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
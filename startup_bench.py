@@ -0,0 +1,241 @@
+"""
+启动时间测试
+打包时加入一个运行时钩子，PACK_STARTUP_BENCH环境变量等于项目的随机令牌时程序在执行主程序之前立即退出；
+钩子会留在发布的程序中，只认令牌，用户环境中恰好设置了同名变量不会让程序退出；
+打包完成后把生成的程序启动若干次，测量首次（冷）启动和之后（热）启动的用时以及内存峰值，
+结果写入构建历史，可以对比单文件与文件夹、启用与不启用UPX的差别
+"""
+import os
+import secrets
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from build_cache import CACHE_DIR_NAME
+from build_history import format_size
+from text_table import format_table
+
+BENCH_ENV = "PACK_STARTUP_BENCH"
+# 默认启动次数，第一次为冷启动，其余为热启动
+STARTUP_RUNS = 5
+# 单次启动的超时时间（秒）
+STARTUP_TIMEOUT = 60
+# Windows API常量：挂起创建进程、查询作业的扩展限制信息（含内存峰值）
+CREATE_SUSPENDED = 0x00000004
+JOB_OBJECT_EXTENDED_LIMIT_INFORMATION = 9
+
+RUNTIME_HOOK = '''# 打包工具生成的运行时钩子：{env}环境变量等于本项目的令牌时立即退出，用于测量启动时间
+import os
+import sys
+
+if os.environ.get("{env}") == "{token}":
+    sys.exit(0)
+'''
+
+
+def write_runtime_hook(project_dir):
+    """
+    在项目缓存目录中生成运行时钩子，令牌和内容不变时不重写，避免改变构建指纹
+    :return: (钩子文件路径, 令牌)
+    """
+    hook_dir = os.path.join(project_dir, CACHE_DIR_NAME, "startup_hook")
+    token_path = os.path.join(hook_dir, "token")
+    path = os.path.join(hook_dir, "pyi_rth_pack_startup_bench.py")
+    os.makedirs(hook_dir, exist_ok=True)
+    try:
+        with open(token_path, 'r', encoding='utf-8') as f:
+            token = f.read().strip()
+    except OSError:
+        token = ""
+    if not token:
+        token = secrets.token_hex(16)
+        with open(token_path, 'w', encoding='utf-8') as f:
+            f.write(token)
+    hook = RUNTIME_HOOK.format(env=BENCH_ENV, token=token)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == hook:
+                return path, token
+    except OSError:
+        pass
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(hook)
+    return path, token
+
+
+def get_executable_path(dist_dir, name, kind):
+    """单文件为输出目录中的程序，文件夹为程序目录中的同名程序"""
+    suffix = ".exe" if sys.platform == "win32" else ""
+    if kind == "onedir":
+        return os.path.join(dist_dir, name, name + suffix)
+    return os.path.join(dist_dir, name + suffix)
+
+
+def _run_in_job(args, env, cwd, timeout):
+    """
+    Windows下在作业对象中启动程序，返回作业中所有进程同时占用的内存峰值
+    单文件程序由引导进程解压后再启动运行Python的子进程，只读取引导进程的内存会严重偏小；
+    进程先挂起启动，加入作业后再恢复，子进程自动属于同一个作业
+    :return: (用时秒数, 内存峰值字节数或None, 退出码)
+    """
+    import ctypes
+    from ctypes import wintypes
+
+    class IoCounters(ctypes.Structure):
+        _fields_ = [(name, ctypes.c_ulonglong) for name in (
+            "ReadOperationCount", "WriteOperationCount", "OtherOperationCount",
+            "ReadTransferCount", "WriteTransferCount", "OtherTransferCount")]
+
+    class BasicLimitInformation(ctypes.Structure):
+        _fields_ = [
+            ("PerProcessUserTimeLimit", ctypes.c_int64),
+            ("PerJobUserTimeLimit", ctypes.c_int64),
+            ("LimitFlags", wintypes.DWORD),
+            ("MinimumWorkingSetSize", ctypes.c_size_t),
+            ("MaximumWorkingSetSize", ctypes.c_size_t),
+            ("ActiveProcessLimit", wintypes.DWORD),
+            ("Affinity", ctypes.c_size_t),
+            ("PriorityClass", wintypes.DWORD),
+            ("SchedulingClass", wintypes.DWORD),
+        ]
+
+    class ExtendedLimitInformation(ctypes.Structure):
+        _fields_ = [
+            ("BasicLimitInformation", BasicLimitInformation),
+            ("IoInfo", IoCounters),
+            ("ProcessMemoryLimit", ctypes.c_size_t),
+            ("JobMemoryLimit", ctypes.c_size_t),
+            ("PeakProcessMemoryUsed", ctypes.c_size_t),
+            ("PeakJobMemoryUsed", ctypes.c_size_t),
+        ]
+
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    kernel32.CreateJobObjectW.restype = wintypes.HANDLE
+    kernel32.CreateJobObjectW.argtypes = [wintypes.LPVOID, wintypes.LPCWSTR]
+    kernel32.AssignProcessToJobObject.argtypes = [wintypes.HANDLE, wintypes.HANDLE]
+    kernel32.TerminateJobObject.argtypes = [wintypes.HANDLE, wintypes.UINT]
+    kernel32.QueryInformationJobObject.argtypes = [
+        wintypes.HANDLE, ctypes.c_int, wintypes.LPVOID, wintypes.DWORD, wintypes.LPDWORD]
+    kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+    ntdll = ctypes.WinDLL("ntdll")
+    ntdll.NtResumeProcess.argtypes = [wintypes.HANDLE]
+
+    job = kernel32.CreateJobObjectW(None, None)
+    if not job:
+        raise ctypes.WinError(ctypes.get_last_error())
+    try:
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            args, env=env, cwd=cwd, creationflags=CREATE_SUSPENDED,
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        in_job = bool(kernel32.AssignProcessToJobObject(job, int(process._handle)))
+        ntdll.NtResumeProcess(int(process._handle))
+        # 超时时结束整个作业，单文件程序的子进程一并结束
+        timer = threading.Timer(timeout, kernel32.TerminateJobObject if in_job else process.kill,
+                                (job, 1) if in_job else ())
+        timer.start()
+        try:
+            process.wait()
+            elapsed = time.perf_counter() - start
+        finally:
+            timer.cancel()
+        peak = None
+        if in_job:
+            info = ExtendedLimitInformation()
+            if kernel32.QueryInformationJobObject(job, JOB_OBJECT_EXTENDED_LIMIT_INFORMATION,
+                                                  ctypes.byref(info), ctypes.sizeof(info), None):
+                peak = info.PeakJobMemoryUsed or None
+        return elapsed, peak, process.returncode
+    finally:
+        kernel32.CloseHandle(job)
+
+
+def run_once(executable, token, timeout=STARTUP_TIMEOUT):
+    """
+    以测试模式启动一次程序
+    :param token: write_runtime_hook返回的令牌
+    :return: (用时秒数, 内存峰值字节数或None, 退出码)
+    """
+    env = dict(os.environ, **{BENCH_ENV: token})
+    if sys.platform == "win32":
+        return _run_in_job([executable], env, os.path.dirname(executable), timeout)
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [executable], env=env, cwd=os.path.dirname(executable),
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    timer = threading.Timer(timeout, process.kill)
+    timer.start()
+    try:
+        # wait4返回的资源用量包含已回收的子进程，单文件程序解压后启动的子进程也计算在内
+        _, status, usage = os.wait4(process.pid, 0)
+        elapsed = time.perf_counter() - start
+        process.returncode = os.waitstatus_to_exitcode(status)
+        # Linux下ru_maxrss的单位是KB，macOS下是字节
+        peak = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+    finally:
+        timer.cancel()
+    return elapsed, peak, process.returncode
+
+
+def benchmark(executable, token, runs=STARTUP_RUNS, timeout=STARTUP_TIMEOUT, should_stop=None):
+    """
+    启动程序runs次
+    :param token: write_runtime_hook返回的令牌
+    :param should_stop: 返回True时提前结束的函数
+    :return: {"runs", "cold", "warm", "peak_rss"}，热启动取中位数；没有成功启动时返回None
+    """
+    times = []
+    peaks = []
+    for _ in range(runs):
+        if should_stop and should_stop():
+            break
+        elapsed, peak, return_code = run_once(executable, token, timeout)
+        if return_code != 0:
+            raise RuntimeError(f"程序以测试模式启动失败，退出码 {return_code}: {executable}")
+        times.append(elapsed)
+        if peak:
+            peaks.append(peak)
+    if not times:
+        return None
+    return {
+        "runs": len(times),
+        "cold": times[0],
+        "warm": statistics.median(times[1:]) if len(times) > 1 else times[0],
+        "peak_rss": max(peaks) if peaks else None,
+    }
+
+
+def _rss_text(value):
+    return format_size(value) if value else "-"
+
+
+def format_startup(results):
+    """把一次构建的测试结果格式化为表格"""
+    rows = [("打包方式", "次数", "冷启动", "热启动", "内存峰值")]
+    for kind, result in results.items():
+        rows.append((kind, str(result["runs"]), f"{result['cold']:.2f}s", f"{result['warm']:.2f}s",
+                     _rss_text(result["peak_rss"])))
+    return "启动测试:\n" + format_table(rows) + "\n"
+
+
+def format_startup_comparison(records):
+    """
+    按打包方式和是否启用UPX，列出构建历史中最近一次的启动测试结果
+    :param records: 构建历史记录，按时间先后排列
+    :return: 表格文本，没有测试结果时返回空字符串
+    """
+    latest = {}
+    for record in records:
+        for kind, result in record.get("startup", {}).items():
+            latest[(kind, bool(record.get("enable_upx")))] = (record.get("time", ""), result)
+    if not latest:
+        return ""
+    rows = [("打包方式", "UPX", "冷启动", "热启动", "内存峰值", "测试时间")]
+    for (kind, upx), (when, result) in sorted(latest.items()):
+        rows.append((kind, "启用" if upx else "不启用", f"{result['cold']:.2f}s", f"{result['warm']:.2f}s",
+                     _rss_text(result["peak_rss"]), when))
+    return "启动时间对比（各组合最近一次）:\n" + format_table(rows) + "\n"
@@ -0,0 +1,145 @@
+import ast
+import io
+import os
+import tokenize
+
+import pytest
+
+import code_cleaner
+from build_cache import CACHE_DIR_NAME
+from code_cleaner import OUTPUT_MIRROR, CleanEngine, CleanOptions, clean_stream, strip_source
+
+SAMPLE = '''#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""模块文档"""
+import os  # 行尾注释
+
+"""不是文档字符串"""
+
+
+def func(a,  # 参数说明
+         b):
+    """函数文档"""
+    \'\'\'多余的字符串
+    跨行\'\'\'
+    text = "# 不是注释"
+    return (a +
+            b)  # 返回
+
+
+class Demo:
+    """类文档"""
+
+    value = 1  # 注释
+    # 整行注释
+'''
+
+EXPECTED = '''#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""模块文档"""
+import os
+
+def func(a,
+         b):
+    """函数文档"""
+    text = "# 不是注释"
+    return (a +
+            b)
+
+class Demo:
+    """类文档"""
+
+    value = 1
+'''
+
+ALL_OPTIONS = [
+    CleanOptions(single, multi, empty)
+    for single in (True, False) for multi in (True, False) for empty in (True, False)
+]
+
+
+@pytest.fixture(params=["line_scan", "tokenize"])
+def stripper(request, monkeypatch):
+    """两种实现都要测试：3.12之前默认按行扫描，之后默认用tokenize"""
+    monkeypatch.setattr(code_cleaner, "_LINE_SCAN", request.param == "line_scan")
+    return request.param
+
+
+def test_strip_sample(stripper):
+    assert strip_source(SAMPLE, CleanOptions()) == EXPECTED
+
+
+def test_all_options_off_keeps_source(stripper):
+    assert strip_source(SAMPLE, CleanOptions(False, False, False)) == SAMPLE
+
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n"])
+def test_line_endings_kept(stripper, newline):
+    source = SAMPLE.replace("\n", newline)
+    assert strip_source(source, CleanOptions()) == EXPECTED.replace("\n", newline)
+
+
+def test_keep_string_statements(stripper):
+    output = strip_source(SAMPLE, CleanOptions(remove_multi=False))
+    assert '"""不是文档字符串"""' in output
+    assert "多余的字符串" in output
+    assert "# 行尾注释" not in output
+
+
+def test_output_has_same_ast_without_string_statements(stripper):
+    """删除注释不改变语法树，删除字符串语句只去掉非文档字符串的表达式"""
+    source = open(code_cleaner.__file__, encoding="utf-8", newline="").read()
+    assert ast.dump(ast.parse(strip_source(source, CleanOptions(remove_multi=False)))) == ast.dump(ast.parse(source))
+    for options in ALL_OPTIONS:
+        ast.parse(strip_source(source, options))
+
+
+@pytest.mark.parametrize("options", ALL_OPTIONS, ids=str)
+def test_implementations_agree(options):
+    """按行扫描与tokenize两种实现的输出逐字节一致"""
+    package_dir = os.path.dirname(code_cleaner.__file__)
+    for name in sorted(os.listdir(package_dir)):
+        if not name.endswith(".py"):
+            continue
+        with open(os.path.join(package_dir, name), encoding="utf-8", newline="") as f:
+            source = f.read()
+        outputs = [
+            "".join(stripper_class(io.StringIO(source, newline="").readline, options).run())
+            for stripper_class in (code_cleaner._LineScanStripper, code_cleaner._CommentStripper)
+        ]
+        assert outputs[0] == outputs[1], name
+
+
+@pytest.mark.parametrize("source", ['x = """未结束\n', "x = (1,\n"])
+def test_invalid_source_raises(stripper, source):
+    with pytest.raises((tokenize.TokenError, SyntaxError)):
+        strip_source(source, CleanOptions())
+
+
+def test_clean_stream_matches_strip_source(stripper):
+    target = io.StringIO(newline="")
+    source_hash, source_size, output_hash, output_size = clean_stream(
+        io.StringIO(SAMPLE, newline=""), target, CleanOptions())
+    assert target.getvalue() == EXPECTED
+    assert source_size == len(SAMPLE.encode("utf-8"))
+    assert output_size == len(EXPECTED.encode("utf-8"))
+    assert source_hash != output_hash
+
+
+def test_engine_manifest_path(tmp_path):
+    """指定清单路径时不写入项目目录下默认的清单"""
+    source = tmp_path / "app.py"
+    source.write_bytes(SAMPLE.encode("utf-8"))
+    manifest_path = tmp_path / "staging.clean_manifest.json"
+
+    def run():
+        engine = CleanEngine(CleanOptions(), max_workers=1, incremental=True, output_mode=OUTPUT_MIRROR,
+                             output_dir=str(tmp_path / "out"), base_dir=str(tmp_path), manifest_path=str(manifest_path))
+        return engine.run([str(source)])
+
+    assert run().success_count == 1
+    with open(tmp_path / "out" / "app.py", encoding="utf-8", newline="") as f:
+        assert f.read() == EXPECTED
+    assert manifest_path.is_file()
+    assert not (tmp_path / CACHE_DIR_NAME / "clean_manifest.json").exists()
+    assert run().unchanged_count == 1
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from batch_pack import STATUS_FAILED, STATUS_PENDING, create_batch_jobs
+from pack_core import PackConfig
+
+
+def _write(path, content):
+    path.write_text(content if isinstance(content, str) else json.dumps(content), encoding="utf-8")
+    return str(path)
+
+
+def test_load_relative_paths(tmp_path):
+    config = PackConfig.load(_write(tmp_path / "pack.json", {"main_script": "app.py", "resources": ["assets"]}))
+    assert config.main_script == str(tmp_path / "app.py")
+    assert config.resources == [str(tmp_path / "assets")]
+    assert config.output_name == "app"
+
+
+@pytest.mark.parametrize("content, message", [
+    ("{bad", "pack.json"),
+    ({"main_script": "app.py", "nope": 1}, "nope"),
+    ([1], "JSON对象"),
+    ({"pack_option": "both"}, "main_script"),
+    ({"main_script": "app.py", "resources": 5}, "pack.json"),
+    ({"main_script": "app.py", "pack_option": "zip"}, "zip"),
+])
+def test_load_invalid(tmp_path, content, message):
+    with pytest.raises(ValueError, match=message):
+        PackConfig.load(_write(tmp_path / "pack.json", content))
+
+
+def test_load_missing(tmp_path):
+    with pytest.raises(ValueError, match="missing.json"):
+        PackConfig.load(str(tmp_path / "missing.json"))
+
+
+def test_batch_reports_invalid_configs(tmp_path):
+    items = [
+        _write(tmp_path / "bad.json", "{bad"),
+        str(tmp_path / "missing.json"),
+        _write(tmp_path / "app.py", "print(1)\n"),
+    ]
+    jobs = create_batch_jobs(items, str(tmp_path / "out"))
+    assert [job.name for job in jobs] == ["bad", "missing", "app"]
+    assert [job.status for job in jobs] == [STATUS_FAILED, STATUS_FAILED, STATUS_PENDING]
+    assert "bad.json" in jobs[0].error and jobs[0].config is None
+    assert not jobs[2].error and jobs[2].config.dist_dir == str(tmp_path / "out" / "app" / "dist")
@@ -0,0 +1,68 @@
+import ast
+
+from pack_core import inject_spec_datas
+
+# PyInstaller 6 makespec生成的spec文件开头
+PLAIN_SPEC = """# -*- mode: python ; coding: utf-8 -*-
+
+
+a = Analysis(
+    ['../app.py'],
+    pathex=[],
+    binaries=[],
+    datas=[],
+    hiddenimports=[],
+    hookspath=[],
+)
+pyz = PYZ(a.pure)
+"""
+
+COLLECT_SPEC = """# -*- mode: python ; coding: utf-8 -*-
+from PyInstaller.utils.hooks import collect_all
+
+datas = []
+binaries = []
+hiddenimports = []
+tmp_ret = collect_all('tkinter')
+datas += tmp_ret[0]; binaries += tmp_ret[1]; hiddenimports += tmp_ret[2]
+
+
+a = Analysis(
+    ['../app.py'],
+    pathex=[],
+    binaries=binaries,
+    datas=datas,
+    hiddenimports=hiddenimports,
+    hookspath=[],
+)
+pyz = PYZ(a.pure)
+"""
+
+DATAS = [("/project/assets/logo.png", "assets"), ("/project/config.json", ".")]
+
+
+def _analysis_datas(spec):
+    """返回spec中Analysis调用的datas参数源码"""
+    for node in ast.walk(ast.parse(spec)):
+        if isinstance(node, ast.Call) and getattr(node.func, "id", "") == "Analysis":
+            keyword = next(keyword for keyword in node.keywords if keyword.arg == "datas")
+            return ast.unparse(keyword.value)
+    raise AssertionError("spec中没有Analysis")
+
+
+def test_inject_empty_datas():
+    spec = inject_spec_datas(PLAIN_SPEC, DATAS)
+    assert _analysis_datas(spec) == f"[] + {DATAS!r}"
+    assert "binaries=[]," in spec and "hiddenimports=[]," in spec
+
+
+def test_inject_collected_datas():
+    spec = inject_spec_datas(COLLECT_SPEC, DATAS)
+    assert _analysis_datas(spec) == f"datas + {DATAS!r}"
+    # Analysis之前的datas变量定义不受影响
+    assert "\ndatas = []\n" in spec
+    assert "binaries=binaries," in spec
+
+
+def test_inject_missing_datas():
+    assert inject_spec_datas("a = Analysis(['app.py'])\n", DATAS) is None
@@ -0,0 +1,79 @@
+import os
+import types
+
+import pytest
+
+from resource_archive import write_archive
+from resource_manifest import ResourceFile
+from resource_runtime import DEFLATED, STORED, ResourceArchive
+
+
+def _manifest(tmp_path, files):
+    """
+    :param files: {相对路径: 内容}
+    """
+    items = []
+    for name, data in files.items():
+        path = tmp_path / "src" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        stat = path.stat()
+        dest = os.path.dirname(name) or "."
+        items.append(ResourceFile(str(path), dest, stat.st_size, stat.st_mtime_ns))
+    return types.SimpleNamespace(files=items)
+
+
+@pytest.fixture
+def files():
+    return {
+        "assets/logo.png": os.urandom(4096),
+        "assets/text.txt": b"hello resource archive\n" * 500,
+        "data/random.bin": os.urandom(2048),
+        "empty.txt": b"",
+        "data/empty.png": b"",
+    }
+
+
+def test_write_and_read(tmp_path, files):
+    path = tmp_path / "resources.pak"
+    total, archive_size = write_archive(str(path), _manifest(tmp_path, files))
+    assert total == sum(len(data) for data in files.values())
+    assert archive_size == path.stat().st_size
+
+    archive = ResourceArchive(str(path))
+    try:
+        assert sorted(archive.names()) == sorted(files)
+        for name, data in files.items():
+            assert name in archive
+            assert archive.read(name) == data
+            assert bytes(archive.view(name)) == data
+        # Windows风格的分隔符也能找到条目
+        assert archive.read(os.path.join("assets", "text.txt")) == files["assets/text.txt"]
+
+        methods = {name: entry[3] for name, entry in archive.index.items()}
+        assert methods["assets/logo.png"] == STORED
+        assert methods["assets/text.txt"] == DEFLATED
+        # 压缩后没有变小的文件原样存储
+        assert methods["data/random.bin"] == STORED
+        assert methods["empty.txt"] == STORED
+        assert archive.index["empty.txt"][1:3] == [0, 0]
+    finally:
+        archive.close()
+
+
+def test_empty_archive(tmp_path):
+    path = tmp_path / "resources.pak"
+    assert write_archive(str(path), types.SimpleNamespace(files=[])) == (0, path.stat().st_size)
+    archive = ResourceArchive(str(path))
+    try:
+        assert archive.names() == []
+    finally:
+        archive.close()
+
+
+@pytest.mark.parametrize("data", [b"", b"short", b"x" * 64])
+def test_not_an_archive(tmp_path, data):
+    path = tmp_path / "resources.pak"
+    path.write_bytes(data)
+    with pytest.raises(ValueError):
+        ResourceArchive(str(path))
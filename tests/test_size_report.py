@@ -0,0 +1,106 @@
+import marshal
+import struct
+
+import pytest
+
+from size_report import COOKIE, COOKIE_MAGIC, PYZ_MAGIC, TOC_ENTRY, read_pkg, read_pyz, scan_artifact
+
+BOOTLOADER = b"\x7fELF" + b"\0" * 1020
+
+
+def _pyz(toc):
+    """生成PYZ归档：魔数、字节码魔数、目录偏移，模块数据，最后是marshal序列化的目录"""
+    header_size = len(PYZ_MAGIC) + 8
+    entries = toc.values() if isinstance(toc, dict) else [entry for _, entry in toc]
+    body = b"".join(b"\1" * entry[-1] for entry in entries)
+    return PYZ_MAGIC + b"\0\0\r\n" + struct.pack("!i", header_size + len(body)) + body + marshal.dumps(toc)
+
+
+def _toc_entry(name, offset, data, typecode):
+    encoded = name.encode("utf-8")
+    # 名称补零到16字节对齐，与PyInstaller一致
+    padded = encoded + b"\0" * (16 - (TOC_ENTRY.size + len(encoded)) % 16)
+    return TOC_ENTRY.pack(TOC_ENTRY.size + len(padded), offset, len(data), len(data), 0, typecode.encode("ascii")) + padded
+
+
+def _executable(entries):
+    """
+    生成启动程序后附加PKG归档的单文件程序
+    :param entries: [(名称, 数据, 类型码)]
+    """
+    package = b""
+    toc = b""
+    for name, data, typecode in entries:
+        toc += _toc_entry(name, len(package), data, typecode)
+        package += data
+    toc_offset = len(package)
+    package += toc
+    length = len(package) + COOKIE.size
+    cookie = COOKIE.pack(COOKIE_MAGIC, length, toc_offset, len(toc), 311, b"libpython3.11.so")
+    return BOOTLOADER + package + cookie
+
+
+@pytest.fixture
+def entries():
+    pyz = _pyz({"json": (0, 12, 300), "json.decoder": (0, 312, 120)})
+    return [
+        ("PYZ.pyz", pyz, "z"),
+        ("pyiboot01_bootstrap", b"\2" * 50, "s"),
+        ("app", b"\3" * 70, "s"),
+        ("pyimod01_archive", b"\4" * 30, "m"),
+        ("lib-dynload/_json.cpython-311.so", b"\5" * 400, "b"),
+        ("assets\\logo.png", b"\6" * 90, "x"),
+    ]
+
+
+def test_read_pkg(tmp_path, entries):
+    path = tmp_path / "app"
+    path.write_bytes(_executable(entries))
+    result = read_pkg(str(path))
+    assert [(name, typecode, size) for name, typecode, size, _ in result] == [
+        (name.replace("\\", "/"), typecode, len(data)) for name, data, typecode in entries
+    ]
+    content = path.read_bytes()
+    for (_, data, _), (_, _, size, offset) in zip(entries, result):
+        assert content[offset:offset + size] == data
+
+
+def test_read_pyz(tmp_path, entries):
+    path = tmp_path / "app"
+    path.write_bytes(_executable(entries))
+    pyz_offset = read_pkg(str(path))[0][3]
+    assert read_pyz(str(path), pyz_offset) == [("json", 300), ("json.decoder", 120)]
+
+
+def test_read_pyz_list_toc(tmp_path):
+    """旧版PyInstaller的目录是列表"""
+    path = tmp_path / "PYZ.pyz"
+    path.write_bytes(_pyz([("os", (0, 12, 50)), ("re", (0, 62, 40))]))
+    assert read_pyz(str(path)) == [("os", 50), ("re", 40)]
+
+
+def test_scan_executable(tmp_path, entries):
+    path = tmp_path / "app"
+    path.write_bytes(_executable(entries))
+    sizes = {item.name: (item.kind, item.size) for item in scan_artifact(str(path))}
+    assert sizes["json"] == ("module", 300)
+    assert sizes["app"] == ("module", 70)
+    assert sizes["lib-dynload/_json.cpython-311.so"] == ("binary", 400)
+    assert sizes["assets/logo.png"] == ("data", 90)
+    # 归档条目之外的大小计入启动程序
+    assert sizes["app (启动程序)"][1] == path.stat().st_size - sum(len(data) for _, data, _ in entries)
+
+
+@pytest.mark.parametrize("data", [b"", BOOTLOADER, b"PYZ\0"])
+def test_not_an_executable(tmp_path, data):
+    path = tmp_path / "app"
+    path.write_bytes(data)
+    with pytest.raises(ValueError):
+        read_pkg(str(path))
+
+
+def test_not_a_pyz(tmp_path):
+    path = tmp_path / "PYZ.pyz"
+    path.write_bytes(BOOTLOADER)
+    with pytest.raises(ValueError):
+        read_pyz(str(path))
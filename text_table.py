@@ -0,0 +1,26 @@
+"""
+终端文本表格
+按显示宽度对齐各列，中文等全角字符占两列
+"""
+import unicodedata
+
+
+def display_width(text):
+    """计算文本在终端中的显示宽度"""
+    return sum(2 if unicodedata.east_asian_width(char) in "WF" else 1 for char in str(text))
+
+
+def _pad(text, width):
+    return str(text) + " " * (width - display_width(text))
+
+
+def format_table(rows):
+    """
+    把二维列表格式化为对齐的文本表格
+    :param rows: 行列表，第一行为表头，表头下方会加一条分隔线
+    """
+    column_count = len(rows[0])
+    widths = [max(display_width(row[i]) for row in rows) for i in range(column_count)]
+    lines = ["  ".join(_pad(cell, width) for cell, width in zip(row, widths)).rstrip() for row in rows]
+    lines.insert(1, "  ".join("-" * width for width in widths))
+    return "\n".join(lines)
@@ -0,0 +1,359 @@
+"""
+选择性UPX压缩
+PyInstaller启用UPX时每次构建都串行压缩全部二进制文件，耗时长，部分DLL压缩后无法加载或启动变慢。
+文件夹模式打包后由本模块处理程序目录：按格式和大小挑选值得压缩的二进制文件，按排除规则跳过，
+用线程池并行调用UPX；压缩结果按输入文件的内容哈希缓存在.pack_cache/upx，文件没有变化时直接复用，
+压缩后没有明显变小或UPX无法处理的文件保持原样，结果同样缓存，下次不再尝试。
+单文件模式的二进制文件在程序的归档内部，仍由PyInstaller压缩，排除规则转为--upx-exclude参数
+"""
+import hashlib
+import json
+import os
+import pathlib
+import shutil
+import struct
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from build_cache import CACHE_DIR_NAME, atomic_write, hash_file
+from build_history import format_size
+from text_table import format_table
+
+# 压缩后容易无法加载的二进制文件：VC运行库、系统API转发库和Qt插件
+DEFAULT_UPX_EXCLUDES = (
+    "vcruntime*.dll", "msvcp*.dll", "ucrtbase.dll", "api-ms-win-*.dll", "python3*.dll", "plugins/*/*",
+)
+# 与PyInstaller相同的UPX参数
+UPX_OPTIONS = ["--compress-icons=0", "--lzma", "-q"] + (["--strip-loadconf"] if sys.platform == "win32" else [])
+# 小于该大小的文件压缩收益很小，不值得每次加载时解压
+UPX_MIN_SIZE = 128 * 1024
+# 压缩后至少变小这个比例才使用压缩结果
+UPX_MIN_SAVING = 0.1
+BINARY_SUFFIXES = (".dll", ".pyd", ".so", ".dylib")
+# PE和ELF文件的开头，macOS的Mach-O文件压缩后签名失效，不处理
+BINARY_MAGICS = (b"MZ", b"\x7fELF")
+# 一次报告中列出的文件数
+REPORT_LIMIT = 20
+
+
+def find_upx(upx_dir=""):
+    """
+    :param upx_dir: UPX所在目录，为空时在PATH中查找
+    :return: UPX可执行文件路径，找不到时返回None
+    """
+    return shutil.which("upx", path=upx_dir) if upx_dir else shutil.which("upx")
+
+
+def upx_version(upx):
+    """UPX版本信息的第一行，作为缓存键的一部分"""
+    try:
+        result = subprocess.run([upx, "--version"], capture_output=True, text=True, errors="replace", timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        return ""
+    return result.stdout.split("\n", 1)[0].strip()
+
+
+def _is_binary_name(file_name):
+    lower = file_name.lower()
+    return lower.endswith(BINARY_SUFFIXES) or ".so." in lower
+
+
+def _binary_magic(path):
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(4)
+    except OSError:
+        return False
+    return head.startswith(BINARY_MAGICS)
+
+
+# PE可选头中的DllCharacteristics标志：启用了控制流保护(Control Flow Guard)
+IMAGE_DLLCHARACTERISTICS_GUARD_CF = 0x4000
+
+
+def _pe_guard_cf(path):
+    """
+    判断PE文件是否启用了CFG，UPX压缩后这类文件加载时会出错
+    :return: 非PE文件或读取失败时返回False
+    """
+    try:
+        with open(path, 'rb') as f:
+            if f.read(2) != b"MZ":
+                return False
+            f.seek(0x3C)
+            pe_offset = struct.unpack("<I", f.read(4))[0]
+            f.seek(pe_offset)
+            if f.read(4) != b"PE\0\0":
+                return False
+            # COFF文件头20字节之后是可选头，DllCharacteristics在PE32和PE32+中都位于可选头偏移70处
+            f.seek(pe_offset + 4 + 20 + 70)
+            characteristics = struct.unpack("<H", f.read(2))[0]
+    except (OSError, struct.error):
+        return False
+    return bool(characteristics & IMAGE_DLLCHARACTERISTICS_GUARD_CF)
+
+
+@dataclass
+class UpxResult:
+    path: str  # 相对于程序目录，/分隔
+    size: int
+    packed_size: int  # 没有压缩时与size相同
+    seconds: float = 0.0  # UPX用时，命中缓存时为当初压缩的用时
+    cached: bool = False
+    reason: str = ""  # 没有压缩的原因
+
+    @property
+    def saved(self):
+        return self.size - self.packed_size
+
+
+class UpxCache:
+    """
+    压缩结果缓存，按UPX版本和参数分目录
+    index.json记录每个输入哈希的结果，压缩后的文件以输入哈希命名
+    """
+
+    def __init__(self, project_dir, key):
+        self.cache_dir = os.path.join(project_dir, CACHE_DIR_NAME, "upx", key)
+        self.index_path = os.path.join(self.cache_dir, "index.json")
+        self.changed = False
+        self._lock = threading.Lock()
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def blob_path(self, digest):
+        return os.path.join(self.cache_dir, digest)
+
+    def get(self, digest):
+        """
+        :return: {"packed_size", "seconds", "reason"}，没有缓存或压缩后的文件已丢失时返回None
+        """
+        with self._lock:
+            entry = self.entries.get(digest)
+        if entry and not entry["reason"] and not os.path.isfile(self.blob_path(digest)):
+            return None
+        return entry
+
+    def put(self, digest, entry):
+        with self._lock:
+            self.entries[digest] = entry
+            self.changed = True
+
+    def save(self):
+        if not self.changed:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with atomic_write(self.index_path, encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+        self.changed = False
+
+
+class UpxStage:
+    """文件夹模式打包后的选择性UPX压缩"""
+
+    def __init__(self, project_dir, upx_dir="", excludes=DEFAULT_UPX_EXCLUDES, min_size=UPX_MIN_SIZE, workers=None):
+        """
+        :param project_dir: 项目目录，缓存保存在其中的.pack_cache/upx
+        :param upx_dir: UPX所在目录，为空时在PATH中查找
+        :param excludes: 排除规则，与PyInstaller的--upx-exclude一致，按pathlib的match从右向左匹配路径，
+                         如"libssl*"、"lib-dynload/_ssl*"
+        :param min_size: 小于该大小的文件不压缩
+        :param workers: 并行压缩的线程数，默认为CPU核数
+        """
+        self.project_dir = project_dir
+        self.upx = find_upx(upx_dir)
+        self.excludes = tuple(excludes)
+        self.min_size = min_size
+        self.workers = workers or os.cpu_count() or 1
+        self._version = None
+
+    @property
+    def available(self):
+        return self.upx is not None
+
+    @property
+    def version(self):
+        if self._version is None:
+            self._version = upx_version(self.upx) if self.upx else ""
+        return self._version
+
+    @property
+    def settings_key(self):
+        """UPX版本、参数和挑选规则的摘要，加入构建缓存的指纹，规则变化后不再复用旧产物"""
+        settings = [self.version, UPX_OPTIONS, list(self.excludes), self.min_size]
+        return hashlib.sha256(json.dumps(settings).encode("utf-8")).hexdigest()
+
+    def pyinstaller_args(self):
+        """单文件模式交给PyInstaller压缩时的参数"""
+        args = [f"--upx-dir={os.path.dirname(self.upx)}"]
+        args.extend(f"--upx-exclude={pattern}" for pattern in self.excludes)
+        return args
+
+    def select(self, target_dir, executable_name):
+        """
+        挑选程序目录中值得压缩的二进制文件
+        :param executable_name: 主程序文件名，主程序末尾附带归档，不能压缩
+        :return: (候选[(相对路径, 大小)], 跳过的UpxResult列表)
+        """
+        candidates = []
+        skipped = []
+        for root, _, files in os.walk(target_dir):
+            for file in files:
+                path = os.path.join(root, file)
+                rel_path = os.path.relpath(path, target_dir).replace(os.sep, "/")
+                if rel_path == executable_name or not _is_binary_name(file):
+                    continue
+                size = os.path.getsize(path)
+                reason = ""
+                if any(pathlib.PurePath(rel_path).match(pattern) for pattern in self.excludes):
+                    reason = "排除规则"
+                elif size < self.min_size:
+                    reason = f"小于{format_size(self.min_size)}"
+                elif not _binary_magic(path):
+                    reason = "格式不支持"
+                elif _pe_guard_cf(path):
+                    reason = "启用了CFG"
+                elif os.path.isfile(os.path.join(root, f".{file}.hmac")) or \
+                        os.path.isfile(os.path.splitext(path)[0] + ".chk"):
+                    # 带有完整性校验文件的库修改后无法通过校验
+                    reason = "有校验文件"
+                if reason:
+                    skipped.append(UpxResult(rel_path, size, size, reason=reason))
+                else:
+                    candidates.append((rel_path, size))
+        return candidates, skipped
+
+    def _compress(self, cache, path, digest, size):
+        """压缩文件的副本，结果写入缓存"""
+        os.makedirs(cache.cache_dir, exist_ok=True)
+        blob = cache.blob_path(digest)
+        # 内容相同的文件可能同时在处理，临时文件按线程区分
+        temp_path = f"{blob}.{threading.get_ident()}.tmp"
+        shutil.copyfile(path, temp_path)
+        start = time.perf_counter()
+        try:
+            result = subprocess.run(
+                [self.upx, *UPX_OPTIONS, temp_path],
+                stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                text=True, errors="replace"
+            )
+            seconds = time.perf_counter() - start
+            packed_size = os.path.getsize(temp_path)
+            if result.returncode != 0:
+                lines = [line.strip() for line in result.stdout.splitlines() if line.strip()]
+                # UPX的错误信息形如"upx: 路径: NotCompressibleException"，只保留最后一段
+                message = lines[-1].rsplit(": ", 1)[-1][:60] if lines else f"退出码 {result.returncode}"
+                entry = {"packed_size": size, "seconds": seconds, "reason": f"UPX失败: {message}"}
+            elif packed_size > size * (1 - UPX_MIN_SAVING):
+                entry = {"packed_size": size, "seconds": seconds, "reason": "压缩率不足"}
+            else:
+                os.replace(temp_path, blob)
+                entry = {"packed_size": packed_size, "seconds": seconds, "reason": ""}
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        cache.put(digest, entry)
+        return entry
+
+    def _process(self, cache, target_dir, rel_path, size):
+        path = os.path.join(target_dir, rel_path)
+        digest = hash_file(path)
+        entry = cache.get(digest)
+        cached = entry is not None
+        if not cached:
+            entry = self._compress(cache, path, digest, size)
+        if not entry["reason"]:
+            shutil.copyfile(cache.blob_path(digest), path)
+        return UpxResult(rel_path, size, entry["packed_size"], entry["seconds"], cached, entry["reason"])
+
+    def run(self, target_dir, executable_name, should_stop=None):
+        """
+        并行压缩程序目录中挑选出的二进制文件
+        :param should_stop: 返回True时不再开始新的压缩
+        :return: (压缩过或命中缓存的UpxResult列表, 跳过的UpxResult列表, 总用时)
+        """
+        start = time.perf_counter()
+        candidates, skipped = self.select(target_dir, executable_name)
+        # 压缩结果只与UPX版本和参数有关，与挑选规则无关
+        cache_key = hashlib.sha256(json.dumps([self.version, UPX_OPTIONS]).encode("utf-8")).hexdigest()[:16]
+        cache = UpxCache(self.project_dir, cache_key)
+        results = []
+
+        def task(rel_path, size):
+            if should_stop and should_stop():
+                return None
+            return self._process(cache, target_dir, rel_path, size)
+
+        try:
+            # 大文件先开始，减少最后只剩一个大文件在压缩的时间
+            candidates.sort(key=lambda pair: -pair[1])
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = [executor.submit(task, rel_path, size) for rel_path, size in candidates]
+                results.extend(result for result in (future.result() for future in futures) if result)
+        finally:
+            # 索引保存失败只会让下次重新压缩
+            try:
+                cache.save()
+            except OSError:
+                pass
+        return results, skipped, time.perf_counter() - start
+
+
+def summarize(results, elapsed):
+    """
+    写入构建历史的摘要
+    :param results: 压缩过或命中缓存的UpxResult列表
+    """
+    packed = [result for result in results if not result.reason]
+    return {
+        "files": len(packed),
+        "size": sum(result.size for result in packed),
+        "saved": sum(result.saved for result in packed),
+        "upx_seconds": sum(result.seconds for result in results if not result.cached),
+        "elapsed": elapsed,
+    }
+
+
+def format_upx_report(results, skipped, elapsed, workers):
+    """列出每个文件节省的大小与UPX用时，挑选时跳过的文件按原因汇总"""
+    # 按原大小排列，压缩失败的大文件也能看到
+    attempted = sorted(results, key=lambda result: -result.size)
+    skipped_groups = {}
+    for result in skipped:
+        group = skipped_groups.setdefault(result.reason, [0, 0])
+        group[0] += 1
+        group[1] += result.size
+
+    rows = [("文件", "原大小", "压缩后", "节省", "UPX用时", "结果")]
+    for result in attempted[:REPORT_LIMIT]:
+        state = result.reason or ("缓存" if result.cached else "压缩")
+        rows.append((result.path, format_size(result.size), format_size(result.packed_size),
+                     format_size(result.saved) if result.saved else "-", f"{result.seconds:.1f}s", state))
+
+    summary = summarize(results, elapsed)
+    cached = sum(1 for result in attempted if result.cached)
+    # 全部UPX用时（含命中缓存的文件当初的用时）与节省的大小
+    total_seconds = sum(result.seconds for result in attempted)
+    lines = [
+        f"UPX压缩: {summary['files']} 个文件，{format_size(summary['size'])} -> "
+        f"{format_size(summary['size'] - summary['saved'])}，节省 {format_size(summary['saved'])}",
+        f"用时 {elapsed:.1f}s（{workers} 线程，本次UPX用时 {summary['upx_seconds']:.1f}s，"
+        f"{cached}/{len(attempted)} 个命中缓存）",
+    ]
+    if total_seconds > 0 and summary["saved"]:
+        lines.append(f"每秒UPX用时节省 {format_size(summary['saved'] / total_seconds)}")
+    if attempted:
+        lines.append(format_table(rows))
+        if len(attempted) > REPORT_LIMIT:
+            lines.append(f"……另有 {len(attempted) - REPORT_LIMIT} 个文件")
+    if skipped_groups:
+        lines.append("跳过: " + "，".join(f"{reason} {count} 个（{format_size(size)}）"
+                                         for reason, (count, size) in skipped_groups.items()))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,114 @@
+"""
+虚拟列表
+Listbox只放当前可见的几十行，滚动时按位置重新填充，数据再多也只渲染可见部分；
+数据保存在外部的序列中（如FileCollection的过滤视图），控件只负责显示和记录选中项
+"""
+import tkinter as tk
+import tkinter.font as tkfont
+from tkinter import ttk
+
+
+class VirtualList:
+    """显示一个序列的虚拟列表，序列变化后调用refresh"""
+
+    def __init__(self, parent, get_items, height=8):
+        """
+        :param parent: 父控件
+        :param get_items: 返回要显示的序列的函数，序列支持len()和下标访问
+        :param height: 初始可见行数
+        """
+        self.get_items = get_items
+        self.frame = ttk.Frame(parent)
+        self.scrollbar = ttk.Scrollbar(self.frame, command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.listbox = tk.Listbox(self.frame, height=height, selectmode=tk.EXTENDED, activestyle="none")
+        self.listbox.pack(fill="both", expand=True)
+
+        self.top = 0
+        self.rows = height
+        self.selection = set()
+        self._extend_selection = False
+        self._line_height = tkfont.Font(font=self.listbox.cget("font")).metrics("linespace") + 1
+
+        self.listbox.bind("<Button-1>", self._on_click)
+        self.listbox.bind("<<ListboxSelect>>", self._on_select)
+        self.listbox.bind("<Configure>", self._on_configure)
+        self.listbox.bind("<MouseWheel>", self._on_mousewheel)
+        self.listbox.bind("<Button-4>", lambda event: self._scroll_by(-3))
+        self.listbox.bind("<Button-5>", lambda event: self._scroll_by(3))
+        self.listbox.bind("<Up>", lambda event: self._scroll_by(-1))
+        self.listbox.bind("<Down>", lambda event: self._scroll_by(1))
+        self.listbox.bind("<Prior>", lambda event: self._scroll_by(-self.rows))
+        self.listbox.bind("<Next>", lambda event: self._scroll_by(self.rows))
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def curselection(self):
+        """选中项在序列中的下标，升序"""
+        total = len(self.get_items())
+        return sorted(index for index in self.selection if index < total)
+
+    def selected_items(self):
+        items = self.get_items()
+        return [items[index] for index in self.curselection()]
+
+    def clear_selection(self):
+        self.selection.clear()
+        self.refresh()
+
+    def see_end(self):
+        self.top = max(0, len(self.get_items()) - self.rows)
+        self.refresh()
+
+    def refresh(self):
+        """按当前滚动位置重新填充可见行"""
+        items = self.get_items()
+        total = len(items)
+        self.top = max(0, min(self.top, total - self.rows))
+        visible = [str(items[index]) for index in range(self.top, min(total, self.top + self.rows))]
+        self.listbox.delete(0, tk.END)
+        if visible:
+            self.listbox.insert(tk.END, *visible)
+        for index in self.selection:
+            if self.top <= index < self.top + len(visible):
+                self.listbox.selection_set(index - self.top)
+        if total:
+            self.scrollbar.set(self.top / total, (self.top + len(visible)) / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _scroll_by(self, rows):
+        self.top += rows
+        self.refresh()
+        return "break"
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self.top = int(float(value) * len(self.get_items()))
+            self.refresh()
+        elif action == "scroll":
+            step = self.rows if unit == "pages" else 1
+            self._scroll_by(int(value) * step)
+
+    def _on_mousewheel(self, event):
+        # Windows下delta为120的倍数，macOS下为较小的整数
+        delta = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self._scroll_by(-delta * 3)
+
+    def _on_configure(self, event):
+        rows = max(1, event.height // self._line_height)
+        if rows != self.rows:
+            self.rows = rows
+            self.refresh()
+
+    def _on_click(self, event):
+        # 按住Shift或Ctrl时是追加选择，保留滚出可见范围的选中项
+        self._extend_selection = bool(event.state & 0x0005)
+
+    def _on_select(self, event):
+        if self._extend_selection:
+            self.selection.difference_update(range(self.top, self.top + self.listbox.size()))
+        else:
+            self.selection.clear()
+        self.selection.update(self.top + index for index in self.listbox.curselection())